@@ -2,26 +2,57 @@
 Parcel API — query PostGIS parcels by bbox, point, or APN.
 Run: uvicorn app:app --reload --host 0.0.0.0 --port 8001
 
+Endpoints are async: PostGIS is queried through an asyncio connection pool (psycopg 3)
+and ArcGIS through a shared httpx.AsyncClient, so a worker is not limited by a threadpool.
+
 Data sources (first available wins for by-apn):
   1. PostGIS: set DATABASE_URL or PARCEL_DB_* and load data via scripts/load_parcels_to_postgis.py.
   2. County ArcGIS: set PARCEL_ARCGIS_LAYER_URL (and optionally PARCEL_ARCGIS_APN_FIELD) for real APN lookup.
   3. Demo: demo_parcels.geojson in this folder.
 """
+import asyncio
+import base64
+import bisect
+import csv
+import hashlib
+import io
 import json
+import math
 import os
-import urllib.parse
-from contextlib import contextmanager
+import statistics
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
+from typing import List, Literal, Optional
+from urllib.parse import urlencode
 
-from fastapi import FastAPI, Query
+from fastapi import Depends, FastAPI, HTTPException, Path as PathParam, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from fastapi.responses import StreamingResponse
+from starlette.routing import Match
+from pydantic import BaseModel, Field
+import psycopg
+from psycopg.rows import dict_row
+
+import formats
+import geojson_stream
+import metrics
+import mvt
+from breaker import CircuitBreaker
+from cache import TTLCache
+from compression import CompressionMiddleware
+from db_pool import AsyncConnectionPool, CircuitOpen, PoolTimeout, connect_async, pool_settings_from_env
+from geometry import PackedPolygons, esri_to_geojson, geojson_to_wkt, polygons_of, simplify_geometry
+from owners import owner_key
+from projection import Projection
+from spatial_index import STRTree
+from text_index import AddressIndex, normalize_address
 
 try:
-    import requests
+    import httpx
 except ImportError:
-    requests = None
+    httpx = None
 
 try:
     from dotenv import load_dotenv
@@ -29,12 +60,21 @@ try:
 except ImportError:
     pass
 
-# Demo mode: serve from a GeoJSON file when PostGIS is not available
+# Demo mode: serve from a GeoJSON file when PostGIS is not available.
+# Bounding boxes are computed once at load and indexed, so large county files stay fast.
 _demo_features: list = []
+_demo_bboxes: list = []
+_demo_index = STRTree([])
+_demo_polygons = PackedPolygons([])
+_demo_apn_index: dict = {}  # normalized APN -> positions in _demo_features
+_demo_address_index = AddressIndex([])
+_demo_owner_index: dict = {}  # owner_key -> positions in _demo_features
+_demo_version = "demo0"  # changes whenever a different demo file (or file content) is loaded
 
 
 def _load_demo_geojson():
-    global _demo_features
+    global _demo_features, _demo_bboxes, _demo_index, _demo_polygons, _demo_apn_index, _demo_address_index
+    global _demo_owner_index, _demo_version
     path = os.environ.get("PARCEL_DEMO_GEJSON")
     if path:
         p = Path(__file__).resolve().parent / path
@@ -44,16 +84,30 @@ def _load_demo_geojson():
         p = Path(__file__).resolve().parent / "demo_parcels.geojson"
     if not p.exists():
         return
+    max_features = int(os.environ.get("PARCEL_DEMO_MAX_FEATURES", "0"))
+    st = p.stat()
+    _demo_version = "demo-" + hashlib.sha1(f"{p}:{st.st_size}:{st.st_mtime_ns}:{max_features}".encode()).hexdigest()[:12]
     try:
         with open(p) as f:
             data = json.load(f)
-        _demo_features = (data.get("features") or [])[:500]
+        features = data.get("features") or []
+        _demo_features = features[:max_features] if max_features > 0 else features
     except Exception:
         _demo_features = []
-
-
-# Load demo data at startup so API works without PostGIS
-_load_demo_geojson()
+    _demo_bboxes = [_bbox_of_geom(f.get("geometry")) for f in _demo_features]
+    _demo_index = STRTree(_demo_bboxes)
+    _demo_polygons = PackedPolygons([f.get("geometry") for f in _demo_features])
+    _demo_apn_index = {}
+    _demo_owner_index = {}
+    for i, f in enumerate(_demo_features):
+        props = f.get("properties") or {}
+        norm = _normalize_apn(str(props.get("apn") or ""))
+        if norm:
+            _demo_apn_index.setdefault(norm, []).append(i)
+        key = owner_key(props.get("owner"))
+        if key:
+            _demo_owner_index.setdefault(key, []).append(i)
+    _demo_address_index = AddressIndex([(f.get("properties") or {}).get("address") for f in _demo_features])
 
 
 def _bbox_of_geom(geom):
@@ -73,13 +127,91 @@ def _bbox_of_geom(geom):
     return (min(lons), min(lats), max(lons), max(lats))
 
 
-def _bbox_intersects(a, b):
-    return not (a[2] < b[0] or a[0] > b[2] or a[3] < b[1] or a[1] > b[3])
+def _normalize_apn(s: str) -> str:
+    """Strip non-digits so 11-444-000-40007 and 1144400040007 match."""
+    return "".join(c for c in (s or "") if c.isdigit())
+
+
+# Load demo data at startup so API works without PostGIS
+_load_demo_geojson()
+
+
+# Shared PostGIS connection pool, ArcGIS HTTP client and by-apn cache; created at startup, closed at shutdown
+_db_pool = None
+_db_breaker = None
+_http_client = None
+_apn_cache = None
+
+
+def _make_apn_cache():
+    """by-apn response cache from PARCEL_APN_CACHE_* env vars (SQLite tier only if a path is set)."""
+    sqlite_path = os.environ.get("PARCEL_APN_CACHE_DB", "").strip() or None
+    if sqlite_path and not Path(sqlite_path).is_absolute():
+        sqlite_path = str(Path(__file__).resolve().parent / sqlite_path)
+    return TTLCache(
+        max_entries=int(os.environ.get("PARCEL_APN_CACHE_SIZE", "10000")),
+        ttl=float(os.environ.get("PARCEL_APN_CACHE_TTL", "86400")),
+        negative_ttl=float(os.environ.get("PARCEL_APN_CACHE_NEGATIVE_TTL", "300")),
+        sqlite_path=sqlite_path,
+        sqlite_max_entries=int(os.environ.get("PARCEL_APN_CACHE_DB_MAX_ENTRIES", "1000000")),
+    )
+
+
+async def _probe_db():
+    """Breaker probe: a fresh connection plus SELECT 1 (never an idle pooled one that may be stale)."""
+    conn = await asyncio.wait_for(connect_async(), DB_BREAKER_PROBE_TIMEOUT)
+    try:
+        await conn.execute("SELECT 1")
+    finally:
+        await conn.close()
+
+
+# PostGIS circuit breaker (breaker.py): after this many consecutive connection failures, requests
+# skip PostGIS until a background probe (backoff from DB_BREAKER_BACKOFF up to _MAX seconds) succeeds
+DB_BREAKER_FAILURES = int(os.environ.get("PARCEL_DB_BREAKER_FAILURES", "3"))
+DB_BREAKER_BACKOFF = float(os.environ.get("PARCEL_DB_BREAKER_BACKOFF", "1"))
+DB_BREAKER_BACKOFF_MAX = float(os.environ.get("PARCEL_DB_BREAKER_BACKOFF_MAX", "30"))
+DB_BREAKER_PROBE_TIMEOUT = float(os.environ.get("PARCEL_DB_BREAKER_PROBE_TIMEOUT", "5"))
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _db_pool, _db_breaker, _http_client, _apn_cache
+    _apn_cache = _make_apn_cache()
+    _db_breaker = CircuitBreaker(
+        _probe_db, failure_threshold=DB_BREAKER_FAILURES, backoff=DB_BREAKER_BACKOFF,
+        backoff_max=DB_BREAKER_BACKOFF_MAX, errors=(psycopg.Error, OSError, asyncio.TimeoutError),
+    )
+    _db_pool = AsyncConnectionPool(**pool_settings_from_env())
+    await _db_pool.open()  # connections are opened (and re-opened) by the pool's background workers
+    try:
+        await _probe_db()
+    except (psycopg.Error, OSError, asyncio.TimeoutError) as e:
+        # PostGIS was unreachable at startup: go straight to the fallbacks until a probe succeeds
+        _db_breaker.trip(e)
+    if httpx is not None:
+        _http_client = httpx.AsyncClient(
+            timeout=float(os.environ.get("PARCEL_ARCGIS_TIMEOUT", "30")),
+            limits=httpx.Limits(max_connections=int(os.environ.get("PARCEL_ARCGIS_MAX_CONNECTIONS", "100"))),
+        )
+    try:
+        yield
+    finally:
+        pool, _db_pool = _db_pool, None
+        breaker, _db_breaker = _db_breaker, None
+        client, _http_client = _http_client, None
+        cache, _apn_cache = _apn_cache, None
+        await breaker.close()
+        await pool.close()
+        if client is not None:
+            await client.aclose()
+        cache.close()
 
 
 app = FastAPI(
     title="Parcel API",
     description="Query parcels by bbox, point, or APN. GeoJSON FeatureCollection.",
+    lifespan=lifespan,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -90,28 +222,347 @@ app.add_middleware(
 )
 
 
-def get_db_conn():
-    url = os.environ.get("DATABASE_URL")
-    if url:
-        return psycopg2.connect(url)
-    return psycopg2.connect(
-        host=os.environ.get("PARCEL_DB_HOST", "localhost"),
-        port=os.environ.get("PARCEL_DB_PORT", "5432"),
-        dbname=os.environ.get("PARCEL_DB_NAME", "parcel_db"),
-        user=os.environ.get("PARCEL_DB_USER", "postgres"),
-        password=os.environ.get("PARCEL_DB_PASSWORD", ""),
-    )
+async def _getconn():
+    """Pooled connection, timing the wait and marking the request's source (postgis, or demo on failure).
 
+    Fails fast with CircuitOpen while the breaker is open. A pool timeout counts toward tripping
+    it only when the pool's workers failed to connect during the wait; otherwise PostGIS is up,
+    just busy.
+    """
+    pool, breaker = _db_pool, _db_breaker
+    try:
+        if pool is None:
+            raise psycopg.OperationalError("connection pool is not initialized")
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpen("PostGIS circuit breaker is open")
+        connect_errors = pool.get_stats().get("connections_errors", 0)
+        with metrics.phase("db_wait"):
+            conn = await pool.getconn()
+    except CircuitOpen:
+        metrics.set_source("demo")
+        raise
+    except PoolTimeout as e:
+        metrics.set_source("demo")
+        if breaker is not None and pool.get_stats().get("connections_errors", 0) > connect_errors:
+            breaker.record_failure(e)
+        raise
+    except psycopg.OperationalError as e:
+        metrics.set_source("demo")
+        if breaker is not None:
+            breaker.record_failure(e)
+        raise
+    if breaker is not None:
+        breaker.record_success()
+    metrics.set_source("postgis")
+    return conn
 
-@contextmanager
-def db_cursor():
-    conn = get_db_conn()
+
+def _release_failed(conn):
+    """A connection that broke mid-query (server gone, network) counts as a breaker failure."""
+    if conn.broken and _db_breaker is not None:
+        _db_breaker.record_failure(psycopg.OperationalError("connection lost during query"))
+
+
+@asynccontextmanager
+async def db_cursor():
+    """Dict-row cursor on a pooled connection. Raises OperationalError when PostGIS is unavailable."""
+    pool = _db_pool
+    conn = await _getconn()
+    ok = False
+    t0 = time.perf_counter()
     try:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        async with conn.cursor(row_factory=dict_row) as cur:
             yield cur
-        conn.commit()
+        await conn.commit()
+        ok = True
     finally:
-        conn.close()
+        metrics.add_phase("db", time.perf_counter() - t0)
+        if not ok:
+            _release_failed(conn)
+        if not ok and not conn.closed:
+            try:
+                await conn.rollback()
+            except psycopg.Error:
+                pass
+        await pool.putconn(conn)
+
+
+# HTTP caching: GET /parcels* responses get a strong ETag derived from the dataset version
+# (parcels_version.version, bumped by load_parcels_to_postgis.py; the demo file's identity in
+# demo mode) and the request's path and query. A matching If-None-Match is answered with 304
+# before the endpoint runs, so a repeat viewport costs no query.
+DATA_VERSION_TTL = float(os.environ.get("PARCEL_DATA_VERSION_TTL", "10"))
+CACHE_CONTROL = os.environ.get("PARCEL_CACHE_CONTROL", "public, max-age=60")
+_data_version_cache = {"value": None, "checked_at": 0.0}
+_etag_stats = {"tagged": 0, "not_modified": 0}
+
+
+async def _data_version() -> str:
+    """Current dataset version, re-read from PostGIS at most every PARCEL_DATA_VERSION_TTL seconds."""
+    now = time.monotonic()
+    if _data_version_cache["value"] is not None and now - _data_version_cache["checked_at"] < DATA_VERSION_TTL:
+        return _data_version_cache["value"]
+    try:
+        async with db_cursor() as cur:
+            await cur.execute("SELECT version FROM parcels_version")
+            row = await cur.fetchone()
+        value = f"db-{row['version'] if row else 0}"
+    except psycopg.errors.UndefinedTable:
+        value = "db-0"  # table loaded before versioning; run the loader with --migrate
+    except psycopg.OperationalError:
+        value = _demo_version
+    _data_version_cache.update(value=value, checked_at=now)
+    return value
+
+
+# Columns added by `load_parcels_to_postgis.py --migrate`, with the equivalent expression used on
+# tables loaded before them (a full scan instead of an index lookup, but the same answer)
+_MIGRATED_COLUMNS = {
+    "apn_norm": "REGEXP_REPLACE({p}apn, '[^0-9]', '', 'g')",
+    "address_norm": "BTRIM(REGEXP_REPLACE(LOWER({p}address), '[^0-9a-z]+', ' ', 'g'))",
+}
+_parcel_columns_cache = {"value": None, "checked_at": 0.0}
+
+
+async def _parcel_columns() -> frozenset:
+    """Column names of the parcels table, re-read at most every PARCEL_DATA_VERSION_TTL seconds."""
+    now = time.monotonic()
+    if _parcel_columns_cache["value"] is not None and now - _parcel_columns_cache["checked_at"] < DATA_VERSION_TTL:
+        return _parcel_columns_cache["value"]
+    async with db_cursor() as cur:
+        await cur.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = 'parcels' AND table_schema = ANY(current_schemas(false))"
+        )
+        value = frozenset(r["column_name"] for r in await cur.fetchall())
+    _parcel_columns_cache.update(value=value, checked_at=now)
+    return value
+
+
+async def _column_sql(name: str, alias: str = None) -> str:
+    """SQL for a migrated column: the column itself when the table has it, else its expression."""
+    prefix = f"{alias}." if alias else ""
+    if name in await _parcel_columns():
+        return prefix + name
+    return _MIGRATED_COLUMNS[name].format(p=prefix)
+
+
+def _etag_match(if_none_match: str, etag: str):
+    """The If-None-Match tag that matches etag, or None. Weak comparison: W/ prefixes are
+    ignored; * matches anything.
+
+    The encoding suffix added by the compression middleware ("...-gzip") is ignored for the
+    comparison but kept in the returned tag, so a 304 carries the ETag the client's 200 had.
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*":
+            return etag
+        base = tag
+        for coding in ("-gzip", "-br"):
+            if base.endswith(coding + '"'):
+                base = base[:-len(coding) - 1] + '"'
+        if base == etag:
+            return tag
+    return None
+
+
+# Routes whose features are not parcels (grid cells, tiles) are always GeoJSON/MVT; the export
+# takes its format from ?format= instead of Accept
+_GEOJSON_ONLY_PATHS = ("/parcels/aggregate", "/parcels/tiles/", "/parcels/export")
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    if request.method != "GET" or not request.url.path.startswith("/parcels"):
+        formats.set_current(formats.GEOJSON)
+        return await call_next(request)
+    fmt = formats.GEOJSON
+    if not request.url.path.startswith(_GEOJSON_ONLY_PATHS):
+        fmt = formats.negotiate(request.headers.get("accept", ""))
+    formats.set_current(fmt)
+    version = await _data_version()
+    key = fmt + ":" + request.url.path + "?" + urlencode(sorted(request.query_params.multi_items()))
+    etag = '"' + hashlib.sha1(f"{version}|{key}".encode("utf-8")).hexdigest()[:24] + '"'
+    if_none_match = request.headers.get("if-none-match")
+    matched = _etag_match(if_none_match, etag) if if_none_match else None
+    if matched:
+        _etag_stats["not_modified"] += 1
+        metrics.set_source("http_cache")
+        return Response(status_code=304, headers={"ETag": matched, "Cache-Control": CACHE_CONTROL, "Vary": "Accept"})
+    response = await call_next(request)
+    if response.status_code in (200, 204):
+        response.headers["ETag"] = etag
+        response.headers["Vary"] = "Accept"
+        if "cache-control" not in response.headers:
+            response.headers["Cache-Control"] = CACHE_CONTROL
+        _etag_stats["tagged"] += 1
+    return response
+
+
+# Compression: br (when the brotli package is installed) or gzip, per Accept-Encoding. Streamed
+# bodies are compressed chunk by chunk. Sits outside conditional_get so it sees the ETag.
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.environ.get("PARCEL_COMPRESS_MIN_BYTES", "1024")),
+    gzip_level=int(os.environ.get("PARCEL_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.environ.get("PARCEL_BROTLI_QUALITY", "4")),
+)
+
+
+# Per-route latency, phase timers (db_wait, db, arcgis, serialize), answering source, rows and
+# bytes; exported at /metrics and summarized per request in the Server-Timing header. Added
+# last, so it is the outermost middleware and also times 304s.
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    state = metrics.start_request(request.scope)
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - t0
+    if "route" not in request.scope:
+        # Answered before routing (e.g. a 304): label with the route the request would have hit
+        for route in app.router.routes:
+            if route.matches(request.scope)[0] == Match.FULL:
+                request.scope["route"] = route
+                break
+    metrics.finish_request(state, request.method, metrics.route_of(state), response.status_code, elapsed)
+    response.headers["Server-Timing"] = metrics.server_timing(state, elapsed)
+    return response
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text-format metrics: request/phase histograms plus pool, cache and HTTP cache gauges."""
+    extra = []
+    if _db_pool is not None:
+        extra.extend(metrics.gauge_lines(
+            "parcel_api_db_pool", "Connection pool counters and gauges (see /stats).",
+            {k: v for k, v in _db_pool.get_stats().items() if isinstance(v, (int, float))}, label="stat",
+        ))
+    if _apn_cache is not None:
+        extra.extend(metrics.gauge_lines(
+            "parcel_api_apn_cache", "By-APN cache counters and size.",
+            {k: v for k, v in _apn_cache.stats().items() if isinstance(v, (int, float)) and not isinstance(v, bool)},
+            label="stat",
+        ))
+    if _db_breaker is not None:
+        snap = _db_breaker.snapshot()
+        extra.extend(metrics.gauge_lines(
+            "parcel_api_db_breaker_open", "1 while the PostGIS circuit breaker is open or probing.",
+            {None: 0 if snap["state"] == "closed" else 1},
+        ))
+        extra.extend(metrics.gauge_lines(
+            "parcel_api_db_breaker", "PostGIS circuit breaker counters (trips, rejected, probes, probe_failures, probe_errors).",
+            {k: snap[k] for k in ("trips", "rejected", "probes", "probe_failures", "probe_errors")}, label="stat",
+        ))
+    extra.extend(metrics.gauge_lines(
+        "parcel_api_http_cache", "Responses tagged with an ETag and answered 304.", _etag_stats, label="stat",
+    ))
+    return Response(content=metrics.render(extra), media_type=metrics.CONTENT_TYPE)
+
+
+# Rows fetched per round-trip from server-side (streaming) cursors
+DB_STREAM_BATCH = int(os.environ.get("PARCEL_DB_STREAM_BATCH", "500"))
+
+
+async def db_stream(sql: str, params, batch_size: int = DB_STREAM_BATCH):
+    """Run sql on a server-side cursor; return an async iterator of dict-row batches.
+
+    Connection and query errors raise here, before any response has started, so callers
+    can still fall back to demo data. The pooled connection is held until the iterator is
+    exhausted or closed.
+    """
+    pool = _db_pool
+    conn = await _getconn()
+    cur = conn.cursor(name="parcel_api_stream", row_factory=dict_row)
+
+    async def release(ok):
+        if not ok:
+            _release_failed(conn)
+        try:
+            await cur.close()
+            if ok:
+                await conn.commit()
+            else:
+                await conn.rollback()
+        except psycopg.Error:
+            pass
+        await pool.putconn(conn)
+
+    try:
+        with metrics.phase("db"):
+            await cur.execute(sql, params)
+            first = await cur.fetchmany(batch_size)
+    except BaseException:
+        await release(False)
+        raise
+
+    async def batches():
+        ok = False
+        try:
+            rows = first
+            while rows:
+                yield rows
+                if len(rows) < batch_size:
+                    break
+                rows = await cur.fetchmany(batch_size)
+            ok = True
+        finally:
+            await release(ok)
+
+    return batches()
+
+
+async def db_copy(sql: str, params, chunk_bytes: int = 65536):
+    """Run `COPY (...) TO STDOUT`; return an async iterator of output chunks of about chunk_bytes.
+
+    Like db_stream, errors raise before the first chunk so callers can fall back. Rows go from
+    the server to the client without being parsed; an abandoned copy is cancelled on the server.
+    """
+    pool = _db_pool
+    conn = await _getconn()
+
+    async def chunks():
+        ok = False
+        try:
+            async with conn.cursor() as cur:
+                async with cur.copy(sql, params) as copy:
+                    yield b""  # COPY started
+                    buf = bytearray()
+                    async for data in copy:
+                        buf += data
+                        if len(buf) >= chunk_bytes:
+                            yield bytes(buf)
+                            buf.clear()
+                    if buf:
+                        yield bytes(buf)
+            await conn.commit()
+            ok = True
+        finally:
+            discard = False
+            if not ok:
+                _release_failed(conn)
+                try:
+                    await conn.rollback()
+                except psycopg.Error:
+                    discard = True
+            if discard:
+                await conn.close()
+            await pool.putconn(conn)
+
+    it = chunks()
+    with metrics.phase("db"):
+        await it.__anext__()
+    return it
+
+
+async def _row_pairs(batches):
+    """(properties, geometry) batches from DB row batches; geometry stays raw ST_AsGeoJSON text."""
+    async for rows in batches:
+        yield [(r, r.pop("geometry", None)) for r in rows]
 
 
 def row_to_feature(r):
@@ -119,90 +570,1037 @@ def row_to_feature(r):
     return {"type": "Feature", "properties": dict(r), "geometry": geom}
 
 
+# Per-route response size and serialization time (reported at /stats)
+_response_stats = {}
+
+
+def _record_response(route: str, nbytes: int, serialize_seconds: float, rows: int = None, streamed: bool = False):
+    metrics.observe_response(nbytes, rows, serialize_seconds if streamed else None)
+    if not streamed:
+        metrics.add_phase("serialize", serialize_seconds)
+    st = _response_stats.setdefault(route, {
+        "responses": 0, "bytes_total": 0, "bytes_max": 0, "serialize_seconds_total": 0.0,
+    })
+    st["responses"] += 1
+    st["bytes_total"] += nbytes
+    st["bytes_max"] = max(st["bytes_max"], nbytes)
+    st["serialize_seconds_total"] += serialize_seconds
+
+
+def _features_response(route: str, features: list, extra: dict = None, fields=None) -> Response:
+    """FeatureCollection for a short feature list (geometry may be raw GeoJSON text or a dict).
+
+    extra holds additional top-level members, written after the features (GeoJSON only).
+    Other formats negotiated from Accept (see formats.py) are encoded from the same features,
+    with columns for `fields` (a projection's parcel fields; default all).
+    """
+    fmt = formats.current()
+    t0 = time.perf_counter()
+    if fmt != formats.GEOJSON:
+        body = formats.encode(fmt, [(f.get("properties"), f.get("geometry")) for f in features], fields)
+        _record_response(route, len(body), time.perf_counter() - t0, rows=len(features))
+        return Response(content=body, media_type=formats.MEDIA_TYPES[fmt])
+    body = b"".join((
+        b'{"type":"FeatureCollection","features":[',
+        b",".join(geojson_stream.encode_feature(f.get("properties"), f.get("geometry")) for f in features),
+        b"]",
+        b"".join(b"," + geojson_stream.dumps(k) + b":" + geojson_stream.dumps(v) for k, v in (extra or {}).items()),
+        b"}",
+    ))
+    elapsed = time.perf_counter() - t0
+    _record_response(route, len(body), elapsed, rows=len(features))
+    return Response(content=body, media_type="application/json")
+
+
+def _feature_collection_response(route: str, batches, headers=None, trailer=None, fields=None) -> StreamingResponse:
+    """Stream (properties, geometry) batches as a FeatureCollection, recording size and encode time.
+
+    In a format other than GeoJSON the trailer's members (pagination token, summary) are not written.
+    """
+    def done(nbytes, seconds, count):
+        _record_response(route, nbytes, seconds, rows=count, streamed=True)
+
+    fmt = formats.current()
+    if fmt != formats.GEOJSON:
+        return StreamingResponse(
+            formats.stream(fmt, batches, on_complete=done, fields=fields),
+            media_type=formats.MEDIA_TYPES[fmt], headers=headers,
+        )
+    return StreamingResponse(
+        geojson_stream.feature_collection_chunks(batches, on_complete=done, trailer=trailer),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def _simplification(zoom, tolerance):
+    """(tolerance in degrees, decimal digits) for a map zoom or explicit tolerance; (None, None) = full detail."""
+    if tolerance is None and zoom is None:
+        return None, None
+    if tolerance is None:
+        # Half a screen pixel of a 256px web map tile at this zoom
+        tolerance = 360.0 / (256 * 2 ** zoom) / 2
+    # One decimal digit finer than the tolerance
+    digits = max(0, min(15, math.ceil(-math.log10(tolerance)) + 1)) if tolerance > 0 else None
+    return tolerance, digits
+
+
+def _projection(
+    fields: str = Query(None, description="Comma-separated properties to return, e.g. apn,owner,acres (default: all)"),
+    geometry: str = Query("full", description="full | simplified | centroid | bbox | none"),
+) -> Projection:
+    """?fields= and ?geometry= shared by the parcel endpoints (see projection.py)."""
+    try:
+        return Projection.parse(fields, geometry)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/")
-def root():
+async def root():
     return {
         "message": "Parcel API",
         "docs": "/docs",
         "endpoints": {
             "parcels_bbox": "GET /parcels?min_lon=&min_lat=&max_lon=&max_lat=",
             "parcels_point": "GET /parcels/point?lat=&lon=",
+            "parcels_nearest": "GET /parcels/nearest?lat=&lon=&k=&max_distance=",
             "parcels_by_apn": "GET /parcels/by-apn?apn=&state=&county=",
+            "parcels_search": "GET /parcels/search?q=&state=&county=&limit=",
+            "parcels_by_owner": "GET /parcels/by-owner?owner=&state=&county=",
+            "parcels_by_apn_batch": "POST /parcels/by-apn/batch",
+            "parcels_within": "POST /parcels/within",
+            "parcels_export": "GET /parcels/export?state=&county=&format=csv|geojsonseq|flatgeobuf",
+            "parcels_aggregate": "GET /parcels/aggregate?min_lon=&min_lat=&max_lon=&max_lat=&cell=",
+            "parcels_tiles": "GET /parcels/tiles/{z}/{x}/{y}.mvt",
+            "stats": "GET /stats",
+            "metrics": "GET /metrics",
+            "health": "GET /health",
+            "ready": "GET /health/ready",
         },
     }
 
 
-def _demo_bbox(min_lon: float, min_lat: float, max_lon: float, max_lat: float, limit: int):
-    """Return demo features whose geometry intersects the bbox."""
-    b = (min_lon, min_lat, max_lon, max_lat)
+@app.get("/stats")
+async def stats():
+    """Runtime counters: connection pool, response sizes/serialization times, by-apn cache hits/misses."""
+    return {
+        "db_pool": _db_pool.get_stats() if _db_pool is not None else None,
+        "db_breaker": _db_breaker.snapshot() if _db_breaker is not None else None,
+        "responses": _response_stats,
+        "apn_cache": _apn_cache.stats() if _apn_cache is not None else None,
+        "arcgis_layers": {url: info for url, (info, _) in _arcgis_layer_info.items()},
+        "http_cache": {"data_version": _data_version_cache["value"], **_etag_stats},
+    }
+
+
+def _health() -> dict:
+    postgis = _db_breaker.snapshot() if _db_breaker is not None else None
+    postgis_up = postgis is not None and postgis["state"] == "closed"
+    return {
+        "status": "ok" if postgis_up else ("degraded" if _demo_features else "unavailable"),
+        "postgis": postgis,
+        "fallbacks": {
+            "demo_features": len(_demo_features),
+            "arcgis": bool(os.environ.get("PARCEL_ARCGIS_LAYER_URL", "").strip()) and httpx is not None,
+        },
+    }
+
+
+@app.get("/health")
+async def health():
+    """Liveness: always 200 while the process serves requests, with PostGIS breaker state and fallbacks."""
+    return _health()
+
+
+@app.get("/health/ready")
+async def ready():
+    """Readiness: 200 while PostGIS is up or demo data can answer in its place, else 503."""
+    body = _health()
+    return Response(
+        content=geojson_stream.dumps(body), media_type="application/json",
+        status_code=503 if body["status"] == "unavailable" else 200,
+    )
+
+
+def _demo_bbox_page(min_lon: float, min_lat: float, max_lon: float, max_lat: float, limit: int,
+                    tolerance: float = None, digits: int = None, after: int = -1):
+    """Demo features intersecting the bbox after position `after`, in position order.
+
+    Returns (features, last position if more features follow else None).
+    """
+    positions = _demo_index.query((min_lon, min_lat, max_lon, max_lat))
+    start = bisect.bisect_right(positions, after)
+    page = positions[start:start + limit]
     out = []
-    for f in _demo_features:
-        box = _bbox_of_geom(f.get("geometry"))
-        if box and _bbox_intersects(box, b):
-            out.append(f)
-            if len(out) >= limit:
+    for i in page:
+        f = _demo_features[i]
+        if tolerance is not None or digits is not None:
+            f = {**f, "geometry": simplify_geometry(f.get("geometry"), tolerance, digits)}
+        out.append(f)
+    more = len(positions) > start + limit
+    return out, (page[-1] if more and page else None)
+
+
+def _demo_bbox(min_lon: float, min_lat: float, max_lon: float, max_lat: float, limit: int,
+               tolerance: float = None, digits: int = None):
+    """Return demo features whose geometry intersects the bbox, optionally simplified/rounded."""
+    return _demo_bbox_page(min_lon, min_lat, max_lon, max_lat, limit, tolerance, digits)[0]
+
+
+# Keyset pagination: the opaque cursor carries the last key (parcels.id, or the feature's
+# position in demo mode), the source it came from, and a fingerprint of the query it belongs to.
+def _query_fingerprint(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def _encode_cursor(key: int, source: str, fingerprint: str) -> str:
+    raw = json.dumps({"k": key, "s": source, "q": fingerprint}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(token: str, fingerprint: str):
+    """(last key, source that issued the cursor: "db" or "demo"); 400 if malformed or for another query.
+
+    PostGIS ids and demo positions are different key spaces, so a cursor is only ever continued
+    by the source that issued it.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        key = int(data["k"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("q") != fingerprint:
+        raise HTTPException(status_code=400, detail="Cursor does not match this query")
+    if data.get("s") not in ("db", "demo"):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key, data["s"]
+
+
+async def _keyset_pairs(batches, limit: int, state: dict):
+    """(properties, geometry) batches for at most `limit` rows; records the last id and whether more follow."""
+    emitted = 0
+    async for rows in batches:
+        out = []
+        for r in rows:
+            if emitted >= limit:
+                state["more"] = True
                 break
-    return out
+            state["last"] = r.pop("id")
+            out.append((r, r.pop("geometry", None)))
+            emitted += 1
+        if out:
+            yield out
 
 
 @app.get("/parcels")
-def parcels_bbox(
+async def parcels_bbox(
     min_lon: float = Query(..., description="Min longitude"),
     min_lat: float = Query(..., description="Min latitude"),
     max_lon: float = Query(..., description="Max longitude"),
     max_lat: float = Query(..., description="Max latitude"),
-    limit: int = Query(500, le=2000),
+    limit: int = Query(500, ge=1, le=2000),
+    zoom: int = Query(None, ge=0, le=24, description="Map zoom; simplifies geometry to ~half a pixel"),
+    tolerance: float = Query(None, gt=0, description="Simplification tolerance in degrees (overrides zoom)"),
+    cursor: str = Query(None, description="Opaque `next` token from the previous page"),
+    proj: Projection = Depends(_projection),
 ):
-    """Return parcels in a bounding box (GeoJSON FeatureCollection). Uses PostGIS or demo data."""
-    try:
-        with db_cursor() as cur:
-            cur.execute(
-                """
-                SELECT apn, address, owner, acres, legal_desc, market_value, state, county,
-                       ST_AsGeoJSON(geom)::json AS geometry
+    """Return parcels in a bounding box (GeoJSON FeatureCollection). Uses PostGIS or demo data.
+
+    With zoom or tolerance, geometries are simplified (topology-preserving) and coordinates
+    are rounded to the matching number of decimals. Results are ordered by a stable key; when
+    more parcels match, the response's `next` member is a cursor for the following page.
+    """
+    proj = proj.simplified(*_simplification(zoom, tolerance))
+    fingerprint = _query_fingerprint(min_lon, min_lat, max_lon, max_lat)
+    # A cursor stays with the source that issued it: demo pages keep coming from demo data even if
+    # PostGIS is back, and a PostGIS cursor is refused (409) rather than restarted on demo data.
+    after, source = _decode_cursor(cursor, fingerprint) if cursor else (None, None)
+    if source != "demo":
+        try:
+            batches = await db_stream(
+                f"""
+                SELECT id, {proj.select_sql()}
                 FROM parcels
-                WHERE geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
-                LIMIT %s
+                WHERE geom && ST_MakeEnvelope(%(min_lon)s, %(min_lat)s, %(max_lon)s, %(max_lat)s, 4326)
+                  AND id > %(after)s
+                ORDER BY id
+                LIMIT %(limit)s
                 """,
-                (min_lon, min_lat, max_lon, max_lat, limit),
+                {
+                    "min_lon": min_lon, "min_lat": min_lat, "max_lon": max_lon, "max_lat": max_lat,
+                    "after": after if after is not None else 0, "limit": limit + 1,
+                },
             )
-            rows = cur.fetchall()
-        features = [row_to_feature(dict(r)) for r in rows]
-    except psycopg2.OperationalError:
-        features = _demo_bbox(min_lon, min_lat, max_lon, max_lat, limit)
-    return {"type": "FeatureCollection", "features": features}
+            state = {}
+
+            def trailer():
+                more = state.get("more")
+                return {"next": _encode_cursor(state["last"], "db", fingerprint) if more else None}
+
+            return _feature_collection_response(
+                "parcels_bbox", _keyset_pairs(batches, limit, state), trailer=trailer, fields=proj.fields,
+            )
+        except psycopg.OperationalError:
+            if source == "db":
+                raise HTTPException(
+                    status_code=409, detail="PostGIS, which issued this cursor, is unavailable; restart paging",
+                )
+    else:
+        metrics.set_source("demo")
+    features, last = _demo_bbox_page(
+        min_lon, min_lat, max_lon, max_lat, limit, after=after if after is not None else -1,
+    )
+    pairs = [(f["properties"], f["geometry"]) for f in map(proj.feature, features)]
+    next_cursor = _encode_cursor(last, "demo", fingerprint) if last is not None else None
+    return _feature_collection_response(
+        "parcels_bbox", geojson_stream.iter_batches(pairs), trailer=lambda: {"next": next_cursor}, fields=proj.fields,
+    )
+
+
+def _demo_point(lon: float, lat: float, limit: int):
+    """Return demo features whose polygon contains the point (bbox index, then exact ray casting)."""
+    candidates = _demo_index.query((lon, lat, lon, lat))
+    return [_demo_features[i] for i in _demo_polygons.contains(lon, lat, candidates)[:limit]]
 
 
 @app.get("/parcels/point")
-def parcels_point(
+async def parcels_point(
     lat: float = Query(..., description="Latitude"),
     lon: float = Query(..., description="Longitude"),
-    limit: int = Query(5, le=20),
+    limit: int = Query(5, ge=1, le=20),
+    proj: Projection = Depends(_projection),
 ):
     """Return parcel(s) at a point (point-in-polygon). Uses PostGIS or demo data."""
     try:
-        with db_cursor() as cur:
-            cur.execute(
-                """
-                SELECT apn, address, owner, acres, legal_desc, market_value, state, county,
-                       ST_AsGeoJSON(geom)::json AS geometry
+        async with db_cursor() as cur:
+            await cur.execute(
+                f"""
+                SELECT {proj.select_sql()}
                 FROM parcels
                 WHERE ST_Contains(geom, ST_SetSRID(ST_MakePoint(%s, %s), 4326))
                 LIMIT %s
                 """,
                 (lon, lat, limit),
             )
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
         features = [row_to_feature(dict(r)) for r in rows]
-    except psycopg2.OperationalError:
-        # Demo: return parcels whose bbox contains the point (simple containment)
-        features = _demo_bbox(lon - 0.001, lat - 0.001, lon + 0.001, lat + 0.001, limit)
-    return {"type": "FeatureCollection", "features": features}
+    except psycopg.OperationalError:
+        features = [proj.feature(f) for f in _demo_point(lon, lat, limit)]
+    return _features_response("parcels_point", features, fields=proj.fields)
 
 
-def _normalize_apn(s: str) -> str:
-    """Strip non-digits so 11-444-000-40007 and 1144400040007 match."""
-    return "".join(c for c in (s or "") if c.isdigit())
+# Nearest parcels: distances in meters on a local equirectangular approximation (demo) or
+# the geography type (PostGIS). KNN ordering in PostGIS is by planar degrees, so a few extra
+# candidates are ranked by true distance before the top k are kept.
+_METERS_PER_DEGREE = 6371008.8 * math.pi / 180
+NEAREST_CANDIDATE_FACTOR = 4
+
+
+def _demo_nearest(lon: float, lat: float, k: int, max_distance: float = None):
+    """(feature, distance in meters) for the k demo parcels nearest the point, via the R-tree."""
+    x_scale = math.cos(math.radians(lat))
+    hits = _demo_index.nearest(
+        lon, lat, k,
+        lambda positions: _demo_polygons.distances(lon, lat, positions, x_scale),
+        max_distance=max_distance / _METERS_PER_DEGREE if max_distance is not None else None,
+        x_scale=x_scale,
+    )
+    return [(_demo_features[i], d * _METERS_PER_DEGREE) for d, i in hits if not math.isinf(d)]
+
+
+@app.get("/parcels/nearest")
+async def parcels_nearest(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    k: int = Query(5, ge=1, le=50, description="Number of parcels"),
+    max_distance: float = Query(None, gt=0, description="Search radius in meters"),
+    proj: Projection = Depends(_projection),
+):
+    """Return the k parcels nearest a point, closest first, with distance_m in each feature's properties.
+
+    A parcel containing the point has distance 0. Uses the GiST index's KNN operator in PostGIS,
+    or a best-first search of the R-tree in demo mode.
+    """
+    try:
+        async with db_cursor() as cur:
+            # ST_DWithin on geometry keeps the radius filter indexed; degrees are widened by
+            # 1/cos(lat) so the box covers the radius in longitude too.
+            radius_deg, within, in_range = None, "", ""
+            if max_distance is not None:
+                radius_deg = max_distance / _METERS_PER_DEGREE / max(math.cos(math.radians(lat)), 0.01)
+                within = "WHERE ST_DWithin(p.geom, pt.g, %(radius)s)"
+                in_range = "WHERE ST_Distance(c.geom::geography, pt.g::geography) <= %(max_distance)s"
+            await cur.execute(
+                f"""
+                WITH pt AS (SELECT ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326) AS g),
+                candidates AS (
+                    SELECT p.apn, p.address, p.owner, p.acres, p.legal_desc, p.market_value, p.state, p.county,
+                           p.geom
+                    FROM parcels p, pt
+                    {within}
+                    ORDER BY p.geom <-> pt.g
+                    LIMIT %(candidates)s
+                )
+                SELECT {proj.select_sql("c")},
+                       ST_Distance(c.geom::geography, pt.g::geography) AS distance_m
+                FROM candidates c, pt
+                {in_range}
+                ORDER BY distance_m
+                LIMIT %(k)s
+                """,
+                {
+                    "lon": lon, "lat": lat, "k": k, "candidates": k * NEAREST_CANDIDATE_FACTOR,
+                    "radius": radius_deg, "max_distance": max_distance,
+                },
+            )
+            rows = await cur.fetchall()
+        features = []
+        for r in rows:
+            r = dict(r)
+            distance = r.pop("distance_m")
+            f = row_to_feature(r)
+            f["properties"]["distance_m"] = round(float(distance), 2)
+            features.append(f)
+    except psycopg.OperationalError:
+        features = []
+        for f, distance in _demo_nearest(lon, lat, k, max_distance):
+            props = dict(f.get("properties") or {}, distance_m=round(distance, 2))
+            features.append(proj.feature({"type": "Feature", "properties": props, "geometry": f.get("geometry")}))
+    return _features_response("parcels_nearest", features, fields=proj.fields)
+
+
+# Address search / typeahead over address_norm (see load_parcels_to_postgis.py): addresses that
+# start with the query rank first, then pg_trgm word similarity.
+SEARCH_SIMILARITY = float(os.environ.get("PARCEL_SEARCH_SIMILARITY", "0.5"))
+
+
+def _demo_search(q: str, limit: int, state: str = None, county: str = None):
+    """(feature, score) for the best demo address matches, via the in-memory address index."""
+    out = []
+    # Over-fetch when filtering so a state/county filter still fills the page
+    fetch = limit if not (state or county) else limit * 20
+    for score, i in _demo_address_index.search(q, fetch, SEARCH_SIMILARITY):
+        props = _demo_features[i].get("properties") or {}
+        if state and (props.get("state") or "").strip().upper() != state.strip().upper():
+            continue
+        if county and (props.get("county") or "").strip().lower() != county.strip().lower():
+            continue
+        out.append((_demo_features[i], score))
+        if len(out) >= limit:
+            break
+    return out
+
+
+@app.get("/parcels/search")
+async def parcels_search(
+    q: str = Query(..., min_length=1, max_length=200, description="Address or the start of one"),
+    state: str = Query(None),
+    county: str = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    proj: Projection = Depends(_projection),
+):
+    """Address search for typeahead: ranked prefix and fuzzy matches, with a score property (0-1)."""
+    norm = normalize_address(q)
+    if not norm:
+        return _features_response("parcels_search", [], fields=proj.fields)
+    try:
+        filters = ""
+        if state:
+            filters += " AND state = %(state)s"
+        if county:
+            filters += " AND county = %(county)s"
+        address_norm = await _column_sql("address_norm")
+        # pg_trgm and the trigram index come with the address_norm migration; before it, prefix matches only
+        fuzzy = address_norm == "address_norm"
+        if fuzzy:
+            score = f"CASE WHEN {address_norm} LIKE %(prefix)s THEN 1.0 ELSE word_similarity(%(q)s, {address_norm}) END"
+            match = f"({address_norm} LIKE %(prefix)s OR %(q)s <%% {address_norm})"
+        else:
+            score, match = "1.0", f"{address_norm} LIKE %(prefix)s"
+        async with db_cursor() as cur:
+            # <% (word similarity) and LIKE 'prefix%' are both answered by the trigram GIN index
+            if fuzzy:
+                await cur.execute(
+                    "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", (str(SEARCH_SIMILARITY),),
+                )
+            await cur.execute(
+                f"""
+                SELECT {proj.select_sql()}, {score} AS score
+                FROM parcels
+                WHERE {match}{filters}
+                ORDER BY score DESC, length({address_norm}), {address_norm}
+                LIMIT %(limit)s
+                """,
+                {
+                    "q": norm, "prefix": norm + "%",
+                    "state": state, "county": county, "limit": limit,
+                },
+            )
+            rows = await cur.fetchall()
+        features = []
+        for r in rows:
+            r = dict(r)
+            score = float(r.pop("score"))
+            f = row_to_feature(r)
+            f["properties"]["score"] = round(score, 3)
+            features.append(f)
+    except psycopg.OperationalError:
+        features = []
+        for f, score in _demo_search(norm, limit, state, county):
+            props = dict(f.get("properties") or {}, score=round(score, 3))
+            features.append(proj.feature({"type": "Feature", "properties": props, "geometry": f.get("geometry")}))
+    return _features_response("parcels_search", features, fields=proj.fields)
+
+
+# Owner portfolios: parcels sharing a normalized owner key (owners.py), largest value first,
+# with totals over the whole portfolio even when the feature list is limited.
+def _portfolio_summary(key: str, parcels: int, acres, market_value) -> dict:
+    return {
+        "owner_key": key,
+        "summary": {
+            "parcels": parcels,
+            "acres": round(float(acres or 0), 4),
+            "market_value": round(float(market_value or 0), 2),
+        },
+    }
+
+
+def _demo_by_owner(key: str, limit: int, state: str = None, county: str = None):
+    """(features, summary) for a demo owner portfolio, via the owner key index."""
+    matches = []
+    for i in _demo_owner_index.get(key, ()):
+        props = _demo_features[i].get("properties") or {}
+        if state and (props.get("state") or "").strip().upper() != state.strip().upper():
+            continue
+        if county and (props.get("county") or "").strip().lower() != county.strip().lower():
+            continue
+        matches.append(_demo_features[i])
+    acres = sum(float(f["properties"].get("acres") or 0) for f in matches)
+    value = sum(float(f["properties"].get("market_value") or 0) for f in matches)
+    matches.sort(key=lambda f: (-float(f["properties"].get("market_value") or 0), str(f["properties"].get("apn") or "")))
+    return matches[:limit], _portfolio_summary(key, len(matches), acres, value)
+
+
+async def _db_by_owner_scan(key: str, limit: int, state: str, county: str, proj: Projection):
+    """(features, summary) on a parcels table without the owner_key column (loaded before the migration).
+
+    owner_key has no SQL equivalent, so owners containing every key word are scanned and keyed in
+    Python: the same answer as the indexed query, at the cost of a full scan.
+    """
+    filters = ""
+    if state:
+        filters += " AND state = %(state)s"
+    if county:
+        filters += " AND county = %(county)s"
+    async with db_cursor() as cur:
+        await cur.execute(
+            f"""
+            SELECT {proj.select_sql()},
+                   owner AS sort_owner, apn AS sort_apn, acres AS sort_acres, market_value AS sort_value
+            FROM parcels
+            WHERE REGEXP_REPLACE(UPPER(owner), '[^A-Z0-9]+', '', 'g') LIKE ALL(%(patterns)s){filters}
+            """,
+            {"patterns": ["%" + w + "%" for w in key.split()], "state": state, "county": county},
+        )
+        rows = [dict(r) for r in await cur.fetchall() if owner_key(r["sort_owner"]) == key]
+    acres = sum(float(r["sort_acres"] or 0) for r in rows)
+    value = sum(float(r["sort_value"] or 0) for r in rows)
+    rows.sort(key=lambda r: (-float(r["sort_value"] or 0), str(r["sort_apn"] or "")))
+    features = []
+    for r in rows[:limit]:
+        for k in ("sort_owner", "sort_apn", "sort_acres", "sort_value"):
+            del r[k]
+        features.append(row_to_feature(r))
+    return features, _portfolio_summary(key, len(rows), acres, value)
+
+
+async def _portfolio_pairs(batches, state: dict):
+    """(properties, geometry) batches; moves the window totals from the first row into state."""
+    async for rows in batches:
+        out = []
+        for r in rows:
+            state["parcels"] = r.pop("total_parcels")
+            state["acres"] = r.pop("total_acres")
+            state["market_value"] = r.pop("total_market_value")
+            out.append((r, r.pop("geometry", None)))
+        yield out
+
+
+@app.get("/parcels/by-owner")
+async def parcels_by_owner(
+    owner: str = Query(..., min_length=1, description="Owner name; matched on its normalized key"),
+    state: str = Query(None),
+    county: str = Query(None),
+    limit: int = Query(1000, ge=1, le=10000),
+    proj: Projection = Depends(_projection),
+):
+    """Everything an owner holds: parcels (highest market value first) plus portfolio totals.
+
+    The response is a FeatureCollection with extra `owner_key` and `summary` members
+    (parcel count, acres and market value over the whole portfolio, not just this page).
+    """
+    key = owner_key(owner)
+    if not key:
+        raise HTTPException(status_code=400, detail="Owner name has no identifying words")
+    try:
+        if "owner_key" not in await _parcel_columns():
+            features, summary = await _db_by_owner_scan(key, limit, state, county, proj)
+            pairs = [(f["properties"], f["geometry"]) for f in features]
+            return _feature_collection_response(
+                "parcels_by_owner", geojson_stream.iter_batches(pairs), trailer=lambda: summary, fields=proj.fields,
+            )
+        filters = ""
+        if state:
+            filters += " AND state = %(state)s"
+        if county:
+            filters += " AND county = %(county)s"
+        batches = await db_stream(
+            f"""
+            SELECT {proj.select_sql()},
+                   count(*) OVER () AS total_parcels,
+                   sum(acres) OVER () AS total_acres,
+                   sum(market_value) OVER () AS total_market_value
+            FROM parcels
+            WHERE owner_key = %(key)s{filters}
+            ORDER BY market_value DESC NULLS LAST, apn
+            LIMIT %(limit)s
+            """,
+            {"key": key, "state": state, "county": county, "limit": limit},
+        )
+        totals = {}
+
+        def trailer():
+            return _portfolio_summary(key, totals.get("parcels", 0), totals.get("acres"), totals.get("market_value"))
+
+        return _feature_collection_response(
+            "parcels_by_owner", _portfolio_pairs(batches, totals), trailer=trailer, fields=proj.fields,
+        )
+    except psycopg.OperationalError:
+        features, summary = _demo_by_owner(key, limit, state, county)
+    pairs = [(f["properties"], f["geometry"]) for f in map(proj.feature, features)]
+    return _feature_collection_response(
+        "parcels_by_owner", geojson_stream.iter_batches(pairs), trailer=lambda: summary, fields=proj.fields,
+    )
+
+
+# Draw-to-select: parcels intersecting (or within) a user-drawn polygon
+WITHIN_MAX_FEATURES = int(os.environ.get("PARCEL_WITHIN_MAX_FEATURES", "50000"))
+WITHIN_MAX_VERTICES = int(os.environ.get("PARCEL_WITHIN_MAX_VERTICES", "10000"))
+
+
+class WithinRequest(BaseModel):
+    geometry: dict = Field(..., description="GeoJSON Polygon or MultiPolygon (or a Feature with one), lon/lat")
+    mode: Literal["intersects", "within"] = "intersects"
+    limit: int = Field(10000, ge=1, le=WITHIN_MAX_FEATURES)
+
+
+def _selection_region(geometry: dict) -> dict:
+    """Validated Polygon/MultiPolygon from a request body; rings are closed if the client left them open."""
+    if geometry.get("type") == "Feature":
+        geometry = geometry.get("geometry") or {}
+    if geometry.get("type") not in ("Polygon", "MultiPolygon"):
+        raise HTTPException(status_code=400, detail="geometry must be a GeoJSON Polygon or MultiPolygon")
+    polygons = []
+    vertices = 0
+    try:
+        for rings in polygons_of(geometry):
+            if not rings:
+                raise ValueError("a polygon needs at least one ring")
+            out = []
+            for ring in rings:
+                ring = [[float(c[0]), float(c[1])] for c in ring]
+                if ring and ring[0] != ring[-1]:
+                    ring.append(ring[0])
+                if len(ring) < 4:
+                    raise ValueError("a ring needs at least 3 distinct positions")
+                if not all(-180 <= x <= 180 and -90 <= y <= 90 for x, y in ring):
+                    raise ValueError("coordinates must be lon/lat")
+                vertices += len(ring)
+                out.append(ring)
+            polygons.append(out)
+    except (TypeError, ValueError, IndexError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid polygon: {e}")
+    if not polygons:
+        raise HTTPException(status_code=400, detail="geometry has no coordinates")
+    if vertices > WITHIN_MAX_VERTICES:
+        raise HTTPException(status_code=413, detail=f"At most {WITHIN_MAX_VERTICES} vertices per polygon")
+    if geometry["type"] == "Polygon":
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def _selection_summary(mode: str, parcels: int, acres, market_value, returned: int) -> dict:
+    return {
+        "summary": {
+            "mode": mode,
+            "parcels": parcels,
+            "acres": round(float(acres or 0), 4),
+            "market_value": round(float(market_value or 0), 2),
+            "returned": returned,
+            "truncated": returned < parcels,
+        },
+    }
+
+
+def _demo_within(region: dict, mode: str, limit: int):
+    """(features, summary) for demo parcels selected by a polygon: STRtree bbox prefilter, then vectorized tests."""
+    xs = [c[0] for rings in polygons_of(region) for ring in rings for c in ring]
+    ys = [c[1] for rings in polygons_of(region) for ring in rings for c in ring]
+    candidates = _demo_index.query((min(xs), min(ys), max(xs), max(ys)))
+    matches = _demo_polygons.select(PackedPolygons([region]), candidates, mode)
+    props = [_demo_features[i].get("properties") or {} for i in matches]
+    acres = sum(float(p.get("acres") or 0) for p in props)
+    value = sum(float(p.get("market_value") or 0) for p in props)
+    features = [_demo_features[i] for i in matches[:limit]]
+    return features, _selection_summary(mode, len(matches), acres, value, len(features))
+
+
+@app.post("/parcels/within")
+async def parcels_within(body: WithinRequest, proj: Projection = Depends(_projection)):
+    """Parcels intersecting (mode=intersects) or inside (mode=within) a drawn polygon, streamed.
+
+    The FeatureCollection ends with a `summary` member: parcel count, acres and market value
+    over the whole selection (not just the `limit` returned), and whether it was truncated.
+    """
+    region = _selection_region(body.geometry)
+    predicate = "ST_Within" if body.mode == "within" else "ST_Intersects"
+    try:
+        batches = await db_stream(
+            f"""
+            WITH region AS (
+                SELECT ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(%(region)s), 4326)) AS g
+            ),
+            hits AS (
+                SELECT p.id, p.acres, p.market_value
+                FROM parcels p, region
+                WHERE p.geom && region.g AND {predicate}(p.geom, region.g)
+            ),
+            page AS (
+                SELECT id,
+                       count(*) OVER () AS total_parcels,
+                       sum(acres) OVER () AS total_acres,
+                       sum(market_value) OVER () AS total_market_value
+                FROM hits
+                ORDER BY id
+                LIMIT %(limit)s
+            )
+            SELECT {proj.select_sql("p")},
+                   page.total_parcels, page.total_acres, page.total_market_value
+            FROM page JOIN parcels p ON p.id = page.id
+            ORDER BY p.id
+            """,
+            {"region": json.dumps(region), "limit": body.limit},
+        )
+        totals = {}
+        returned = {"rows": 0}
+
+        async def counted(pairs):
+            async for batch in pairs:
+                returned["rows"] += len(batch)
+                yield batch
+
+        def trailer():
+            return _selection_summary(
+                body.mode, totals.get("parcels", 0), totals.get("acres"), totals.get("market_value"), returned["rows"],
+            )
+
+        return _feature_collection_response(
+            "parcels_within", counted(_portfolio_pairs(batches, totals)), trailer=trailer, fields=proj.fields,
+        )
+    except psycopg.OperationalError:
+        features, summary = _demo_within(region, body.mode, body.limit)
+    pairs = [(f["properties"], f["geometry"]) for f in map(proj.feature, features)]
+    return _feature_collection_response(
+        "parcels_within", geojson_stream.iter_batches(pairs), trailer=lambda: summary, fields=proj.fields,
+    )
+
+
+# Grid aggregates for heatmaps / low-zoom clusters. Each parcel counts toward the cell its
+# bbox center snaps to (ST_SnapToGrid: cells are centered on multiples of the cell size).
+AGGREGATE_MAX_CELLS = int(os.environ.get("PARCEL_AGGREGATE_MAX_CELLS", "10000"))
+AGGREGATE_DEFAULT_CELLS_ACROSS = 64
+
+
+@lru_cache(maxsize=8)
+def _demo_grid(level: int):
+    """Demo aggregates at cell size 2**-level degrees, built once per level.
+
+    Returns (cells sorted by (ix, iy) as (ix, iy, parcels, acres, median_market_value), ix list).
+    """
+    cell = 2.0 ** -level
+    groups = {}
+    for b, f in zip(_demo_bboxes, _demo_features):
+        if b is None:
+            continue
+        key = (math.floor((b[0] + b[2]) / 2 / cell + 0.5), math.floor((b[1] + b[3]) / 2 / cell + 0.5))
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = [0, 0.0, []]
+        props = f.get("properties") or {}
+        g[0] += 1
+        g[1] += float(props.get("acres") or 0)
+        if props.get("market_value") is not None:
+            g[2].append(float(props["market_value"]))
+    cells = sorted(
+        (ix, iy, n, acres, statistics.median(values) if values else None)
+        for (ix, iy), (n, acres, values) in groups.items()
+    )
+    return cells, [c[0] for c in cells]
+
+
+def _demo_aggregate(min_lon: float, min_lat: float, max_lon: float, max_lat: float, cell: float):
+    """Demo grid cells in the bbox, at the precomputed level nearest `cell`. Returns (rows, cell used)."""
+    level = max(-8, min(20, round(-math.log2(cell))))
+    cell = 2.0 ** -level
+    cells, ixs = _demo_grid(level)
+    lo_x, hi_x = math.floor(min_lon / cell + 0.5), math.floor(max_lon / cell + 0.5)
+    lo_y, hi_y = math.floor(min_lat / cell + 0.5), math.floor(max_lat / cell + 0.5)
+    rows = []
+    for k in range(bisect.bisect_left(ixs, lo_x), bisect.bisect_right(ixs, hi_x)):
+        ix, iy, n, acres, median = cells[k]
+        if lo_y <= iy <= hi_y:
+            rows.append({"lon": ix * cell, "lat": iy * cell, "parcels": n, "acres": acres,
+                         "median_market_value": median})
+    return rows, cell
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    formats.GEOJSONSEQ: formats.MEDIA_TYPES[formats.GEOJSONSEQ],
+    formats.FLATGEOBUF: formats.MEDIA_TYPES[formats.FLATGEOBUF],
+}
+
+
+def _csv_rows(rows) -> bytes:
+    out = io.StringIO()
+    csv.writer(out).writerows(rows)
+    return out.getvalue().encode("utf-8")
+
+
+async def _demo_export(state: str, county: str, proj: Projection, batch_size: int = DB_STREAM_BATCH):
+    """Demo parcels in a county, as (properties, geometry) batches built lazily from the loaded features."""
+    state, county = state.strip().upper(), county.strip().lower()
+    batch = []
+    for f in _demo_features:
+        props = f.get("properties") or {}
+        if (props.get("state") or "").strip().upper() != state or (props.get("county") or "").strip().lower() != county:
+            continue
+        f = proj.feature(f)
+        batch.append((f["properties"], f["geometry"]))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _demo_export_csv(state: str, county: str, proj: Projection):
+    columns = proj.csv_columns()
+    yield _csv_rows([columns])
+    async for batch in _demo_export(state, county, proj):
+        yield _csv_rows([
+            [props.get(c) for c in proj.fields] + ([] if proj.geometry == "none" else [geojson_to_wkt(geom)])
+            for props, geom in batch
+        ])
+
+
+async def _counted_chunks(route: str, chunks):
+    """Pass raw chunks through, recording the response size."""
+    total = 0
+    try:
+        async for chunk in chunks:
+            total += len(chunk)
+            yield chunk
+    finally:
+        _record_response(route, total, 0.0, streamed=True)
+
+
+@app.get("/parcels/export")
+async def parcels_export(
+    state: str = Query(..., min_length=1, description="State, e.g. TX"),
+    county: str = Query(..., min_length=1, description="County, e.g. Harris"),
+    format: str = Query("csv", description="csv | geojsonseq | flatgeobuf"),
+    proj: Projection = Depends(_projection),
+):
+    """Stream every parcel in a county as CSV (geometry as WKT), GeoJSON text sequence or FlatGeobuf.
+
+    CSV is PostGIS's own `COPY (...) TO STDOUT` output, passed through in chunks; the other formats
+    encode rows from a server-side cursor batch by batch. Memory stays flat for any county size.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    filename = "_".join(part.strip().replace(" ", "_") for part in (state, county)) + "." + (
+        "geojsons" if format == formats.GEOJSONSEQ else "fgb" if format == formats.FLATGEOBUF else "csv"
+    )
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    params = {"state": state, "county": county}
+    if format == "csv":
+        try:
+            chunks = await db_copy(
+                f"""
+                COPY (
+                    SELECT {proj.csv_select_sql()}
+                    FROM parcels
+                    WHERE state = %(state)s AND county = %(county)s
+                ) TO STDOUT WITH (FORMAT csv, HEADER true)
+                """,
+                params,
+            )
+        except psycopg.OperationalError:
+            chunks = _demo_export_csv(state, county, proj)
+        return StreamingResponse(
+            _counted_chunks("parcels_export", chunks), media_type=EXPORT_FORMATS[format], headers=headers,
+        )
+
+    def done(nbytes, seconds, count):
+        _record_response("parcels_export", nbytes, seconds, rows=count, streamed=True)
+
+    try:
+        batches = _row_pairs(await db_stream(
+            f"""
+            SELECT {proj.select_sql()}
+            FROM parcels
+            WHERE state = %(state)s AND county = %(county)s
+            """,
+            params,
+        ))
+    except psycopg.OperationalError:
+        batches = _demo_export(state, county, proj)
+    return StreamingResponse(
+        formats.stream(format, batches, on_complete=done, fields=proj.fields),
+        media_type=EXPORT_FORMATS[format], headers=headers,
+    )
+
+
+@app.get("/parcels/aggregate")
+async def parcels_aggregate(
+    min_lon: float = Query(..., description="Min longitude"),
+    min_lat: float = Query(..., description="Min latitude"),
+    max_lon: float = Query(..., description="Max longitude"),
+    max_lat: float = Query(..., description="Max latitude"),
+    cell: float = Query(None, gt=0, description="Grid cell size in degrees (default: bbox width / 64)"),
+):
+    """Per-grid-cell parcel count, total acres and median market value in a bbox.
+
+    Returns a FeatureCollection of cell-center Points (ready for a heatmap or cluster layer)
+    and a top-level `cell` member with the cell size used. Demo mode snaps cell to a power
+    of two so it can serve precomputed grids.
+    """
+    if min_lon >= max_lon or min_lat >= max_lat:
+        raise HTTPException(status_code=400, detail="Empty bbox: min_lon/min_lat must be below max_lon/max_lat")
+    if cell is None:
+        cell = max(max_lon - min_lon, max_lat - min_lat) / AGGREGATE_DEFAULT_CELLS_ACROSS
+    cells = math.ceil((max_lon - min_lon) / cell + 1) * math.ceil((max_lat - min_lat) / cell + 1)
+    if cells > AGGREGATE_MAX_CELLS:
+        raise HTTPException(
+            status_code=400, detail=f"Too many cells ({cells}); use a larger cell (max {AGGREGATE_MAX_CELLS})",
+        )
+    try:
+        async with db_cursor() as cur:
+            await cur.execute(
+                """
+                SELECT ST_X(c) AS lon, ST_Y(c) AS lat, count(*) AS parcels, sum(acres) AS acres,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY market_value) AS median_market_value
+                FROM (
+                    SELECT ST_SnapToGrid(
+                               ST_MakePoint((ST_XMin(geom) + ST_XMax(geom)) / 2, (ST_YMin(geom) + ST_YMax(geom)) / 2),
+                               %(cell)s
+                           ) AS c,
+                           acres, market_value
+                    FROM parcels
+                    WHERE geom && ST_MakeEnvelope(%(min_lon)s, %(min_lat)s, %(max_lon)s, %(max_lat)s, 4326)
+                ) s
+                GROUP BY 1, 2
+                """,
+                {"min_lon": min_lon, "min_lat": min_lat, "max_lon": max_lon, "max_lat": max_lat, "cell": cell},
+            )
+            rows = [dict(r) for r in await cur.fetchall()]
+    except psycopg.OperationalError:
+        rows, cell = _demo_aggregate(min_lon, min_lat, max_lon, max_lat, cell)
+    features = []
+    for r in rows:
+        median = r["median_market_value"]
+        features.append({
+            "type": "Feature",
+            "properties": {
+                "parcels": r["parcels"],
+                "acres": round(float(r["acres"] or 0), 4),
+                "median_market_value": round(float(median), 2) if median is not None else None,
+            },
+            "geometry": {"type": "Point", "coordinates": [float(r["lon"]), float(r["lat"])]},
+        })
+    return _features_response("parcels_aggregate", features, extra={"cell": cell})
+
+
+# Vector tiles: normalized attributes only, simplified to ~1 pixel at each zoom
+TILE_ATTRIBUTES = ("apn", "address", "owner", "acres", "legal_desc", "market_value", "state", "county")
+TILE_MIN_ZOOM = int(os.environ.get("PARCEL_TILE_MIN_ZOOM", "10"))
+TILE_MAX_FEATURES = int(os.environ.get("PARCEL_TILE_MAX_FEATURES", "10000"))
+TILE_MAX_AGE = int(os.environ.get("PARCEL_TILE_MAX_AGE", "3600"))
+TILE_SIMPLIFY_PX = float(os.environ.get("PARCEL_TILE_SIMPLIFY_PX", "1.0"))
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+_WEB_MERCATOR_WIDTH_M = 40075016.685578488
+
+
+@lru_cache(maxsize=int(os.environ.get("PARCEL_TILE_CACHE_SIZE", "2048")))
+def _demo_tile(z: int, x: int, y: int) -> bytes:
+    """Encode a demo-mode tile. Demo data is loaded once at startup, so tiles are cached."""
+    min_lon, min_lat, max_lon, max_lat = mvt.tile_bounds(z, x, y)
+    # Pad by the tile buffer so polygons crossing the edge are clipped, not dropped
+    pad_lon = (max_lon - min_lon) * mvt.BUFFER / mvt.EXTENT
+    pad_lat = (max_lat - min_lat) * mvt.BUFFER / mvt.EXTENT
+    features = _demo_bbox(min_lon - pad_lon, min_lat - pad_lat, max_lon + pad_lon, max_lat + pad_lat, TILE_MAX_FEATURES)
+    return mvt.encode_tile(features, z, x, y, attributes=TILE_ATTRIBUTES, tolerance=TILE_SIMPLIFY_PX)
+
+
+@app.get("/parcels/tiles/{z}/{x}/{y}.mvt")
+async def parcels_tile(
+    z: int = PathParam(..., ge=0, le=24, description="Zoom"),
+    x: int = PathParam(..., ge=0),
+    y: int = PathParam(..., ge=0),
+):
+    """Mapbox Vector Tile of parcels (layer "parcels"). Uses PostGIS ST_AsMVT or demo data."""
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    headers = {"Cache-Control": f"public, max-age={TILE_MAX_AGE}"}
+    if z < TILE_MIN_ZOOM:
+        return Response(status_code=204, headers=headers)
+    tolerance_m = _WEB_MERCATOR_WIDTH_M / (2 ** z) / mvt.EXTENT * TILE_SIMPLIFY_PX
+    # Pad the index filter by the tile buffer, as ST_AsMVTGeom keeps geometry that far outside
+    pad_m = _WEB_MERCATOR_WIDTH_M / (2 ** z) * mvt.BUFFER / mvt.EXTENT
+    try:
+        async with db_cursor() as cur:
+            await cur.execute(
+                """
+                WITH bounds AS (
+                    SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS env
+                ),
+                tile AS (
+                    SELECT ST_AsMVTGeom(
+                               ST_SimplifyPreserveTopology(ST_Transform(p.geom, 3857), %(tolerance)s),
+                               bounds.env, %(extent)s, %(buffer)s, true) AS geom,
+                           p.apn, p.address, p.owner, p.acres::float8 AS acres, p.legal_desc,
+                           p.market_value::float8 AS market_value, p.state, p.county
+                    FROM parcels p, bounds
+                    WHERE p.geom && ST_Transform(ST_Expand(bounds.env, %(pad)s), 4326)
+                    LIMIT %(limit)s
+                )
+                SELECT ST_AsMVT(tile.*, 'parcels', %(extent)s, 'geom') AS mvt
+                FROM tile WHERE geom IS NOT NULL
+                """,
+                {
+                    "z": z, "x": x, "y": y, "tolerance": tolerance_m, "pad": pad_m,
+                    "extent": mvt.EXTENT, "buffer": mvt.BUFFER, "limit": TILE_MAX_FEATURES,
+                },
+            )
+            row = await cur.fetchone()
+        data = bytes(row["mvt"]) if row and row["mvt"] else b""
+    except psycopg.OperationalError:
+        data = _demo_tile(z, x, y)
+    if not data:
+        return Response(status_code=204, headers=headers)
+    return Response(content=data, media_type=MVT_MEDIA_TYPE, headers=headers)
 
 
 # ArcGIS: common county field names for APN (try in order)
@@ -244,138 +1642,562 @@ def _normalize_properties(attrs):
     return out
 
 
-def _query_arcgis_by_apn(layer_url: str, apn: str, apn_field: str = None):
-    """Query ArcGIS Feature Server by APN. Returns list of normalized GeoJSON features."""
-    if not requests or not layer_url or not apn or not apn.strip():
+def _get_http_client():
+    """Shared ArcGIS client (created lazily when the app runs without its lifespan, e.g. in scripts)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=float(os.environ.get("PARCEL_ARCGIS_TIMEOUT", "30")))
+    return _http_client
+
+
+# ArcGIS layer metadata (?f=json), fetched once per layer URL: which field holds the APN,
+# its type, maxRecordCount and whether the server can answer in GeoJSON.
+ARCGIS_LAYER_INFO_RETRY_SECONDS = float(os.environ.get("PARCEL_ARCGIS_LAYER_INFO_RETRY", "300"))
+_ARCGIS_STRING_TYPES = {"esriFieldTypeString", "esriFieldTypeGUID", "esriFieldTypeGlobalID"}
+_ARCGIS_NUMERIC_TYPES = {
+    "esriFieldTypeOID", "esriFieldTypeSmallInteger", "esriFieldTypeInteger", "esriFieldTypeBigInteger",
+    "esriFieldTypeSingle", "esriFieldTypeDouble",
+}
+_arcgis_layer_info: dict = {}  # layer URL -> (info or None, fetched_at)
+_arcgis_layer_locks: dict = {}
+
+
+def _parse_arcgis_layer_info(meta: dict, apn_field: str = None):
+    """Pick the APN field and its type from layer metadata. apn_field (env override) wins if present."""
+    fields = {str(f.get("name")).lower(): f for f in meta.get("fields") or [] if f.get("name")}
+    candidates = [apn_field] if apn_field else []
+    candidates += ARCGIS_APN_FIELD_CANDIDATES
+    field = None
+    for c in candidates:
+        f = fields.get(c.lower())
+        if f and (f.get("type") in _ARCGIS_STRING_TYPES or f.get("type") in _ARCGIS_NUMERIC_TYPES):
+            field = f
+            break
+    formats = [s.strip().lower() for s in str(meta.get("supportedQueryFormats") or "").split(",")]
+    return {
+        "apn_field": field.get("name") if field else None,
+        "apn_field_numeric": bool(field) and field.get("type") in _ARCGIS_NUMERIC_TYPES,
+        "max_record_count": meta.get("maxRecordCount"),
+        "supports_geojson": "geojson" in formats,
+        "supports_pagination": bool((meta.get("advancedQueryCapabilities") or {}).get("supportsPagination")),
+        "fields": [f.get("name") for f in meta.get("fields") or []],
+    }
+
+
+async def _get_arcgis_layer_info(client, base: str, apn_field: str = None):
+    """Layer info for base URL, fetched once and cached. Failed fetches are retried after a delay."""
+    cached = _arcgis_layer_info.get(base)
+    now = time.monotonic()
+    if cached and (cached[0] is not None or now - cached[1] < ARCGIS_LAYER_INFO_RETRY_SECONDS):
+        return cached[0]
+    lock = _arcgis_layer_locks.setdefault(base, asyncio.Lock())
+    async with lock:
+        cached = _arcgis_layer_info.get(base)
+        if cached and (cached[0] is not None or time.monotonic() - cached[1] < ARCGIS_LAYER_INFO_RETRY_SECONDS):
+            return cached[0]
+        info = None
+        try:
+            r = await client.get(base, params={"f": "json"})
+            r.raise_for_status()
+            meta = r.json()
+            if not meta.get("error") and meta.get("fields"):
+                info = _parse_arcgis_layer_info(meta, apn_field)
+        except Exception:
+            info = None
+        _arcgis_layer_info[base] = (info, time.monotonic())
+        return info
+
+
+async def _arcgis_query(client, query_url: str, where: str, geojson: bool = True, limit: int = 5,
+                        record_count: bool = False):
+    """Run one ArcGIS query; normalized GeoJSON features, or None if the server returned an error.
+
+    record_count asks the server for at most `limit` rows (needs supportsPagination).
+    """
+    params = {
+        "where": where,
+        "outFields": "*",
+        "returnGeometry": "true",
+        "returnIdsOnly": "false",
+        "outSR": "4326",
+        "f": "geojson" if geojson else "json",
+    }
+    if record_count:
+        params["resultRecordCount"] = str(limit)
+    r = await client.get(query_url, params=params)
+    r.raise_for_status()
+    data = r.json()
+    if data.get("error"):
+        return None
+    out = []
+    if geojson:
+        fc = data if data.get("type") == "FeatureCollection" else {}
+        for f in (fc.get("features") or [])[:limit]:
+            if f.get("type") != "Feature":
+                continue
+            out.append({
+                "type": "Feature",
+                "properties": _normalize_properties(f.get("properties") or {}),
+                "geometry": f.get("geometry"),
+            })
+    else:
+        for f in (data.get("features") or [])[:limit]:
+            out.append({
+                "type": "Feature",
+                "properties": _normalize_properties(f.get("attributes") or {}),
+                "geometry": esri_to_geojson(f.get("geometry")),
+            })
+    return out
+
+
+def _arcgis_apn_literals(apn: str, numeric: bool):
+    """SQL literals an APN may be stored as in a field of the given type (empty if none can match)."""
+    norm_apn = _normalize_apn(apn)
+    if numeric:
+        return [norm_apn] if norm_apn.isdigit() else []
+    values = [apn.strip()]
+    if norm_apn and norm_apn != values[0]:
+        values.append(norm_apn)
+    return ["'" + v.replace("'", "''") + "'" for v in values]
+
+
+def _arcgis_apn_where(field: str, apn: str, numeric: bool):
+    """One correctly typed WHERE clause for an APN, or None if the APN cannot match the field."""
+    literals = _arcgis_apn_literals(apn, numeric)
+    if not literals:
+        return None
+    if numeric:
+        return f"{field} = {literals[0]}"
+    return f"{field} IN ({', '.join(literals)})"
+
+
+# Probing unknown APN fields: concurrent queries, first non-empty answer wins
+ARCGIS_PROBE_CONCURRENCY = int(os.environ.get("PARCEL_ARCGIS_PROBE_CONCURRENCY", "8"))
+ARCGIS_DEADLINE_SECONDS = float(os.environ.get("PARCEL_ARCGIS_DEADLINE", "10"))
+
+
+async def _arcgis_first_match(client, query_url: str, where_clauses: list, gate=None):
+    """Run the queries concurrently (bounded by gate); return the first non-empty result and cancel the rest.
+
+    Returns [] if some query answered without a match, None if every query failed.
+    """
+    gate = gate or asyncio.Semaphore(max(1, ARCGIS_PROBE_CONCURRENCY))
+
+    async def probe(where):
+        async with gate:
+            try:
+                return await _arcgis_query(client, query_url, where)
+            except Exception:
+                return None
+
+    pending = {asyncio.ensure_future(probe(w)) for w in where_clauses}
+    answered = False
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.result():
+                    return task.result()
+                answered = answered or task.result() is not None
+        return [] if answered else None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def _query_arcgis_by_apn(layer_url: str, apn: str, apn_field: str = None):
+    """Query ArcGIS Feature Server by APN. Returns list of normalized GeoJSON features.
+
+    When the layer's metadata names a known APN field, this is a single typed query;
+    otherwise candidate fields are probed concurrently. The whole lookup is bounded by
+    PARCEL_ARCGIS_DEADLINE seconds. Returns [] when the server answered without a match and
+    None when the lookup failed (deadline, HTTP or server error), so failures are not cached.
+    """
+    if not httpx or not layer_url or not apn or not apn.strip():
         return []
+    with metrics.phase("arcgis"):
+        try:
+            return await asyncio.wait_for(_arcgis_lookup_apn(layer_url, apn, apn_field), ARCGIS_DEADLINE_SECONDS)
+        except asyncio.TimeoutError:
+            return None
+
+
+async def _arcgis_lookup_apn(layer_url: str, apn: str, apn_field: str = None, gate=None):
+    """gate bounds concurrent ArcGIS requests; batch lookups share one across APNs."""
+    client = _get_http_client()
     base = layer_url.rstrip("/").replace("/query", "")
     query_url = base + "/query"
+    gate = gate or asyncio.Semaphore(max(1, ARCGIS_PROBE_CONCURRENCY))
+
+    info = await _get_arcgis_layer_info(client, base, apn_field)
+    if info and info["apn_field"]:
+        where = _arcgis_apn_where(info["apn_field"], apn, info["apn_field_numeric"])
+        if where is None:
+            return []
+        limit = min(5, info["max_record_count"] or 5)
+        async with gate:
+            try:
+                return await _arcgis_query(
+                    client, query_url, where, geojson=info["supports_geojson"], limit=limit,
+                    record_count=info["supports_pagination"],
+                )
+            except Exception:
+                return None
+
+    # Schema unknown: probe candidate fields
     safe_apn = apn.replace("'", "''").strip()
     norm_apn = _normalize_apn(apn)
     fields_to_try = [apn_field] if apn_field else ARCGIS_APN_FIELD_CANDIDATES
-
-    def do_query(where_clause):
-        params = {
-            "where": where_clause,
-            "outFields": "*",
-            "returnGeometry": "true",
-            "returnIdsOnly": "false",
-            "f": "geojson",
-        }
-        r = requests.get(query_url, params=params, timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        if data.get("error"):
-            return None
-        fc = data if data.get("type") == "FeatureCollection" else {}
-        return (fc.get("features") or [])[:5]
-
+    where_clauses = []
     for field in fields_to_try:
         if not field:
             continue
         # Try string match, LIKE (for dashed APNs), and numeric match (no quotes)
-        where_clauses = [f"{field} = '{safe_apn}'"]
+        where_clauses.append(f"{field} = '{safe_apn}'")
         if norm_apn:
             where_clauses.append(f"{field} LIKE '%{norm_apn}%'")
             if norm_apn.isdigit():
                 where_clauses.append(f"{field} = {norm_apn}")
-        for where in where_clauses:
-            try:
-                features = do_query(where)
-                if not features:
-                    continue
-                out = []
-                for f in features:
-                    if f.get("type") != "Feature":
-                        continue
-                    props = _normalize_properties(f.get("properties") or {})
-                    out.append({
-                        "type": "Feature",
-                        "properties": props,
-                        "geometry": f.get("geometry"),
-                    })
-                return out
-            except Exception:
-                continue
-    return []
+    return await _arcgis_first_match(client, query_url, where_clauses, gate)
 
 
 def _demo_by_apn(apn: str, state: str = None, county: str = None):
-    """Return features from demo list matching APN (exact or digits-only)."""
+    """Return features from demo list matching APN (exact or digits-only), via the APN hash index."""
     norm = _normalize_apn(apn)
     if not norm:
         return []
     out = []
-    for f in _demo_features:
+    for i in _demo_apn_index.get(norm, ()):
+        f = _demo_features[i]
         props = f.get("properties") or {}
-        a = props.get("apn") or ""
-        if _normalize_apn(a) == norm:
-            if state and county:
-                if (props.get("state") or "").strip().upper() != (state or "").strip().upper():
-                    continue
-                if (props.get("county") or "").strip().lower() != (county or "").strip().lower():
-                    continue
-            out.append(f)
-            if len(out) >= 5:
-                break
+        if state and county:
+            if (props.get("state") or "").strip().upper() != (state or "").strip().upper():
+                continue
+            if (props.get("county") or "").strip().lower() != (county or "").strip().lower():
+                continue
+        out.append(f)
+        if len(out) >= 5:
+            break
     return out
 
 
+def _apn_cache_key(apn: str, state: str = None, county: str = None, version: str = "") -> str:
+    """Cache key: digits-only APN (raw APN if it has no digits), normalized state/county, data version.
+
+    With the dataset version (see _data_version) in the key, a reload makes older entries unreachable,
+    so they are never served under the new ETags; they age out of the cache on their own.
+    """
+    a = _normalize_apn(apn) or (apn or "").strip().lower()
+    return "|".join((a, (state or "").strip().upper(), (county or "").strip().lower(), version))
+
+
 @app.get("/parcels/by-apn")
-def parcels_apn(
+async def parcels_apn(
     apn: str = Query(..., description="Parcel APN / account number"),
     state: str = Query(None),
     county: str = Query(None),
+    proj: Projection = Depends(_projection),
 ):
-    """Look up parcel by APN. Tries PostGIS, then county ArcGIS (if configured), then demo data."""
+    """Look up parcel by APN. Tries PostGIS, then county ArcGIS (if configured), then demo data.
+
+    Answers from PostGIS or a successful ArcGIS query (including empty ones, for a shorter TTL)
+    are cached per normalized APN/state/county; demo data and failed lookups are not.
+    The cache holds full features; fields/geometry are applied on the way out.
+    """
+    cache = _apn_cache
+    cache_key = _apn_cache_key(apn, state, county, await _data_version())
+    if cache is not None:
+        hit, cached = await cache.aget(cache_key)
+        if hit:
+            metrics.set_source("cache")
+            return _features_response("parcels_by_apn", [proj.feature(f) for f in cached], fields=proj.fields)
+
     features = []
+    authoritative = True  # the answer came from PostGIS or ArcGIS, not a fallback
     # 1. Try PostGIS
     try:
-        with db_cursor() as cur:
+        apn_norm = await _column_sql("apn_norm")
+        async with db_cursor() as cur:
             if state and county:
-                cur.execute(
+                await cur.execute(
                     """
                     SELECT apn, address, owner, acres, legal_desc, market_value, state, county,
-                           ST_AsGeoJSON(geom)::json AS geometry
+                           ST_AsGeoJSON(geom) AS geometry
                     FROM parcels WHERE apn = %s AND state = %s AND county = %s
                     """,
                     (apn, state, county),
                 )
             else:
-                cur.execute(
+                await cur.execute(
                     """
                     SELECT apn, address, owner, acres, legal_desc, market_value, state, county,
-                           ST_AsGeoJSON(geom)::json AS geometry
+                           ST_AsGeoJSON(geom) AS geometry
                     FROM parcels WHERE apn = %s LIMIT 5
                     """,
                     (apn,),
                 )
-            rows = cur.fetchall()
+            rows = await cur.fetchall()
             if not rows and _normalize_apn(apn):
+                # Digits-only match on the indexed apn_norm column (see load_parcels_to_postgis.py)
                 norm = _normalize_apn(apn)
-                cur.execute(
-                    """
-                    SELECT apn, address, owner, acres, legal_desc, market_value, state, county,
-                           ST_AsGeoJSON(geom)::json AS geometry
-                    FROM parcels
-                    WHERE REGEXP_REPLACE(apn, '[^0-9]', '', 'g') = %s
-                    LIMIT 5
-                    """,
-                    (norm,),
-                )
-                rows = cur.fetchall()
+                if state and county:
+                    await cur.execute(
+                        f"""
+                        SELECT apn, address, owner, acres, legal_desc, market_value, state, county,
+                               ST_AsGeoJSON(geom) AS geometry
+                        FROM parcels
+                        WHERE {apn_norm} = %s AND state = %s AND county = %s
+                        LIMIT 5
+                        """,
+                        (norm, state, county),
+                    )
+                else:
+                    await cur.execute(
+                        f"""
+                        SELECT apn, address, owner, acres, legal_desc, market_value, state, county,
+                               ST_AsGeoJSON(geom) AS geometry
+                        FROM parcels
+                        WHERE {apn_norm} = %s
+                        LIMIT 5
+                        """,
+                        (norm,),
+                    )
+                rows = await cur.fetchall()
         features = [row_to_feature(dict(r)) for r in rows]
-    except psycopg2.OperationalError:
-        pass  # No PostGIS; try ArcGIS then demo
+    except psycopg.OperationalError:
+        authoritative = False  # No PostGIS; try ArcGIS then demo
 
     # 2. If no PostGIS results, try county ArcGIS by APN (real data)
     arcgis_url = os.environ.get("PARCEL_ARCGIS_LAYER_URL", "").strip()
     arcgis_field = os.environ.get("PARCEL_ARCGIS_APN_FIELD", "").strip() or None
     if not features and arcgis_url:
-        features = _query_arcgis_by_apn(arcgis_url, apn.strip(), arcgis_field)
+        found = await _query_arcgis_by_apn(arcgis_url, apn.strip(), arcgis_field)
+        features, authoritative = found or [], found is not None
+        metrics.set_source("arcgis")
 
     # 3. Fall back to demo only when ArcGIS is not configured (so we never show demo when real source is set)
     if not features and not arcgis_url:
         features = _demo_by_apn(apn, state, county)
+        authoritative = authoritative and not features
+        metrics.set_source("demo")
+
+    if cache is not None and authoritative:
+        await cache.aset(cache_key, features)
+    return _features_response("parcels_by_apn", [proj.feature(f) for f in features], fields=proj.fields)
+
+
+# Batch APN lookup: one set-based PostGIS pass, one deduplicated ArcGIS pass
+APN_BATCH_MAX = int(os.environ.get("PARCEL_APN_BATCH_MAX", "1000"))
+ARCGIS_BATCH_SIZE = int(os.environ.get("PARCEL_ARCGIS_BATCH_SIZE", "50"))
+
+_APN_BATCH_SQL = """
+    SELECT q.ord, p.apn, p.address, p.owner, p.acres, p.legal_desc, p.market_value, p.state, p.county,
+           ST_AsGeoJSON(p.geom) AS geometry
+    FROM unnest(%(apns)s::text[], %(states)s::text[], %(counties)s::text[])
+         WITH ORDINALITY AS q(apn, state, county, ord)
+    CROSS JOIN LATERAL (
+        SELECT * FROM parcels p
+        WHERE {column} = q.apn
+          AND (q.state IS NULL OR (p.state = q.state AND p.county = q.county))
+        LIMIT 5
+    ) p
+"""
+
+
+class ApnLookup(BaseModel):
+    apn: str
+    state: Optional[str] = None
+    county: Optional[str] = None
+
+
+class ApnBatchRequest(BaseModel):
+    items: List[ApnLookup]
+
+
+async def _db_by_apns(items: list):
+    """PostGIS matches for many (apn, state, county) lookups: {item index: [features]}.
+
+    Exact APN matches come from one join against unnest(); lookups still empty get a second
+    pass on the digits-only apn_norm column, mirroring /parcels/by-apn.
+    """
+    found = {}
+    apn_norm = await _column_sql("apn_norm", "p")
+    async with db_cursor() as cur:
+        for column in ("apn", "apn_norm"):
+            todo = [i for i in range(len(items)) if i not in found]
+            if column == "apn_norm":
+                todo = [i for i in todo if _normalize_apn(items[i].apn)]
+            if not todo:
+                break
+            keys = [items[i].apn if column == "apn" else _normalize_apn(items[i].apn) for i in todo]
+            both = [bool(items[i].state and items[i].county) for i in todo]
+            await cur.execute(_APN_BATCH_SQL.format(column="p.apn" if column == "apn" else apn_norm), {
+                "apns": keys,
+                "states": [items[i].state if b else None for i, b in zip(todo, both)],
+                "counties": [items[i].county if b else None for i, b in zip(todo, both)],
+            })
+            for r in await cur.fetchall():
+                r = dict(r)
+                idx = todo[r.pop("ord") - 1]
+                found.setdefault(idx, []).append(row_to_feature(r))
+    return found
+
+
+def _arcgis_apn_value(value) -> str:
+    """An APN attribute as text; numeric fields come back as floats (123.0 -> "123")."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value if value is not None else "").strip()
+
+
+async def _query_arcgis_by_apns(layer_url: str, apns: list, apn_field: str = None):
+    """ArcGIS matches for many APNs: {apn: [features]}, [] where ArcGIS answered without a match.
+
+    APNs whose queries failed or ran out of time are omitted. With a known APN field, APNs are
+    sent ARCGIS_BATCH_SIZE at a time in one IN (...) query each; otherwise each APN is probed as
+    in _query_arcgis_by_apn. All requests share one PARCEL_ARCGIS_PROBE_CONCURRENCY limit, and
+    whatever has not finished within PARCEL_ARCGIS_DEADLINE seconds is dropped.
+    """
+    apns = [a for a in dict.fromkeys(a.strip() for a in apns) if a]
+    if not httpx or not layer_url or not apns:
+        return {}
+    with metrics.phase("arcgis"):
+        return await _arcgis_lookup_apns(layer_url, apns, apn_field)
+
+
+async def _arcgis_lookup_apns(layer_url: str, apns: list, apn_field: str = None):
+    client = _get_http_client()
+    base = layer_url.rstrip("/").replace("/query", "")
+    query_url = base + "/query"
+    gate = asyncio.Semaphore(max(1, ARCGIS_PROBE_CONCURRENCY))
+    try:
+        info = await asyncio.wait_for(_get_arcgis_layer_info(client, base, apn_field), ARCGIS_DEADLINE_SECONDS)
+    except asyncio.TimeoutError:
+        return {}
+
+    async def query_chunk(chunk):
+        field, numeric = info["apn_field"], info["apn_field_numeric"]
+        literals = list(dict.fromkeys(v for a in chunk for v in _arcgis_apn_literals(a, numeric)))
+        if not literals:
+            return {}
+        limit = 5 * len(chunk)
+        if info["max_record_count"]:
+            limit = min(limit, info["max_record_count"])
+        async with gate:
+            try:
+                features = await _arcgis_query(
+                    client, query_url, f"{field} IN ({', '.join(literals)})",
+                    geojson=info["supports_geojson"], limit=limit, record_count=info["supports_pagination"],
+                )
+            except Exception:
+                return {}
+        if features is None:
+            return {}
+        wanted = {}
+        for a in chunk:
+            wanted.setdefault(_normalize_apn(a) or a.lower(), []).append(a)
+        out = {a: [] for a in chunk}
+        for f in features:
+            value = _arcgis_apn_value((f.get("properties") or {}).get(field))
+            for a in wanted.get(_normalize_apn(value) or value.lower(), ()):
+                if len(out.setdefault(a, [])) < 5:
+                    out[a].append(f)
+        return out
+
+    async def probe_one(apn):
+        features = await _arcgis_lookup_apn(layer_url, apn, apn_field, gate)
+        return {apn: features} if features is not None else {}
+
+    if info and info["apn_field"]:
+        size = max(1, ARCGIS_BATCH_SIZE)
+        tasks = [asyncio.ensure_future(query_chunk(apns[i:i + size])) for i in range(0, len(apns), size)]
+    else:
+        tasks = [asyncio.ensure_future(probe_one(a)) for a in apns]
+    done, pending = await asyncio.wait(tasks, timeout=ARCGIS_DEADLINE_SECONDS)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    out = {}
+    for task in done:
+        if not task.cancelled() and task.exception() is None:
+            out.update(task.result())
+    return out
+
+
+@app.post("/parcels/by-apn/batch")
+async def parcels_apn_batch(body: ApnBatchRequest, proj: Projection = Depends(_projection)):
+    """Look up many APNs at once: {"results": {input APN: [features]}, "missing": [input APNs]}.
+
+    Same sources, order and caching rules as /parcels/by-apn, but PostGIS is queried once for the
+    whole batch and ArcGIS once per distinct unresolved APN. Repeated APNs are looked up once
+    (the first state/county given wins).
+    """
+    if len(body.items) > APN_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {APN_BATCH_MAX} items per batch")
+    unique = {}
+    for item in body.items:
+        unique.setdefault(item.apn, item)
+    items = list(unique.values())
+    results = {}
+    cache = _apn_cache
+    version = await _data_version()
+    keys = [_apn_cache_key(item.apn, item.state, item.county, version) for item in items]
+    misses = []
+    cached_by_key = await cache.aget_many(keys) if cache is not None else {}
+    for i, item in enumerate(items):
+        hit, cached = cached_by_key.get(keys[i], (False, None))
+        if hit:
+            results[item.apn] = cached
+        else:
+            misses.append(i)
+
+    # 1. PostGIS, one set-based pass
+    authoritative = set(misses)  # answered by PostGIS or ArcGIS rather than a fallback (cacheable)
+    if misses:
+        try:
+            found = await _db_by_apns([items[i] for i in misses])
+            for k, i in enumerate(misses):
+                if k in found:
+                    results[items[i].apn] = found[k]
+        except psycopg.OperationalError:
+            authoritative.clear()  # No PostGIS; try ArcGIS then demo
+    unresolved = [i for i in misses if items[i].apn not in results]
+
+    # 2. County ArcGIS, each distinct APN at most once
+    arcgis_url = os.environ.get("PARCEL_ARCGIS_LAYER_URL", "").strip()
+    arcgis_field = os.environ.get("PARCEL_ARCGIS_APN_FIELD", "").strip() or None
+    if unresolved and arcgis_url:
+        by_apn = await _query_arcgis_by_apns(arcgis_url, [items[i].apn for i in unresolved], arcgis_field)
+        for i in unresolved:
+            answer = by_apn.get(items[i].apn.strip())
+            if answer:
+                results[items[i].apn] = answer
+            if answer is None:
+                authoritative.discard(i)
+            else:
+                authoritative.add(i)
+
+    # 3. Demo only when ArcGIS is not configured
+    for i in misses:
+        item = items[i]
+        if item.apn not in results and not arcgis_url:
+            results[item.apn] = _demo_by_apn(item.apn, item.state, item.county)
+            if results[item.apn]:
+                authoritative.discard(i)
+    if cache is not None:
+        await cache.aset_many([(keys[i], results.get(items[i].apn) or []) for i in misses if i in authoritative])
 
-    return {"type": "FeatureCollection", "features": features}
+    t0 = time.perf_counter()
+    entries = []
+    for item in items:
+        features = [proj.feature(f) for f in results.get(item.apn) or []]
+        encoded = b",".join(geojson_stream.encode_feature(f.get("properties"), f.get("geometry")) for f in features)
+        entries.append(geojson_stream.dumps(item.apn) + b":[" + encoded + b"]")
+    missing = [item.apn for item in items if not results.get(item.apn)]
+    content = b'{"results":{' + b",".join(entries) + b'},"missing":' + geojson_stream.dumps(missing) + b"}"
+    elapsed = time.perf_counter() - t0
+    _record_response("parcels_by_apn_batch", len(content), elapsed, rows=len(items))
+    return Response(content=content, media_type="application/json")
@@ -0,0 +1,117 @@
+"""
+Circuit breaker for the Parcel API's PostGIS dependency.
+
+After PARCEL_DB_BREAKER_FAILURES consecutive connection failures the breaker
+opens: requests skip PostGIS and go straight to their ArcGIS/demo fallback
+instead of each waiting out the connect timeout. While open, a background task
+probes the database with exponential backoff (plus jitter, so several workers do
+not probe in lockstep) and closes the breaker on the first success. Requests
+never act as the trial call, so an outage costs them nothing.
+
+States: "closed" (normal), "open" (failing fast), "half_open" (a probe is running).
+"""
+import asyncio
+import random
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a background probe; probe is an async callable that raises on failure."""
+
+    def __init__(self, probe, failure_threshold=3, backoff=1.0, backoff_max=30.0, errors=(Exception,)):
+        self._probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._errors = errors
+        self.state = CLOSED
+        self._failures = 0
+        self._task = None
+        self._opened_at = None
+        self._next_probe_at = None
+        self._last_error = None
+        self._stats = {"trips": 0, "rejected": 0, "probes": 0, "probe_failures": 0, "probe_errors": 0}
+
+    def allow(self) -> bool:
+        """True if a request may use the dependency; counts the rejection otherwise."""
+        if self.state == CLOSED:
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def record_success(self):
+        self._failures = 0
+
+    def record_failure(self, error=None):
+        self._last_error = repr(error) if error is not None else self._last_error
+        if self.state != CLOSED:
+            return
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self.trip(error)
+
+    def trip(self, error=None):
+        """Open the breaker now and start probing in the background."""
+        if error is not None:
+            self._last_error = repr(error)
+        if self.state != CLOSED:
+            return
+        self.state = OPEN
+        self._opened_at = time.time()
+        self._stats["trips"] += 1
+        self._task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def _probe_loop(self):
+        delay = self.backoff
+        while True:
+            wait = delay * random.uniform(0.5, 1.0)
+            self._next_probe_at = time.time() + wait
+            await asyncio.sleep(wait)
+            self.state = HALF_OPEN
+            self._stats["probes"] += 1
+            try:
+                await self._probe()
+            except Exception as e:
+                # Expected errors (self._errors) and anything unexpected from the driver alike:
+                # back to OPEN and keep probing, never leave the breaker stuck in HALF_OPEN
+                self._stats["probe_failures"] += 1
+                if not isinstance(e, self._errors):
+                    self._stats["probe_errors"] += 1
+                self._last_error = repr(e)
+                self.state = OPEN
+                delay = min(delay * 2, self.backoff_max)
+                continue
+            except BaseException:
+                self.state = OPEN  # cancelled (shutdown)
+                raise
+            self.state = CLOSED
+            self._failures = 0
+            self._opened_at = self._next_probe_at = None
+            self._task = None
+            return
+
+    async def close(self):
+        """Stop the probe task (at shutdown)."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def snapshot(self) -> dict:
+        out = dict(self._stats)
+        out.update(
+            state=self.state,
+            consecutive_failures=self._failures,
+            failure_threshold=self.failure_threshold,
+            opened_at=self._opened_at,
+            next_probe_at=self._next_probe_at,
+            last_error=self._last_error,
+        )
+        return out
@@ -0,0 +1,231 @@
+"""
+Bounded TTL + LRU cache for the Parcel API, with an optional SQLite tier.
+
+Positive and negative (empty) results get separate TTLs, so a missing APN is
+retried sooner than a found one is refreshed. The in-memory tier evicts least
+recently used entries beyond max_entries. When a SQLite path is given, entries
+are also written there and survive restarts; memory misses fall through to it.
+Values must be JSON-serializable for the SQLite tier (Decimal is stored as float).
+
+Async callers use aget/aset (and the *_many batch forms): the memory tier is answered
+inline and SQLite runs in a worker thread, so disk I/O never blocks the event loop.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+
+def _json_default(o):
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _is_negative(value):
+    return value is None or value == [] or value == {}
+
+
+class SQLiteTier:
+    """Persistent key -> (JSON value, expiry) store. Thread-safe; trims itself to max_entries."""
+
+    _PRUNE_EVERY = 256
+
+    def __init__(self, path, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache(expires_at)")
+
+    def get(self, key, now):
+        """(found, value, expires_at). Expired rows count as not found."""
+        return self.get_many([key], now).get(key, (False, None, None))
+
+    def get_many(self, keys, now):
+        """{key: (True, value, expires_at)} for the keys stored and not expired."""
+        out = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    out[key] = (True, row[0], row[1])
+        return {k: (True, json.loads(v), e) for k, (_, v, e) in out.items()}
+
+    def set(self, key, value, expires_at):
+        self.set_many([(key, value, expires_at)])
+
+    def set_many(self, entries):
+        """Store (key, value, expires_at) entries in one transaction."""
+        rows = [(k, json.dumps(v, separators=(",", ":"), default=_json_default), e) for k, v, e in entries]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)", rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            before, self._writes = self._writes, self._writes + len(rows)
+            if before // self._PRUNE_EVERY != self._writes // self._PRUNE_EVERY:
+                self._prune(time.time())
+
+    def _prune(self, now):
+        self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TTLCache:
+    """LRU cache with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, max_entries=10000, ttl=86400.0, negative_ttl=300.0, sqlite_path=None,
+                 sqlite_max_entries=1_000_000):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._disk = SQLiteTier(sqlite_path, sqlite_max_entries) if sqlite_path else None
+        self._stats = {
+            "hits": 0,
+            "negative_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def get(self, key):
+        """(hit, value). A cached empty result is a hit with an empty value."""
+        now = time.time()
+        hit, value = self._memory_get(key, now)
+        if hit:
+            return True, value
+        disk = self._disk.get_many([key], now) if self._disk is not None else {}
+        return self._disk_results([key], disk)[key]
+
+    async def aget(self, key):
+        """get() for async callers: a memory miss reads SQLite in a worker thread."""
+        return (await self.aget_many([key]))[key]
+
+    async def aget_many(self, keys):
+        """{key: (hit, value)} for many keys, with at most one SQLite round trip (in a worker thread)."""
+        now = time.time()
+        out, todo = {}, []
+        for key in keys:
+            hit, value = self._memory_get(key, now)
+            if hit:
+                out[key] = (True, value)
+            else:
+                todo.append(key)
+        if todo:
+            disk = await asyncio.to_thread(self._disk.get_many, todo, now) if self._disk is not None else {}
+            out.update(self._disk_results(todo, disk))
+        return out
+
+    def set(self, key, value):
+        entry = self._memory_set(key, value)
+        if self._disk is not None:
+            self._disk.set_many([entry])
+
+    async def aset(self, key, value):
+        """set() for async callers: the SQLite write runs in a worker thread."""
+        await self.aset_many([(key, value)])
+
+    async def aset_many(self, items):
+        """Cache many (key, value) pairs; one SQLite transaction, in a worker thread."""
+        entries = [self._memory_set(key, value) for key, value in items]
+        if self._disk is not None and entries:
+            await asyncio.to_thread(self._disk.set_many, entries)
+
+    def _memory_get(self, key, now):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            value, expires_at = item
+            if expires_at > now:
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+                if _is_negative(value):
+                    self._stats["negative_hits"] += 1
+                return True, value
+            del self._data[key]
+            self._stats["expirations"] += 1
+            return False, None
+
+    def _disk_results(self, keys, disk):
+        """(hit, value) per key from SQLite results; disk hits are promoted to memory."""
+        out = {}
+        with self._lock:
+            for key in keys:
+                if key in disk:
+                    _, value, expires_at = disk[key]
+                    self._put(key, value, expires_at)
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    if _is_negative(value):
+                        self._stats["negative_hits"] += 1
+                    out[key] = (True, value)
+                else:
+                    self._stats["misses"] += 1
+                    out[key] = (False, None)
+        return out
+
+    def _memory_set(self, key, value):
+        expires_at = time.time() + (self.negative_ttl if _is_negative(value) else self.ttl)
+        with self._lock:
+            self._put(key, value, expires_at)
+            self._stats["sets"] += 1
+        return key, value, expires_at
+
+    def _put(self, key, value, expires_at):
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out["size"] = len(self._data)
+        out["max_entries"] = self.max_entries
+        lookups = out["hits"] + out["misses"]
+        out["hit_ratio"] = out["hits"] / lookups if lookups else 0.0
+        out["disk"] = self._disk is not None
+        return out
@@ -0,0 +1,147 @@
+"""
+Response compression for the Parcel API (gzip, and brotli when installed).
+
+An ASGI middleware rather than Starlette's GZipMiddleware so that brotli can be
+offered and streamed bodies are compressed chunk by chunk (each chunk is flushed,
+so a client can start parsing before the query finishes). Small bodies and
+responses that already have a Content-Encoding (e.g. gzipped vector tiles) are
+left alone. A compressed response's ETag gets an encoding suffix ("...-br") so
+caches never mix representations; the app strips it when comparing If-None-Match
+and echoes the client's suffixed tag on the 304.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _accepted(accept_encoding: str) -> dict:
+    """{coding: q} from an Accept-Encoding header."""
+    out = {}
+    for part in (accept_encoding or "").split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        out[coding.lower()] = q
+    return out
+
+
+def choose_encoding(accept_encoding: str):
+    """'br' or 'gzip' (brotli preferred at equal q), or None for identity."""
+    accepted = _accepted(accept_encoding)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, coding, gzip_level, brotli_quality):
+        if coding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+        self.coding = coding
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.coding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.coding == "br":
+            return self._c.process(data) + self._c.finish()
+        return self._c.compress(data) + self._c.flush(zlib.Z_FINISH)
+
+
+def suffix_etag(etag: str, coding: str) -> str:
+    if etag.endswith('"'):
+        return etag[:-1] + "-" + coding + '"'
+    return etag
+
+
+class CompressionMiddleware:
+    """Compress HTTP responses of at least minimum_size bytes with the client's preferred coding."""
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        coding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def wrapped_send(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if compressor is None:
+                # First body message decides: pass through, or compress from here on
+                response_headers = [(k.lower(), v) for k, v in start.get("headers", [])]
+                already = any(k == b"content-encoding" for k, _ in response_headers)
+                if already or (not more and len(body) < self.minimum_size) or start["status"] in (204, 304):
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                compressor = _Compressor(coding, self.gzip_level, self.brotli_quality)
+                out_headers = []
+                vary = None
+                for k, v in response_headers:
+                    if k == b"content-length":
+                        continue
+                    if k == b"etag":
+                        v = suffix_etag(v.decode("latin-1"), coding).encode("latin-1")
+                    if k == b"vary":
+                        vary = v
+                        continue
+                    out_headers.append((k, v))
+                if vary is None:
+                    vary = b"Accept-Encoding"
+                elif b"accept-encoding" not in vary.lower():
+                    vary += b", Accept-Encoding"
+                out_headers += [(b"content-encoding", coding.encode("latin-1")), (b"vary", vary)]
+                if not more:
+                    data = compressor.finish(body)
+                    out_headers.append((b"content-length", str(len(data)).encode("latin-1")))
+                    await send({**start, "headers": out_headers})
+                    await send({"type": "http.response.body", "body": data})
+                    return
+                await send({**start, "headers": out_headers})
+            if more:
+                data = compressor.chunk(body)
+                if data:
+                    await send({"type": "http.response.body", "body": data, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.finish(body)})
+
+        await self.app(scope, receive, wrapped_send)
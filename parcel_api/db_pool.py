@@ -0,0 +1,91 @@
+"""
+Connection pool settings for the Parcel API's PostGIS connections.
+
+One psycopg_pool.AsyncConnectionPool is created at app startup and shared by every
+request, so a map pan reuses an open connection instead of paying a TCP + auth
+handshake. psycopg_pool owns sizing, background (re)connects, recycling and wait
+statistics; this module only turns env vars into its arguments.
+
+Connection (env):
+  DATABASE_URL or PARCEL_DB_HOST / _PORT / _NAME / _USER / _PASSWORD
+  PARCEL_DB_CONNECT_TIMEOUT  seconds per connection attempt (default 5)
+
+Sizing (env):
+  PARCEL_DB_POOL_MIN       connections opened at startup and kept open (default 1)
+  PARCEL_DB_POOL_MAX       connections kept in the pool (default 10)
+  PARCEL_DB_POOL_OVERFLOW  extra connections allowed under burst load (default 10); the pool
+                           grows to MAX + OVERFLOW and closes connections above MIN once idle
+  PARCEL_DB_POOL_MAX_IDLE  seconds an extra connection may sit idle before it is closed (default 600)
+  PARCEL_DB_POOL_TIMEOUT   seconds a request waits for a connection before failing (default 5)
+  PARCEL_DB_POOL_RECYCLE   seconds after which a connection is closed and replaced (default 1800)
+  PARCEL_DB_POOL_CHECK     1 to ping each connection before handing it out, 0 to skip (default 1)
+"""
+import os
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool, ConnectionPool, PoolTimeout  # noqa: F401 (re-exported)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def connect_kwargs_from_env():
+    """Keyword arguments for psycopg.connect / AsyncConnection.connect."""
+    connect_timeout = _env_int("PARCEL_DB_CONNECT_TIMEOUT", 5)
+    url = os.environ.get("DATABASE_URL")
+    if url:
+        return {"conninfo": url, "connect_timeout": connect_timeout}
+    return {
+        "host": os.environ.get("PARCEL_DB_HOST", "localhost"),
+        "port": os.environ.get("PARCEL_DB_PORT", "5432"),
+        "dbname": os.environ.get("PARCEL_DB_NAME", "parcel_db"),
+        "user": os.environ.get("PARCEL_DB_USER", "postgres"),
+        "password": os.environ.get("PARCEL_DB_PASSWORD", ""),
+        "connect_timeout": connect_timeout,
+    }
+
+
+def connect():
+    return psycopg.connect(**connect_kwargs_from_env())
+
+
+async def connect_async():
+    return await psycopg.AsyncConnection.connect(**connect_kwargs_from_env())
+
+
+def pool_settings_from_env(asynchronous=True):
+    """psycopg_pool keyword arguments (connection and sizing) from the env vars above."""
+    kwargs = connect_kwargs_from_env()
+    conninfo = kwargs.pop("conninfo", "")
+    min_size = max(0, _env_int("PARCEL_DB_POOL_MIN", 1))
+    max_size = max(1, _env_int("PARCEL_DB_POOL_MAX", 10)) + max(0, _env_int("PARCEL_DB_POOL_OVERFLOW", 10))
+    pool_cls = AsyncConnectionPool if asynchronous else ConnectionPool
+    return {
+        "conninfo": conninfo,
+        "kwargs": kwargs,
+        "min_size": min(min_size, max_size),
+        "max_size": max_size,
+        "timeout": _env_float("PARCEL_DB_POOL_TIMEOUT", 5.0),
+        "max_lifetime": _env_float("PARCEL_DB_POOL_RECYCLE", 1800.0),
+        "max_idle": _env_float("PARCEL_DB_POOL_MAX_IDLE", 600.0),
+        "check": pool_cls.check_connection if _env_float("PARCEL_DB_POOL_CHECK", 1) > 0 else None,
+        "open": False,
+    }
+
+
+class CircuitOpen(psycopg.OperationalError):
+    """PostGIS is marked down by the app's circuit breaker; no connection was attempted.
+
+    An OperationalError, like psycopg_pool's PoolTimeout: callers fall back unchanged.
+    """
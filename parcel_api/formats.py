@@ -0,0 +1,397 @@
+"""
+Alternative response encodings for the Parcel API, chosen from the Accept header.
+
+GeoJSON (the default) is written by geojson_stream. This module adds:
+  - GeoJSON text sequences (RFC 8142, application/geo+json-seq) and newline-delimited
+    GeoJSON (application/x-ndjson): one Feature per record.
+  - FlatGeobuf (application/flatgeobuf): written directly with a small FlatBuffers
+    encoder, streaming, without a spatial index.
+  - Arrow IPC stream with a GeoArrow WKB geometry column
+    (application/vnd.apache.arrow.stream), when pyarrow is installed.
+
+Binary formats have a fixed schema: the normalized parcel columns (PARCEL_COLUMNS)
+plus any other properties of the first feature (e.g. distance_m, score), typed from
+their values. Every encoder consumes the same batches of (properties, geometry) pairs as
+geojson_stream.feature_collection_chunks.
+"""
+import contextvars
+import io
+import json
+import struct
+import time
+from decimal import Decimal
+
+import geojson_stream
+from geometry import geojson_to_wkb
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+GEOJSON = "geojson"
+GEOJSONSEQ = "geojsonseq"
+NDJSON = "ndjson"
+FLATGEOBUF = "flatgeobuf"
+ARROW = "arrow"
+
+MEDIA_TYPES = {
+    GEOJSON: "application/geo+json",
+    GEOJSONSEQ: "application/geo+json-seq",
+    NDJSON: "application/x-ndjson",
+    FLATGEOBUF: "application/flatgeobuf",
+    ARROW: "application/vnd.apache.arrow.stream",
+}
+_ACCEPT = {
+    "application/json": GEOJSON,
+    "application/geo+json": GEOJSON,
+    "application/geo+json-seq": GEOJSONSEQ,
+    "application/x-ndjson": NDJSON,
+    "application/flatgeobuf": FLATGEOBUF,
+    "application/x-flatgeobuf": FLATGEOBUF,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+
+PARCEL_COLUMNS = (
+    ("apn", str), ("address", str), ("owner", str), ("acres", float), ("legal_desc", str),
+    ("market_value", float), ("state", str), ("county", str),
+)
+
+_current = contextvars.ContextVar("parcel_api_response_format", default=GEOJSON)
+
+
+def available():
+    """Formats this process can produce (Arrow needs pyarrow)."""
+    return [f for f in MEDIA_TYPES if f != ARROW or pa is not None]
+
+
+def negotiate(accept: str) -> str:
+    """Best supported format for an Accept header (highest q, then order); GeoJSON otherwise."""
+    best, best_q = GEOJSON, -1.0
+    for i, part in enumerate((accept or "").split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        fmt = _ACCEPT.get(media.lower())
+        if fmt is None or fmt not in available():
+            continue
+        q = 1.0
+        for p in params:
+            if p.startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        if q > best_q and q > 0:
+            best, best_q = fmt, q
+    return best
+
+
+def set_current(fmt: str):
+    _current.set(fmt)
+
+
+def current() -> str:
+    """Format negotiated for the request being handled (set by the app's middleware)."""
+    return _current.get()
+
+
+def columns_for(pairs, fields=None):
+    """PARCEL_COLUMNS (only `fields`, if given) plus the first feature's other properties, as (name, float|str)."""
+    columns = [c for c in PARCEL_COLUMNS if fields is None or c[0] in fields]
+    known = {name for name, _ in PARCEL_COLUMNS}
+    for properties, _ in pairs[:1]:
+        for name, value in (properties or {}).items():
+            if name in known:
+                continue
+            numeric = isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+            columns.append((name, float if numeric else str))
+    return tuple(columns)
+
+
+def _geometry_dict(geometry):
+    if geometry is None or isinstance(geometry, dict):
+        return geometry
+    if orjson is not None:
+        return orjson.loads(geometry)
+    return json.loads(geometry)
+
+
+def _column_value(value, kind):
+    if value is None:
+        return None
+    if kind is float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return str(value)
+
+
+# --- GeoJSON text sequences ---
+
+def _seq_records(batch, prefix):
+    return b"".join(prefix + geojson_stream.encode_feature(p, g) + b"\n" for p, g in batch)
+
+
+# --- FlatBuffers (just enough to write FlatGeobuf headers and features) ---
+# A table is a list indexed by field id of None or (kind, value); kinds: "u8", "bool", "u16",
+# "i32", "u64", "str", "vec_u8", "vec_u32", "vec_f64", "table", "vec_table".
+
+_SCALARS = {"u8": "<B", "bool": "<?", "u16": "<H", "i32": "<i", "u64": "<Q"}
+
+
+def _align(buf, n, extra=0):
+    """Pad buf so that len(buf) + extra is a multiple of n."""
+    buf.extend(b"\0" * ((-(len(buf) + extra)) % n))
+
+
+def _write_object(buf, kind, value):
+    """Append a vector/string/table; return the position an offset must point at."""
+    if kind == "table":
+        return _write_table(buf, value)
+    if kind == "str":
+        data = value.encode("utf-8")
+        _align(buf, 4)
+        pos = len(buf)
+        buf.extend(struct.pack("<I", len(data)) + data + b"\0")
+        return pos
+    if kind == "vec_table":
+        _align(buf, 4)
+        pos = len(buf)
+        buf.extend(struct.pack("<I", len(value)) + b"\0" * (4 * len(value)))
+        for k, table in enumerate(value):
+            slot = pos + 4 + 4 * k
+            target = _write_table(buf, table)
+            struct.pack_into("<I", buf, slot, target - slot)
+        return pos
+    fmt, size = {"vec_u8": ("B", 1), "vec_u32": ("I", 4), "vec_f64": ("d", 8)}[kind]
+    _align(buf, max(size, 4), 4)
+    pos = len(buf)
+    buf.extend(struct.pack("<I", len(value)))
+    if kind == "vec_u8":
+        buf.extend(value)
+    else:
+        buf.extend(struct.pack(f"<{len(value)}{fmt}", *value))
+    return pos
+
+
+def _write_table(buf, fields):
+    sizes = {"u8": 1, "bool": 1, "u16": 2, "i32": 4, "u64": 8}
+    present = [(i, f) for i, f in enumerate(fields) if f is not None]
+    # Inline layout after the 4-byte vtable offset, largest fields first for alignment
+    layout, cursor = {}, 4
+    for i, (kind, _) in sorted(present, key=lambda x: -sizes.get(x[1][0], 4)):
+        size = sizes.get(kind, 4)
+        cursor += -cursor % size
+        layout[i] = cursor
+        cursor += size
+    inline_size = cursor
+    vtable = struct.pack(f"<HH{len(fields)}H", 4 + 2 * len(fields), inline_size,
+                         *[layout.get(i, 0) for i in range(len(fields))])
+    _align(buf, 2)
+    vtable_pos = len(buf)
+    buf.extend(vtable)
+    _align(buf, 8)
+    table_pos = len(buf)
+    buf.extend(b"\0" * inline_size)
+    struct.pack_into("<i", buf, table_pos, table_pos - vtable_pos)
+    for i, (kind, value) in present:
+        if kind in _SCALARS:
+            struct.pack_into(_SCALARS[kind], buf, table_pos + layout[i], value)
+    for i, (kind, value) in present:
+        if kind not in _SCALARS:
+            slot = table_pos + layout[i]
+            target = _write_object(buf, kind, value)
+            struct.pack_into("<I", buf, slot, target - slot)
+    return table_pos
+
+
+def _flatbuffer(fields) -> bytes:
+    buf = bytearray(4)
+    root = _write_table(buf, fields)
+    struct.pack_into("<I", buf, 0, root)
+    return bytes(buf)
+
+
+# --- FlatGeobuf (https://flatgeobuf.org, spec v3) ---
+
+FGB_MAGIC = b"fgb\x03fgb\x00"
+_FGB_GEOMETRY_TYPES = {
+    "Point": 1, "LineString": 2, "Polygon": 3, "MultiPoint": 4, "MultiLineString": 5, "MultiPolygon": 6,
+}
+_FGB_COLUMN_TYPES = {float: 10, str: 11}  # Double, String
+
+
+def _fgb_header(columns) -> bytes:
+    columns = [
+        [("str", name), ("u8", _FGB_COLUMN_TYPES[kind])] for name, kind in columns
+    ]
+    crs = [("str", "EPSG"), ("i32", 4326)]
+    header = [None] * 11
+    header[0] = ("str", "parcels")
+    header[2] = ("u8", 0)  # Unknown: Polygon and MultiPolygon features may be mixed
+    header[7] = ("vec_table", columns)
+    header[8] = ("u64", 0)  # feature count unknown while streaming
+    header[9] = ("u16", 0)  # no spatial index
+    header[10] = ("table", crs)
+    body = _flatbuffer(header)
+    return FGB_MAGIC + struct.pack("<I", len(body)) + body
+
+
+def _fgb_geometry(geom):
+    gtype = geom.get("type")
+    coords = geom.get("coordinates") or []
+    fields = [None] * 8
+    fields[6] = ("u8", _FGB_GEOMETRY_TYPES[gtype])
+    if gtype == "Point":
+        fields[1] = ("vec_f64", [coords[0], coords[1]])
+    elif gtype in ("LineString", "MultiPoint"):
+        fields[1] = ("vec_f64", [v for c in coords for v in (c[0], c[1])])
+    elif gtype in ("Polygon", "MultiLineString"):
+        xy, ends = [], []
+        for ring in coords:
+            xy.extend(v for c in ring for v in (c[0], c[1]))
+            ends.append(len(xy) // 2)
+        fields[1] = ("vec_f64", xy)
+        if len(ends) > 1:
+            fields[0] = ("vec_u32", ends)
+    else:  # MultiPolygon
+        fields[7] = ("vec_table", [_fgb_geometry({"type": "Polygon", "coordinates": p}) for p in coords])
+    return fields
+
+
+def _fgb_properties(columns, properties) -> bytes:
+    out = bytearray()
+    for k, (name, kind) in enumerate(columns):
+        value = _column_value((properties or {}).get(name), kind)
+        if value is None:
+            continue
+        out.extend(struct.pack("<H", k))
+        if kind is float:
+            out.extend(struct.pack("<d", value))
+        else:
+            data = value.encode("utf-8")
+            out.extend(struct.pack("<I", len(data)) + data)
+    return bytes(out)
+
+
+def _fgb_feature(columns, properties, geometry) -> bytes:
+    geom = _geometry_dict(geometry)
+    fields = [None] * 3
+    if geom and geom.get("type") in _FGB_GEOMETRY_TYPES and geom.get("coordinates"):
+        fields[0] = ("table", _fgb_geometry(geom))
+    props = _fgb_properties(columns, properties)
+    if props:
+        fields[1] = ("vec_u8", props)
+    body = _flatbuffer(fields)
+    return struct.pack("<I", len(body)) + body
+
+
+# --- Arrow IPC / GeoArrow ---
+
+def _arrow_schema(columns):
+    fields = [pa.field(name, pa.float64() if kind is float else pa.string()) for name, kind in columns]
+    fields.append(pa.field("geometry", pa.binary(), metadata={
+        "ARROW:extension:name": "geoarrow.wkb",
+        "ARROW:extension:metadata": '{"crs":"OGC:CRS84"}',
+    }))
+    return pa.schema(fields)
+
+
+def _arrow_batch(columns, schema, batch):
+    arrays = [
+        pa.array([_column_value((p or {}).get(name), kind) for p, _ in batch], type=schema.field(name).type)
+        for name, kind in columns
+    ]
+    arrays.append(pa.array([geojson_to_wkb(_geometry_dict(g)) for _, g in batch], type=pa.binary()))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+# --- entry points ---
+
+class Encoder:
+    """Incremental encoder for one response: batch() per batch of pairs, then finish(); each returns bytes.
+
+    The schema of binary formats is taken from the first batch (see columns_for).
+    """
+
+    def __init__(self, fmt, fields=None):
+        self.fmt = fmt
+        self.fields = fields
+        self.count = 0
+        self._columns = self._schema = self._sink = self._writer = None
+
+    def _start(self, pairs) -> bytes:
+        self._columns = columns_for(pairs, self.fields)
+        if self.fmt == FLATGEOBUF:
+            return _fgb_header(self._columns)
+        if self.fmt == ARROW:
+            self._schema = _arrow_schema(self._columns)
+            self._sink = io.BytesIO()
+            self._writer = pa.ipc.new_stream(self._sink, self._schema)
+            return self._drain()
+        return b""
+
+    def batch(self, pairs) -> bytes:
+        head = self._start(pairs) if self._columns is None else b""
+        self.count += len(pairs)
+        if self.fmt == GEOJSONSEQ:
+            return _seq_records(pairs, b"\x1e")
+        if self.fmt == NDJSON:
+            return _seq_records(pairs, b"")
+        if self.fmt == FLATGEOBUF:
+            return head + b"".join(_fgb_feature(self._columns, p, g) for p, g in pairs)
+        if self.fmt == ARROW and pairs:
+            self._writer.write_batch(_arrow_batch(self._columns, self._schema, pairs))
+            return head + self._drain()
+        return head
+
+    def finish(self) -> bytes:
+        head = self._start([]) if self._columns is None else b""
+        if self._writer is None:
+            return head
+        if not self.count:
+            self._writer.write_batch(_arrow_batch(self._columns, self._schema, []))
+        self._writer.close()
+        return head + self._drain()
+
+    def _drain(self) -> bytes:
+        data = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return data
+
+
+def encode(fmt, pairs, fields=None) -> bytes:
+    """Whole body for a short list of (properties, geometry) pairs; fields limits the parcel columns."""
+    enc = Encoder(fmt, fields)
+    return enc.batch(pairs) + enc.finish()
+
+
+async def stream(fmt, batches, chunk_bytes=65536, on_complete=None, fields=None):
+    """Yield batches of (properties, geometry) pairs encoded as fmt (not GeoJSON), in chunks of about chunk_bytes.
+
+    on_complete, if given, is called with (bytes written, seconds spent encoding, feature count).
+    """
+    enc = Encoder(fmt, fields)
+    buf = bytearray()
+    encode_seconds = 0.0
+    total = 0
+    async for batch in batches:
+        t0 = time.perf_counter()
+        buf += enc.batch(batch)
+        encode_seconds += time.perf_counter() - t0
+        if len(buf) >= chunk_bytes:
+            total += len(buf)
+            yield bytes(buf)
+            buf.clear()
+    buf += enc.finish()
+    total += len(buf)
+    if buf:
+        yield bytes(buf)
+    if on_complete is not None:
+        on_complete(total, encode_seconds, enc.count)
@@ -0,0 +1,89 @@
+"""
+Streaming GeoJSON FeatureCollection writer for the Parcel API.
+
+Geometry that PostGIS already rendered with ST_AsGeoJSON is passed through as
+text, never parsed into Python objects. Only the small properties dict is
+encoded, with orjson when installed. Output is yielded in chunks of about
+chunk_bytes, so memory stays flat however many features a query returns.
+"""
+import json
+import time
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON bytes (orjson if available). Decimal is written as a float."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def encode_geometry(geometry) -> bytes:
+    """Geometry JSON: raw ST_AsGeoJSON text passes through; dicts (demo/ArcGIS) are encoded."""
+    if geometry is None:
+        return b"null"
+    if isinstance(geometry, str):
+        return geometry.encode("utf-8")
+    if isinstance(geometry, (bytes, bytearray, memoryview)):
+        return bytes(geometry)
+    return dumps(geometry)
+
+
+def encode_feature(properties, geometry) -> bytes:
+    return b"".join((
+        b'{"type":"Feature","properties":',
+        dumps(properties or {}),
+        b',"geometry":',
+        encode_geometry(geometry),
+        b"}",
+    ))
+
+
+async def feature_collection_chunks(batches, chunk_bytes=65536, on_complete=None, trailer=None):
+    """Yield a FeatureCollection as bytes chunks.
+
+    batches is an async iterable of lists of (properties, geometry) pairs. trailer, if
+    given, is called after the last feature and returns extra top-level members (e.g. a
+    pagination token). on_complete, if given, is called with (bytes written, seconds spent
+    encoding, feature count) when the collection has been fully written.
+    """
+    buf = bytearray(b'{"type":"FeatureCollection","features":[')
+    total = count = 0
+    encode_seconds = 0.0
+    async for batch in batches:
+        t0 = time.perf_counter()
+        for properties, geometry in batch:
+            if count:
+                buf += b","
+            buf += encode_feature(properties, geometry)
+            count += 1
+        encode_seconds += time.perf_counter() - t0
+        if len(buf) >= chunk_bytes:
+            total += len(buf)
+            yield bytes(buf)
+            buf.clear()
+    buf += b"]"
+    for key, value in (trailer() if trailer is not None else {}).items():
+        buf += b"," + dumps(key) + b":" + dumps(value)
+    buf += b"}"
+    total += len(buf)
+    yield bytes(buf)
+    if on_complete is not None:
+        on_complete(total, encode_seconds, count)
+
+
+async def iter_batches(items, batch_size=500):
+    """Async batches over an in-memory list (demo data)."""
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
@@ -0,0 +1,628 @@
+"""
+Pure-Python geometry helpers for the Parcel API's demo path and tile encoder.
+
+Coordinates are [x, y] lists as in GeoJSON; rings are closed (first == last).
+"""
+import math
+import struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# A point this close (in degrees, ~0.1 mm) to an edge is on the boundary
+BOUNDARY_EPS = 1e-9
+
+
+def simplify_line(points, tolerance):
+    """Douglas-Peucker simplification of a polyline. Endpoints are always kept."""
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return list(points)
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    tol2 = tolerance * tolerance
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        ax, ay = points[i][0], points[i][1]
+        dx, dy = points[j][0] - ax, points[j][1] - ay
+        d2 = dx * dx + dy * dy
+        best, best_k = -1.0, -1
+        for k in range(i + 1, j):
+            px, py = points[k][0], points[k][1]
+            if d2 == 0:
+                ex, ey = px - ax, py - ay
+            else:
+                t = ((px - ax) * dx + (py - ay) * dy) / d2
+                t = 0.0 if t < 0 else 1.0 if t > 1 else t
+                ex, ey = ax + t * dx - px, ay + t * dy - py
+            dist = ex * ex + ey * ey
+            if dist > best:
+                best, best_k = dist, k
+        if best > tol2:
+            keep[best_k] = True
+            stack.append((i, best_k))
+            stack.append((best_k, j))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def simplify_ring(ring, tolerance):
+    """Simplify a closed ring; keeps the original if simplification would collapse it."""
+    out = simplify_line(ring, tolerance)
+    return out if len(out) >= 4 else list(ring)
+
+
+def ring_area(ring):
+    """Signed area (shoelace). Positive for counter-clockwise rings in a y-up system."""
+    area = 0.0
+    for i in range(len(ring) - 1):
+        area += ring[i][0] * ring[i + 1][1] - ring[i + 1][0] * ring[i][1]
+    return area / 2.0
+
+
+def _clip_edge(points, inside, intersect):
+    out = []
+    if not points:
+        return out
+    prev = points[-1]
+    prev_in = inside(prev)
+    for cur in points:
+        cur_in = inside(cur)
+        if cur_in:
+            if not prev_in:
+                out.append(intersect(prev, cur))
+            out.append(cur)
+        elif prev_in:
+            out.append(intersect(prev, cur))
+        prev, prev_in = cur, cur_in
+    return out
+
+
+def clip_ring(ring, xmin, ymin, xmax, ymax):
+    """Clip a closed ring to a rectangle (Sutherland-Hodgman). Returns a closed ring or []."""
+    pts = [(p[0], p[1]) for p in ring[:-1]] if len(ring) > 1 and ring[0] == ring[-1] else [(p[0], p[1]) for p in ring]
+
+    def x_cut(x):
+        return lambda a, b: (x, a[1] + (b[1] - a[1]) * (x - a[0]) / (b[0] - a[0]))
+
+    def y_cut(y):
+        return lambda a, b: (a[0] + (b[0] - a[0]) * (y - a[1]) / (b[1] - a[1]), y)
+
+    pts = _clip_edge(pts, lambda p: p[0] >= xmin, x_cut(xmin))
+    pts = _clip_edge(pts, lambda p: p[0] <= xmax, x_cut(xmax))
+    pts = _clip_edge(pts, lambda p: p[1] >= ymin, y_cut(ymin))
+    pts = _clip_edge(pts, lambda p: p[1] <= ymax, y_cut(ymax))
+    if len(pts) < 3:
+        return []
+    return pts + [pts[0]]
+
+
+def polygons_of(geom):
+    """List of polygons (each a list of rings) for a Polygon or MultiPolygon geometry."""
+    if not geom or not geom.get("coordinates"):
+        return []
+    if geom.get("type") == "Polygon":
+        return [geom["coordinates"]]
+    if geom.get("type") == "MultiPolygon":
+        return list(geom["coordinates"])
+    return []
+
+
+def centroid(geom):
+    """Area-weighted centroid of a Polygon/MultiPolygon as a GeoJSON Point (holes subtract), like ST_Centroid."""
+    if geom and geom.get("type") == "Point":
+        return geom
+    sx = sy = area = 0.0
+    vertices = []
+    for rings in polygons_of(geom):
+        for k, ring in enumerate(rings):
+            signed = ring_area(ring)
+            a = abs(signed) * (1 if k == 0 else -1)
+            cx = cy = 0.0
+            if signed:
+                for p, q in zip(ring, ring[1:]):
+                    cross = p[0] * q[1] - q[0] * p[1]
+                    cx += (p[0] + q[0]) * cross
+                    cy += (p[1] + q[1]) * cross
+                sx += cx / (6 * signed) * a
+                sy += cy / (6 * signed) * a
+            area += a
+            vertices.extend(ring[:-1])
+    if area:
+        return {"type": "Point", "coordinates": [sx / area, sy / area]}
+    if vertices:
+        return {"type": "Point", "coordinates": [
+            sum(v[0] for v in vertices) / len(vertices), sum(v[1] for v in vertices) / len(vertices),
+        ]}
+    return None
+
+
+def envelope(geom):
+    """Bounding box of a geometry as a GeoJSON Polygon (a Point for a single position), like ST_Envelope."""
+    xs, ys = [], []
+
+    def walk(c):
+        if c and isinstance(c[0], (int, float)):
+            xs.append(c[0])
+            ys.append(c[1])
+        else:
+            for part in c or ():
+                walk(part)
+
+    walk((geom or {}).get("coordinates"))
+    if not xs:
+        return None
+    x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+    if x0 == x1 and y0 == y1:
+        return {"type": "Point", "coordinates": [x0, y0]}
+    return {"type": "Polygon", "coordinates": [[[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]]}
+
+
+def _round_ring(ring, digits):
+    out = []
+    for c in ring:
+        p = [round(c[0], digits), round(c[1], digits)]
+        if not out or out[-1] != p:
+            out.append(p)
+    return out
+
+
+def _ring_edges(ring):
+    return [(ring[i][0], ring[i][1], ring[i + 1][0], ring[i + 1][1]) for i in range(len(ring) - 1)]
+
+
+def _ring_is_simple(edges) -> bool:
+    """No two non-adjacent edges of a closed ring touch or cross."""
+    n = len(edges)
+    if n < 3:
+        return False
+    for i in range(n):
+        for j in range(i + 2, n - (1 if i == 0 else 0)):
+            if _segments_cross(edges[i], edges[j]):
+                return False
+    return True
+
+
+def _point_in_ring(x, y, ring) -> bool:
+    inside = False
+    for i in range(len(ring) - 1):
+        x1, y1, x2, y2 = ring[i][0], ring[i][1], ring[i + 1][0], ring[i + 1][1]
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+
+def _polygon_is_valid(rings) -> bool:
+    """Simple, non-degenerate rings; holes neither touch nor cross the shell or each other, and lie inside it."""
+    edges = [_ring_edges(r) for r in rings]
+    if any(not _ring_is_simple(e) or ring_area(r) == 0 for r, e in zip(rings, edges)):
+        return False
+    for a in range(len(rings)):
+        for b in range(a + 1, len(rings)):
+            if any(_segments_cross(ea, eb) for ea in edges[a] for eb in edges[b]):
+                return False
+    shell = rings[0]
+    return all(_point_in_ring(h[0][0], h[0][1], shell) for h in rings[1:])
+
+
+def simplify_geometry(geom, tolerance=None, digits=None):
+    """Simplified, coordinate-rounded copy of a Polygon/MultiPolygon (other types pass through).
+
+    Like ST_SimplifyPreserveTopology, the result stays valid: each polygon is simplified with
+    Douglas-Peucker ring by ring, then checked (no self-crossing rings, holes inside their shell
+    and clear of other rings). A polygon that fails is retried at half the tolerance, twice, and
+    otherwise kept as it was. digits limits decimal places, under the same check.
+    """
+    if not geom or geom.get("type") not in ("Polygon", "MultiPolygon") or not geom.get("coordinates"):
+        return geom
+
+    def ring_out(ring, tol):
+        r = simplify_ring(ring, tol) if tol else ring
+        if digits is not None:
+            rounded = _round_ring(r, digits)
+            r = rounded if len(rounded) >= 4 else r
+        return r
+
+    def polygon_out(rings):
+        tol = tolerance
+        for _ in range(3):
+            out = [ring_out(ring, tol) for ring in rings]
+            if _polygon_is_valid(out):
+                return out
+            if not tol:
+                break
+            tol /= 2
+        return [list(ring) for ring in rings]
+
+    polys = [polygon_out(rings) for rings in polygons_of(geom)]
+    coords = polys[0] if geom["type"] == "Polygon" else polys
+    return {"type": geom["type"], "coordinates": coords}
+
+
+def _segments_cross(a, b, strict=False):
+    """Do segments a and b, as (x1, y1, x2, y2), cross? strict=False also counts touching."""
+    ax1, ay1, ax2, ay2 = a
+    bx1, by1, bx2, by2 = b
+    d1 = (bx2 - bx1) * (ay1 - by1) - (by2 - by1) * (ax1 - bx1)
+    d2 = (bx2 - bx1) * (ay2 - by1) - (by2 - by1) * (ax2 - bx1)
+    d3 = (ax2 - ax1) * (by1 - ay1) - (ay2 - ay1) * (bx1 - ax1)
+    d4 = (ax2 - ax1) * (by2 - ay1) - (ay2 - ay1) * (bx2 - ax1)
+    if strict:
+        return d1 * d2 < 0 and d3 * d4 < 0
+    return (
+        min(ax1, ax2) <= max(bx1, bx2) and min(bx1, bx2) <= max(ax1, ax2)
+        and min(ay1, ay2) <= max(by1, by2) and min(by1, by2) <= max(ay1, ay2)
+        and d1 * d2 <= 0 and d3 * d4 <= 0
+    )
+
+
+class PackedPolygons:
+    """Ring edges of many (multi)polygons packed into flat coordinate arrays.
+
+    contains() runs an even-odd ray cast over every ring of each candidate at once, so
+    holes and MultiPolygon parts need no special casing. select() relates candidates to a
+    drawn region with the same arrays (vertices inside, edges crossing). Uses NumPy when installed.
+    """
+
+    def __init__(self, geometries):
+        x1, y1, x2, y2 = [], [], [], []
+        offsets = [0]
+        for geom in geometries:
+            for rings in polygons_of(geom):
+                for ring in rings:
+                    for a, b in zip(ring, ring[1:]):
+                        x1.append(a[0])
+                        y1.append(a[1])
+                        x2.append(b[0])
+                        y2.append(b[1])
+            offsets.append(len(x1))
+        self.offsets = offsets
+        if np is not None:
+            self.x1, self.y1 = np.array(x1, dtype=np.float64), np.array(y1, dtype=np.float64)
+            self.x2, self.y2 = np.array(x2, dtype=np.float64), np.array(y2, dtype=np.float64)
+            self.offsets_arr = np.array(offsets, dtype=np.int64)
+        else:
+            self.x1, self.y1, self.x2, self.y2 = x1, y1, x2, y2
+
+    def _gather(self, cands):
+        """Edge indices of every candidate in one run, and where each candidate's edges begin."""
+        cand_arr = np.asarray(cands)
+        starts = self.offsets_arr[cand_arr]
+        lengths = self.offsets_arr[cand_arr + 1] - starts
+        seg_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        idx = np.arange(int(lengths.sum())) + np.repeat(starts - seg_starts, lengths)
+        return idx, seg_starts
+
+    def _crossings(self, x, y, idx, seg_starts):
+        x1, y1, x2, y2 = self.x1[idx], self.y1[idx], self.x2[idx], self.y2[idx]
+        straddles = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        crossings = straddles & (x < x_cross)
+        return np.add.reduceat(crossings.astype(np.int64), seg_starts)
+
+    def contains(self, x, y, candidates):
+        """Subset of candidate geometry positions whose polygon contains (x, y), in order."""
+        cands = [i for i in candidates if self.offsets[i + 1] > self.offsets[i]]
+        if not cands:
+            return []
+        if np is None:
+            return [i for i in cands if self._contains_py(x, y, i)]
+        idx, seg_starts = self._gather(cands)
+        counts = self._crossings(x, y, idx, seg_starts)
+        return [c for c, n in zip(cands, counts.tolist()) if n % 2 == 1]
+
+    def distances(self, x, y, candidates, x_scale=1.0):
+        """Distance from (x, y) to each candidate polygon (0 inside, inf if it has no rings).
+
+        x offsets are multiplied by x_scale first (cos(latitude) makes lon/lat roughly isotropic).
+        """
+        cands = list(candidates)
+        out = [math.inf] * len(cands)
+        nonempty = [k for k, i in enumerate(cands) if self.offsets[i + 1] > self.offsets[i]]
+        if not nonempty:
+            return out
+        if np is None:
+            for k in nonempty:
+                out[k] = self._distance_py(x, y, cands[k], x_scale)
+            return out
+        idx, seg_starts = self._gather([cands[k] for k in nonempty])
+        inside = self._crossings(x, y, idx, seg_starts) % 2 == 1
+        ax, ay = (self.x1[idx] - x) * x_scale, self.y1[idx] - y
+        dx, dy = (self.x2[idx] - self.x1[idx]) * x_scale, self.y2[idx] - self.y1[idx]
+        d2 = dx * dx + dy * dy
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(d2 > 0, -(ax * dx + ay * dy) / d2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        edge = np.hypot(ax + t * dx, ay + t * dy)
+        nearest = np.minimum.reduceat(edge, seg_starts)
+        for k, d, ins in zip(nonempty, nearest.tolist(), inside.tolist()):
+            out[k] = 0.0 if ins else d
+        return out
+
+    def select(self, region, candidates, mode="intersects"):
+        """Candidates (in order) whose polygon intersects, or lies within, region.
+
+        region is a PackedPolygons holding one (multi)polygon. A candidate intersects it if
+        one of its vertices is inside, an edge crosses the region's boundary, or the region
+        sits inside it. It is within if every vertex and edge midpoint is inside or on the
+        region's boundary, no edge properly crosses the boundary and no region ring (a hole)
+        sits inside it; a candidate whose outline lies wholly on the region's boundary must
+        also have its interior inside (it may fill a hole). Like ST_Intersects and ST_Within,
+        boundary touches count as intersecting and a parcel sharing edges with the region is
+        within it.
+        """
+        cands = [i for i in candidates if self.offsets[i + 1] > self.offsets[i]]
+        if not cands or not region.offsets[-1]:
+            return []
+        if np is None:
+            return [i for i in cands if self._select_py(region, i, mode)]
+        within = mode == "within"
+        idx, seg_starts = self._gather(cands)
+        lengths = np.diff(np.append(seg_starts, len(idx)))
+        owner = np.repeat(np.arange(len(cands)), lengths)
+        vx, vy = self.x1[idx], self.y1[idx]
+        inside = region._points_inside(vx, vy)
+        if within:
+            mx, my = (vx + self.x2[idx]) / 2, (vy + self.y2[idx]) / 2
+            v_on, m_on = region._points_on_boundary(vx, vy), region._points_on_boundary(mx, my)
+            inside = (inside | v_on) & (region._points_inside(mx, my) | m_on)
+            on_outline = np.add.reduceat((v_on & m_on).astype(np.int64), seg_starts) == lengths
+        n_inside = np.add.reduceat(inside.astype(np.int64), seg_starts)
+        # Decided by vertices alone: intersects if any is inside; not within unless all are
+        result = n_inside == lengths if within else n_inside > 0
+        todo = result if within else ~result
+        sel = todo[owner]
+        if sel.any():
+            crosses = region._edges_cross(
+                self.x1[idx[sel]], self.y1[idx[sel]], self.x2[idx[sel]], self.y2[idx[sel]], strict=within,
+            )
+            crossed = np.bincount(owner[sel], weights=crosses, minlength=len(cands)) > 0
+            result = result & ~crossed if within else result | crossed
+        if within and (result & on_outline).any():
+            for k in np.flatnonzero(result & on_outline).tolist():
+                result[k] = region._covers_interior_of(self, cands[k])
+        # A region ring entirely inside the parcel: a hole (not within) or the whole region (intersects)
+        check = [c for c, r in zip(cands, result.tolist()) if r == within]
+        enclosing = set()
+        for k in region._ring_starts() if check else ():
+            x, y = float(region.x1[k]), float(region.y1[k])
+            enclosing.update(c for c in self.contains(x, y, check) if not (within and self._on_boundary_py(x, y, c)))
+        return [c for c, r in zip(cands, result.tolist()) if r != (c in enclosing)]
+
+    def _ring_starts(self):
+        """Edge index where each ring begins (a ring's first edge does not continue the previous edge)."""
+        return [
+            k for k in range(self.offsets[-1])
+            if k == 0 or self.x1[k] != self.x2[k - 1] or self.y1[k] != self.y2[k - 1]
+        ]
+
+    def _points_inside(self, px, py, chunk_cells=2_000_000):
+        """Even-odd test of many points against all rings here (NumPy arrays in, bool array out)."""
+        out = np.zeros(len(px), dtype=bool)
+        step = max(1, chunk_cells // max(1, len(self.x1)))
+        for s in range(0, len(px), step):
+            x, y = px[s:s + step, None], py[s:s + step, None]
+            straddles = (self.y1 > y) != (self.y2 > y)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_cross = self.x1 + (y - self.y1) * (self.x2 - self.x1) / (self.y2 - self.y1)
+            out[s:s + step] = (np.count_nonzero(straddles & (x < x_cross), axis=1) % 2) == 1
+        return out
+
+    def _points_on_boundary(self, px, py, eps=BOUNDARY_EPS, chunk_cells=2_000_000):
+        """Per point: is it within eps of an edge here (NumPy arrays in, bool array out)?"""
+        out = np.zeros(len(px), dtype=bool)
+        dx, dy = self.x2 - self.x1, self.y2 - self.y1
+        d2 = dx * dx + dy * dy
+        step = max(1, chunk_cells // max(1, len(self.x1)))
+        for s in range(0, len(px), step):
+            ax, ay = px[s:s + step, None] - self.x1, py[s:s + step, None] - self.y1
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = np.clip(np.where(d2 > 0, (ax * dx + ay * dy) / d2, 0.0), 0.0, 1.0)
+            out[s:s + step] = (np.hypot(ax - t * dx, ay - t * dy) <= eps).any(axis=1)
+        return out
+
+    def _edges_cross(self, ax1, ay1, ax2, ay2, strict=False, chunk_cells=2_000_000):
+        """Per segment a: does it cross any edge here? strict=False also counts touching."""
+        out = np.zeros(len(ax1), dtype=bool)
+        bx1, by1, bx2, by2 = self.x1, self.y1, self.x2, self.y2
+        step = max(1, chunk_cells // max(1, len(bx1)))
+        for s in range(0, len(ax1), step):
+            x1, y1 = ax1[s:s + step, None], ay1[s:s + step, None]
+            x2, y2 = ax2[s:s + step, None], ay2[s:s + step, None]
+            d1 = (bx2 - bx1) * (y1 - by1) - (by2 - by1) * (x1 - bx1)
+            d2 = (bx2 - bx1) * (y2 - by1) - (by2 - by1) * (x2 - bx1)
+            d3 = (x2 - x1) * (by1 - y1) - (y2 - y1) * (bx1 - x1)
+            d4 = (x2 - x1) * (by2 - y1) - (y2 - y1) * (bx2 - x1)
+            if strict:
+                hit = (d1 * d2 < 0) & (d3 * d4 < 0)
+            else:
+                overlap = (
+                    (np.minimum(x1, x2) <= np.maximum(bx1, bx2)) & (np.minimum(bx1, bx2) <= np.maximum(x1, x2))
+                    & (np.minimum(y1, y2) <= np.maximum(by1, by2)) & (np.minimum(by1, by2) <= np.maximum(y1, y2))
+                )
+                hit = overlap & (d1 * d2 <= 0) & (d3 * d4 <= 0)
+            out[s:s + step] = hit.any(axis=1)
+        return out
+
+    def _select_py(self, region, i, mode):
+        within = mode == "within"
+        edges = range(self.offsets[i], self.offsets[i + 1])
+        if within:
+            def covered(x, y):
+                return region._contains_py(x, y, 0) or region._on_boundary_py(x, y, 0)
+
+            inside = [
+                covered(self.x1[k], self.y1[k])
+                and covered((self.x1[k] + self.x2[k]) / 2, (self.y1[k] + self.y2[k]) / 2)
+                for k in edges
+            ]
+            on_outline = all(
+                region._on_boundary_py(self.x1[k], self.y1[k], 0)
+                and region._on_boundary_py((self.x1[k] + self.x2[k]) / 2, (self.y1[k] + self.y2[k]) / 2, 0)
+                for k in edges
+            )
+            if all(inside) and on_outline and not region._covers_interior_of(self, i):
+                return False
+        else:
+            inside = [region._contains_py(self.x1[k], self.y1[k], 0) for k in edges]
+        if within and not all(inside):
+            return False
+        if not within and any(inside):
+            return True
+        for k in edges:
+            a = (self.x1[k], self.y1[k], self.x2[k], self.y2[k])
+            for r in range(region.offsets[0], region.offsets[1]):
+                if _segments_cross(a, (region.x1[r], region.y1[r], region.x2[r], region.y2[r]), within):
+                    return not within
+        enclosed = any(
+            self._contains_py(region.x1[k], region.y1[k], i)
+            and not (within and self._on_boundary_py(region.x1[k], region.y1[k], i))
+            for k in region._ring_starts()
+        )
+        return not enclosed if within else enclosed
+
+    def _distance_py(self, x, y, i, x_scale):
+        if self._contains_py(x, y, i):
+            return 0.0
+        best = math.inf
+        for k in range(self.offsets[i], self.offsets[i + 1]):
+            ax, ay = (self.x1[k] - x) * x_scale, self.y1[k] - y
+            dx, dy = (self.x2[k] - self.x1[k]) * x_scale, self.y2[k] - self.y1[k]
+            d2 = dx * dx + dy * dy
+            t = min(1.0, max(0.0, -(ax * dx + ay * dy) / d2)) if d2 > 0 else 0.0
+            best = min(best, math.hypot(ax + t * dx, ay + t * dy))
+        return best
+
+    def _covers_interior_of(self, other, i):
+        """Does this (single-geometry) region contain a point just inside other's polygon i?
+
+        The point sits a hair off the middle of i's first edge, on the side inside i.
+        """
+        k = other.offsets[i]
+        x1, y1, x2, y2 = float(other.x1[k]), float(other.y1[k]), float(other.x2[k]), float(other.y2[k])
+        if x1 == x2 and y1 == y2:
+            return True
+        nx, ny = -(y2 - y1) * 1e-6, (x2 - x1) * 1e-6
+        for x, y in (((x1 + x2) / 2 + nx, (y1 + y2) / 2 + ny), ((x1 + x2) / 2 - nx, (y1 + y2) / 2 - ny)):
+            if other._contains_py(x, y, i):
+                return self._contains_py(x, y, 0)
+        return True
+
+    def _on_boundary_py(self, x, y, i, eps=BOUNDARY_EPS):
+        for k in range(self.offsets[i], self.offsets[i + 1]):
+            ax, ay = x - self.x1[k], y - self.y1[k]
+            dx, dy = self.x2[k] - self.x1[k], self.y2[k] - self.y1[k]
+            d2 = dx * dx + dy * dy
+            t = min(1.0, max(0.0, (ax * dx + ay * dy) / d2)) if d2 > 0 else 0.0
+            if math.hypot(ax - t * dx, ay - t * dy) <= eps:
+                return True
+        return False
+
+    def _contains_py(self, x, y, i):
+        inside = False
+        for k in range(self.offsets[i], self.offsets[i + 1]):
+            x1, y1, x2, y2 = self.x1[k], self.y1[k], self.x2[k], self.y2[k]
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+
+def esri_to_geojson(geom):
+    """Convert an Esri JSON geometry (rings / x,y) to GeoJSON.
+
+    Esri outer rings are clockwise and holes counter-clockwise; each hole is attached to
+    the outer ring before it, which is how ArcGIS Server orders them.
+    """
+    if not geom:
+        return None
+    if "x" in geom and "y" in geom:
+        return {"type": "Point", "coordinates": [geom["x"], geom["y"]]}
+    rings = geom.get("rings")
+    if not rings:
+        return None
+    polys = []
+    for ring in rings:
+        if len(ring) < 4:
+            continue
+        ring = [[c[0], c[1]] for c in ring]
+        area = ring_area(ring)
+        if area == 0:
+            continue
+        # GeoJSON (RFC 7946) winding is the reverse: outer counter-clockwise, holes clockwise
+        ring.reverse()
+        if area < 0 or not polys:
+            if area > 0:
+                ring.reverse()
+            polys.append([ring])
+        else:
+            polys[-1].append(ring)
+    if not polys:
+        return None
+    if len(polys) == 1:
+        return {"type": "Polygon", "coordinates": polys[0]}
+    return {"type": "MultiPolygon", "coordinates": polys}
+
+
+_WKB_TYPES = {
+    "Point": 1, "LineString": 2, "Polygon": 3, "MultiPoint": 4, "MultiLineString": 5, "MultiPolygon": 6,
+}
+
+
+def geojson_to_wkb(geom) -> bytes:
+    """Little-endian 2D WKB for a GeoJSON geometry (GeometryCollection unsupported: returns None)."""
+    if not geom or geom.get("type") not in _WKB_TYPES:
+        return None
+    out = bytearray()
+
+    def points(coords):
+        out.extend(struct.pack("<I", len(coords)))
+        for c in coords:
+            out.extend(struct.pack("<2d", c[0], c[1]))
+
+    def write(gtype, coords):
+        out.extend(struct.pack("<BI", 1, _WKB_TYPES[gtype]))
+        if gtype == "Point":
+            out.extend(struct.pack("<2d", coords[0], coords[1]))
+        elif gtype == "LineString":
+            points(coords)
+        elif gtype == "Polygon":
+            out.extend(struct.pack("<I", len(coords)))
+            for ring in coords:
+                points(ring)
+        else:
+            part = gtype[len("Multi"):]
+            out.extend(struct.pack("<I", len(coords)))
+            for c in coords:
+                write(part, c)
+
+    write(geom["type"], geom.get("coordinates") or [])
+    return bytes(out)
+
+
+def geojson_to_wkt(geom) -> str:
+    """WKT for a GeoJSON geometry, as ST_AsText writes it (GeometryCollection unsupported: returns None)."""
+    if not geom or geom.get("type") not in _WKB_TYPES:
+        return None
+
+    def point(c):
+        return f"{c[0]:.15g} {c[1]:.15g}"
+
+    def body(gtype, coords):
+        if gtype == "Point":
+            return "(" + point(coords) + ")"
+        if gtype == "LineString":
+            return "(" + ",".join(point(c) for c in coords) + ")"
+        if gtype == "Polygon":
+            return "(" + ",".join(body("LineString", ring) for ring in coords) + ")"
+        part = gtype[len("Multi"):]
+        if part == "Point":
+            return "(" + ",".join(point(c) for c in coords) + ")"
+        return "(" + ",".join(body(part, c) for c in coords) + ")"
+
+    gtype, coords = geom["type"], geom.get("coordinates") or []
+    if not coords:
+        return gtype.upper() + " EMPTY"
+    return gtype.upper() + body(gtype, coords)
@@ -0,0 +1,200 @@
+"""
+Prometheus-style metrics for the Parcel API, with no client library needed.
+
+Counters and histograms are kept in plain dicts keyed by label values and
+rendered in the text exposition format (version 0.0.4) by render(). Per-request
+phase timings (db, arcgis, serialize, ...) and the answering data source are
+collected in a context variable set up by the app's metrics middleware, so hot
+paths only pay for a dict update.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROWS_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 2000, 5000, 10000)
+_LE_INF = 'le="+Inf"'
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(v)}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        k = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            st = self._values.get(labels)
+            if st is None:
+                st = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            if k < len(self.buckets):
+                st[k] += 1
+            st[-2] += value
+            st[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, list(st)) for labels, st in self._values.items())
+        for labels, st in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, st):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, (le,))} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, labels, (_LE_INF,))} {st[-1]}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(st[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {st[-1]}"
+
+
+REQUEST_SECONDS = Histogram(
+    "parcel_api_request_duration_seconds", "Time to produce response headers, by route.",
+    ("method", "route", "status"),
+)
+PHASE_SECONDS = Histogram(
+    "parcel_api_phase_duration_seconds", "Time spent per request phase (db_wait, db, arcgis, serialize).",
+    ("route", "phase"),
+)
+SOURCE_TOTAL = Counter(
+    "parcel_api_source_total", "Requests by the data source that answered them.", ("route", "source"),
+)
+RESPONSE_BYTES = Histogram(
+    "parcel_api_response_bytes", "Response body size, by route.", ("route",), buckets=BYTES_BUCKETS,
+)
+RESPONSE_ROWS = Histogram(
+    "parcel_api_response_rows", "Features/rows per response, by route.", ("route",), buckets=ROWS_BUCKETS,
+)
+
+_current = contextvars.ContextVar("parcel_api_request_metrics", default=None)
+
+
+def start_request(scope) -> dict:
+    """Begin collecting phases/source for the current request; returns the collector."""
+    state = {"phases": {}, "source": None, "scope": scope}
+    _current.set(state)
+    return state
+
+
+def route_of(state) -> str:
+    """Route template of the request (e.g. /parcels/tiles/{z}/{x}/{y}.mvt), known once routing ran."""
+    route = state["scope"].get("route") if state else None
+    return getattr(route, "path", None) or "unmatched"
+
+
+def add_phase(name: str, seconds: float):
+    state = _current.get()
+    if state is not None:
+        state["phases"][name] = state["phases"].get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block as a named phase of the current request."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase(name, time.perf_counter() - t0)
+
+
+def set_source(source: str):
+    """Record which data source (postgis, arcgis, demo, cache, ...) answered the current request."""
+    state = _current.get()
+    if state is not None:
+        state["source"] = source
+
+
+def observe_response(nbytes: int, rows: int = None, serialize_seconds: float = None):
+    """Record body size and row count for the current request.
+
+    serialize_seconds is for streamed bodies, which finish after the request's phases were
+    reported; it goes straight into the phase histogram.
+    """
+    state = _current.get()
+    if state is None:
+        return
+    route = route_of(state)
+    RESPONSE_BYTES.observe(nbytes, route)
+    if rows is not None:
+        RESPONSE_ROWS.observe(rows, route)
+    if serialize_seconds is not None:
+        PHASE_SECONDS.observe(serialize_seconds, route, "serialize")
+
+
+def finish_request(state: dict, method: str, route: str, status: int, seconds: float):
+    REQUEST_SECONDS.observe(seconds, method, route, str(status))
+    for name, secs in state["phases"].items():
+        PHASE_SECONDS.observe(secs, route, name)
+    if state["source"]:
+        SOURCE_TOTAL.inc(route, state["source"])
+
+
+def server_timing(state: dict, total_seconds: float) -> str:
+    """Server-Timing entries for the collected phases plus the total."""
+    parts = [f"{name};dur={secs * 1000:.2f}" for name, secs in state["phases"].items()]
+    parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    if state["source"]:
+        parts.append(f'source;desc="{state["source"]}"')
+    return ", ".join(parts)
+
+
+def render(extra_lines=()) -> str:
+    """All metrics in Prometheus text format; extra_lines are appended as-is (e.g. gauges)."""
+    lines = []
+    for metric in (REQUEST_SECONDS, PHASE_SECONDS, SOURCE_TOTAL, RESPONSE_BYTES, RESPONSE_ROWS):
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name: str, help_text: str, values: dict, label: str = None):
+    """Render a gauge from a {label value: number} dict (or {None: number} without a label)."""
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} gauge"
+    for k, v in values.items():
+        if v is None:
+            continue
+        labels = f'{{{label}="{_escape(k)}"}}' if label else ""
+        yield f"{name}{labels} {_number(v)}"
@@ -0,0 +1,180 @@
+"""
+Minimal Mapbox Vector Tile (v2.1) encoder for the Parcel API's demo mode.
+
+PostGIS builds tiles with ST_AsMVT; this produces the same single-layer polygon
+tiles from GeoJSON features so demo/offline mode can serve /parcels/tiles too.
+Spec: https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+import math
+import struct
+from decimal import Decimal
+
+from geometry import clip_ring, polygons_of, ring_area, simplify_line
+
+EXTENT = 4096
+BUFFER = 64
+
+_CMD_MOVE_TO = 1
+_CMD_LINE_TO = 2
+_CMD_CLOSE_PATH = 7
+_GEOM_POLYGON = 3
+
+
+def tile_bounds(z, x, y):
+    """(min_lon, min_lat, max_lon, max_lat) of an XYZ tile."""
+    n = 2 ** z
+
+    def lat(yy):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * yy / n))))
+
+    return (x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y))
+
+
+def _project(z, x, y, extent):
+    """lon/lat -> tile pixel coordinates (y down) for tile z/x/y."""
+    n = 2 ** z
+
+    def project(lon, lat):
+        lat = max(-85.0511287798, min(85.0511287798, lat))
+        px = ((lon + 180.0) / 360.0 * n - x) * extent
+        s = math.sin(math.radians(lat))
+        py = ((0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * n - y) * extent
+        return px, py
+
+    return project
+
+
+# --- protobuf wire encoding ---
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _len_field(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field, ints):
+    return _len_field(field, b"".join(_varint(i) for i in ints))
+
+
+def _encode_value(v):
+    if isinstance(v, bool):
+        return _key(7, 0) + _varint(int(v))
+    if isinstance(v, int):
+        return _key(6, 0) + _varint(_zigzag(v) & 0xFFFFFFFFFFFFFFFF)
+    if isinstance(v, (float, Decimal)):
+        return _key(3, 1) + struct.pack("<d", float(v))
+    return _len_field(1, str(v).encode("utf-8"))
+
+
+# --- geometry ---
+
+def _ring_to_tile(ring, project, tolerance):
+    """Project, clip, simplify and snap one ring to integer tile coordinates."""
+    pts = [project(c[0], c[1]) for c in ring]
+    pts = clip_ring(pts, -BUFFER, -BUFFER, EXTENT + BUFFER, EXTENT + BUFFER)
+    if not pts:
+        return []
+    pts = simplify_line(pts, tolerance)
+    snapped = []
+    for px, py in pts[:-1]:
+        p = (int(round(px)), int(round(py)))
+        if not snapped or snapped[-1] != p:
+            snapped.append(p)
+    if len(snapped) > 1 and snapped[-1] == snapped[0]:
+        snapped.pop()
+    if len(snapped) < 3:
+        return []
+    snapped.append(snapped[0])
+    if ring_area(snapped) == 0:
+        return []
+    return snapped
+
+
+def _polygon_commands(polygons, project, tolerance):
+    """Geometry command integers for a (multi)polygon; empty if nothing survives clipping."""
+    cmds = []
+    cx = cy = 0
+    for rings in polygons:
+        for i, ring in enumerate(rings):
+            pts = _ring_to_tile(ring, project, tolerance)
+            if not pts:
+                if i == 0:
+                    break  # exterior gone -> skip its holes
+                continue
+            pts = pts[:-1]  # ClosePath replaces the repeated first point
+            # Exterior rings have positive area in tile coords (y down), holes negative
+            area = ring_area(pts + [pts[0]])
+            if (i == 0 and area < 0) or (i > 0 and area > 0):
+                pts.reverse()
+            cmds.append((1 << 3) | _CMD_MOVE_TO)
+            cmds.append(_zigzag(pts[0][0] - cx))
+            cmds.append(_zigzag(pts[0][1] - cy))
+            cx, cy = pts[0]
+            cmds.append(((len(pts) - 1) << 3) | _CMD_LINE_TO)
+            for px, py in pts[1:]:
+                cmds.append(_zigzag(px - cx))
+                cmds.append(_zigzag(py - cy))
+                cx, cy = px, py
+            cmds.append((1 << 3) | _CMD_CLOSE_PATH)
+    return cmds
+
+
+def encode_tile(features, z, x, y, layer_name="parcels", attributes=None, tolerance=1.0):
+    """Encode GeoJSON polygon features as a one-layer MVT tile.
+
+    attributes limits which properties are written; tolerance is the Douglas-Peucker
+    tolerance in tile pixels (1/EXTENT of the tile width). Returns b"" for an empty tile.
+    """
+    project = _project(z, x, y, EXTENT)
+    keys, key_index = [], {}
+    values, value_index = [], {}
+    encoded = []
+    for fid, f in enumerate(features):
+        cmds = _polygon_commands(polygons_of(f.get("geometry")), project, tolerance)
+        if not cmds:
+            continue
+        tags = []
+        for k, v in (f.get("properties") or {}).items():
+            if v is None or (attributes is not None and k not in attributes):
+                continue
+            if not isinstance(v, (str, int, float, bool, Decimal)):
+                v = str(v)
+            if k not in key_index:
+                key_index[k] = len(keys)
+                keys.append(k)
+            vkey = (type(v).__name__, v)
+            if vkey not in value_index:
+                value_index[vkey] = len(values)
+                values.append(_encode_value(v))
+            tags.extend((key_index[k], value_index[vkey]))
+        body = _key(1, 0) + _varint(fid + 1)
+        if tags:
+            body += _packed(2, tags)
+        body += _key(3, 0) + _varint(_GEOM_POLYGON) + _packed(4, cmds)
+        encoded.append(body)
+    if not encoded:
+        return b""
+    layer = _key(15, 0) + _varint(2) + _len_field(1, layer_name.encode("utf-8"))
+    layer += b"".join(_len_field(2, f) for f in encoded)
+    layer += b"".join(_len_field(3, k.encode("utf-8")) for k in keys)
+    layer += b"".join(_len_field(4, v) for v in values)
+    layer += _key(5, 0) + _varint(EXTENT)
+    return _len_field(3, layer)
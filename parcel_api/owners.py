@@ -0,0 +1,31 @@
+"""
+Normalized owner keys for portfolio lookups.
+
+The same function runs in scripts/load_parcels_to_postgis.py (stored in the
+indexed owner_key column) and in the API (for the owner being looked up), so
+"Smith, John A. Trust" and "JOHN A SMITH" land on the same key.
+"""
+import re
+
+# Entity and legal words that don't identify who the owner is
+OWNER_STOPWORDS = frozenset({
+    "LLC", "LC", "PLLC", "INC", "INCORPORATED", "CORP", "CORPORATION", "CO", "COMPANY",
+    "LTD", "LIMITED", "LP", "LLP", "PC", "PA", "TRUST", "TR", "TRS", "TRST", "TRUSTEE",
+    "TRUSTEES", "TTEE", "ETAL", "ETUX", "ETVIR", "THE",
+})
+
+_DOTTED = re.compile(r"(?<=\b[A-Z])\.(?=[A-Z]\b)")  # L.L.C. -> LLC
+_MULTIWORD = re.compile(r"\b(?:ET\s+(?:AL|UX|VIR)|L\s+L\s+C|L\s+P)\b")
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+def owner_key(name) -> str:
+    """Uppercase name words, minus punctuation and entity suffixes, sorted: 'Smith, John LLC' -> 'JOHN SMITH'.
+
+    Returns "" when nothing identifying is left (e.g. a blank or suffix-only owner).
+    """
+    s = _DOTTED.sub("", str(name or "").upper())
+    s = _NON_ALNUM.sub(" ", s)
+    s = _MULTIWORD.sub(" ", s)
+    words = {w for w in s.split() if w not in OWNER_STOPWORDS}
+    return " ".join(sorted(words))
@@ -0,0 +1,136 @@
+"""
+Field projection and geometry modes for parcel responses (?fields=apn,owner,acres&geometry=centroid).
+
+One Projection renders the SELECT list for PostGIS, so dropped columns and full polygons
+never leave the database, and trims demo/ArcGIS/cached features the same way in Python.
+With fields=, features carry only those properties plus the ones an endpoint computes
+(distance_m, score); other source attributes (e.g. raw ArcGIS layer fields) are dropped.
+
+Geometry modes:
+  full        the stored polygon (the default)
+  simplified  topology-preserving simplification (ST_SimplifyPreserveTopology / Douglas-Peucker)
+  centroid    a Point (ST_Centroid)
+  bbox        the bounding box as a Polygon (ST_Envelope)
+  none        geometry: null
+"""
+import json
+import os
+
+from geometry import centroid, envelope, simplify_geometry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PARCEL_FIELDS = ("apn", "address", "owner", "acres", "legal_desc", "market_value", "state", "county")
+GEOMETRY_MODES = ("full", "simplified", "centroid", "bbox", "none")
+COMPUTED_FIELDS = ("distance_m", "score")
+
+# geometry=simplified without a zoom/tolerance: ~1 m, coordinates rounded to 6 decimals
+SIMPLIFIED_TOLERANCE = float(os.environ.get("PARCEL_SIMPLIFIED_TOLERANCE", "0.00001"))
+SIMPLIFIED_DIGITS = 6
+
+
+class Projection:
+    """Which parcel properties and what geometry a response carries."""
+
+    def __init__(self, fields=None, geometry="full", tolerance=None, digits=None):
+        self.selected = fields is not None  # explicit fields=: drop everything else
+        self.fields = tuple(fields) if fields is not None else PARCEL_FIELDS
+        self.geometry = geometry
+        self.tolerance = tolerance
+        self.digits = digits
+        if geometry == "simplified" and tolerance is None:
+            self.tolerance, self.digits = SIMPLIFIED_TOLERANCE, SIMPLIFIED_DIGITS
+
+    @classmethod
+    def parse(cls, fields: str = None, geometry: str = "full"):
+        """Projection from query parameters; raises ValueError for unknown fields or modes."""
+        if geometry not in GEOMETRY_MODES:
+            raise ValueError(f"geometry must be one of: {', '.join(GEOMETRY_MODES)}")
+        names = None
+        if fields and fields.strip():
+            names = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+            unknown = [f for f in names if f not in PARCEL_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(PARCEL_FIELDS)})")
+        return cls(names, geometry)
+
+    def simplified(self, tolerance, digits):
+        """This projection with full geometry simplified to tolerance (e.g. from a map zoom)."""
+        if tolerance is None or self.geometry not in ("full", "simplified"):
+            return self
+        return Projection(self.fields if self.selected else None, "simplified", tolerance, digits)
+
+    @property
+    def is_default(self) -> bool:
+        return not self.selected and self.geometry == "full"
+
+    def geometry_sql(self, column: str = "geom", wkt: bool = False) -> str:
+        """SQL for the geometry as GeoJSON (or WKT) text; numbers are inlined (they come from validated floats)."""
+        if self.geometry == "none":
+            return "NULL::text"
+        if self.geometry == "centroid":
+            expr = f"ST_Centroid({column})"
+        elif self.geometry == "bbox":
+            expr = f"ST_Envelope({column})"
+        elif self.geometry == "simplified":
+            expr = f"ST_SimplifyPreserveTopology({column}, {float(self.tolerance)!r})"
+        else:
+            expr = column
+        digits = self.digits if self.geometry == "simplified" and self.digits is not None else None
+        if wkt:
+            return f"ST_AsText({expr}, {int(digits)})" if digits is not None else f"ST_AsText({expr})"
+        if self.geometry == "simplified":
+            return f"ST_AsGeoJSON({expr}, {int(digits if digits is not None else 9)})"
+        return f"ST_AsGeoJSON({expr})"
+
+    def select_sql(self, alias: str = None) -> str:
+        """Projected columns plus `... AS geometry`, e.g. for `SELECT {select_sql('p')} FROM parcels p`."""
+        prefix = f"{alias}." if alias else ""
+        columns = [prefix + f for f in self.fields]
+        columns.append(f"{self.geometry_sql(prefix + 'geom')} AS geometry")
+        return ", ".join(columns)
+
+    def csv_columns(self) -> list:
+        """CSV header: the projected fields, then `wkt` unless geometry=none."""
+        return list(self.fields) + ([] if self.geometry == "none" else ["wkt"])
+
+    def csv_select_sql(self, alias: str = None) -> str:
+        """Like select_sql, with the geometry as WKT in a `wkt` column (omitted for geometry=none)."""
+        prefix = f"{alias}." if alias else ""
+        columns = [prefix + f for f in self.fields]
+        if self.geometry != "none":
+            columns.append(f"{self.geometry_sql(prefix + 'geom', wkt=True)} AS wkt")
+        return ", ".join(columns)
+
+    def properties(self, props: dict) -> dict:
+        props = props or {}
+        if not self.selected:
+            return dict(props)
+        keep = set(self.fields) | set(COMPUTED_FIELDS)
+        return {k: v for k, v in props.items() if k in keep}
+
+    def geometry_of(self, geom):
+        """Project a geometry dict or raw GeoJSON text (full geometry passes through untouched)."""
+        if self.geometry == "full" or geom is None:
+            return geom
+        if self.geometry == "none":
+            return None
+        if isinstance(geom, (str, bytes)):
+            geom = orjson.loads(geom) if orjson is not None else json.loads(geom)
+        if self.geometry == "centroid":
+            return centroid(geom)
+        if self.geometry == "bbox":
+            return envelope(geom)
+        return simplify_geometry(geom, self.tolerance, self.digits)
+
+    def feature(self, f: dict) -> dict:
+        if self.is_default:
+            return f
+        return {
+            "type": "Feature",
+            "properties": self.properties(f.get("properties")),
+            "geometry": self.geometry_of(f.get("geometry")),
+        }
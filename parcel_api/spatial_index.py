@@ -0,0 +1,124 @@
+"""
+In-memory spatial index for the Parcel API's demo mode.
+
+STRTree is a static, Sort-Tile-Recursive packed R-tree over bounding boxes
+(min_x, min_y, max_x, max_y). It is built once when demo data loads and answers
+bbox queries without touching features whose boxes are far away, and nearest-
+neighbour queries by best-first search over the same nodes.
+"""
+import heapq
+import math
+
+
+def _union(entries):
+    return (
+        min(b[0] for b, _ in entries),
+        min(b[1] for b, _ in entries),
+        max(b[2] for b, _ in entries),
+        max(b[3] for b, _ in entries),
+    )
+
+
+def _str_order(entries, capacity):
+    """Order entries so consecutive runs of `capacity` are spatially compact (STR packing)."""
+    n = len(entries)
+    if n <= capacity:
+        return entries
+    slice_count = math.ceil(math.sqrt(math.ceil(n / capacity)))
+    slice_size = slice_count * capacity
+    by_x = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+    out = []
+    for s in range(0, n, slice_size):
+        out.extend(sorted(by_x[s:s + slice_size], key=lambda e: e[0][1] + e[0][3]))
+    return out
+
+
+class STRTree:
+    """Packed R-tree over boxes; query() returns the positions of intersecting boxes in input order.
+
+    None boxes are skipped (features without usable geometry are never returned).
+    """
+
+    def __init__(self, boxes, node_capacity=16):
+        self.node_capacity = max(2, node_capacity)
+        entries = [(tuple(b), i) for i, b in enumerate(boxes) if b is not None]
+        self.size = len(entries)
+        # _levels[0] holds (box, item position); _levels[k] holds (box, (start, end) in _levels[k-1])
+        self._levels = []
+        if not entries:
+            return
+        while True:
+            entries = _str_order(entries, self.node_capacity)
+            self._levels.append(entries)
+            if len(entries) <= self.node_capacity:
+                break
+            parents = []
+            for s in range(0, len(entries), self.node_capacity):
+                chunk = entries[s:s + self.node_capacity]
+                parents.append((_union(chunk), (s, s + len(chunk))))
+            entries = parents
+
+    def __len__(self):
+        return self.size
+
+    def query(self, bbox):
+        """Positions of all boxes intersecting bbox, ascending."""
+        if not self._levels:
+            return []
+        qx0, qy0, qx1, qy1 = bbox
+        levels = self._levels
+        out = []
+        stack = [(len(levels) - 1, 0, len(levels[-1]))]
+        while stack:
+            lvl, start, end = stack.pop()
+            nodes = levels[lvl]
+            for k in range(start, end):
+                box, payload = nodes[k]
+                if box[2] < qx0 or box[0] > qx1 or box[3] < qy0 or box[1] > qy1:
+                    continue
+                if lvl == 0:
+                    out.append(payload)
+                else:
+                    stack.append((lvl - 1, payload[0], payload[1]))
+        out.sort()
+        return out
+
+    def nearest(self, x, y, k, item_distances, max_distance=None, x_scale=1.0):
+        """The k positions nearest (x, y), as [(distance, position)] ascending.
+
+        Distances are Euclidean after multiplying x offsets by x_scale (e.g. cos(latitude)
+        for lon/lat). item_distances(positions) returns exact distances in the same units,
+        which must be no smaller than the distance to each item's box.
+        """
+        if not self._levels or k <= 0:
+            return []
+        levels = self._levels
+
+        def box_distance(box):
+            dx = max(box[0] - x, 0.0, x - box[2]) * x_scale
+            dy = max(box[1] - y, 0.0, y - box[3])
+            return math.hypot(dx, dy)
+
+        top = len(levels) - 1
+        # Heap entries: (distance, tiebreak, level, payload); level -1 marks an item with its exact distance
+        heap = [(0.0, 0, top, (0, len(levels[top])))]
+        counter = 1
+        out = []
+        while heap and len(out) < k:
+            dist, _, lvl, payload = heapq.heappop(heap)
+            if max_distance is not None and dist > max_distance:
+                break
+            if lvl == -1:
+                out.append((dist, payload))
+                continue
+            nodes = levels[lvl][payload[0]:payload[1]]
+            if lvl == 0:
+                positions = [p for _, p in nodes]
+                for d, p in zip(item_distances(positions), positions):
+                    heapq.heappush(heap, (d, counter, -1, p))
+                    counter += 1
+                continue
+            for box, child in nodes:
+                heapq.heappush(heap, (box_distance(box), counter, lvl - 1, child))
+                counter += 1
+        return out
@@ -0,0 +1,49 @@
+import pytest
+
+import app
+
+BBOX = {"min_lon": -95.37, "min_lat": 29.75, "max_lon": -95.35, "max_lat": 29.77}
+
+
+def test_default_cell_covers_the_demo_parcels(client):
+    body = client.get("/parcels/aggregate", params=BBOX).json()
+    # Demo mode snaps bbox width / 64 (0.0003125) to the nearest power of two
+    assert body["cell"] == 2.0 ** -12
+    assert sum(f["properties"]["parcels"] for f in body["features"]) == 2
+    assert sorted(f["properties"]["acres"] for f in body["features"]) == [0.18, 0.25]
+    assert {f["properties"]["median_market_value"] for f in body["features"]} == {85000.0, 120000.0}
+
+
+def test_large_cell_merges_parcels(client):
+    body = client.get("/parcels/aggregate", params={**BBOX, "cell": 1.0}).json()
+    assert body["cell"] == 1.0
+    [feature] = body["features"]
+    assert feature["properties"]["parcels"] == 2
+    assert feature["geometry"]["coordinates"] == [-95.0, 30.0]
+
+
+def test_too_many_cells_is_rejected(client):
+    r = client.get("/parcels/aggregate", params={**BBOX, "cell": 0.00001})
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith("Too many cells")
+
+
+@pytest.mark.parametrize("bbox", [
+    {**BBOX, "min_lon": -95.34},
+    {**BBOX, "min_lat": 29.77},
+    {**BBOX, "max_lat": 29.74, "cell": 0.001},
+])
+def test_empty_or_inverted_bbox_is_rejected(client, bbox):
+    r = client.get("/parcels/aggregate", params=bbox)
+    assert r.status_code == 400
+    assert r.json()["detail"].startswith("Empty bbox")
+
+
+def test_cell_must_be_positive(client):
+    assert client.get("/parcels/aggregate", params={**BBOX, "cell": 0}).status_code == 422
+
+
+def test_demo_aggregate_filters_by_bbox():
+    rows, cell = app._demo_aggregate(-95.358, 29.756, -95.357, 29.759, 2.0 ** -12)
+    assert cell == 2.0 ** -12
+    assert [r["parcels"] for r in rows] == [1]
@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import app
+
+LAYER = "https://gis.example.com/arcgis/rest/services/Parcels/MapServer/0"
+FIELDS = [
+    {"name": "OBJECTID", "type": "esriFieldTypeOID"},
+    {"name": "Shape", "type": "esriFieldTypeGeometry"},
+    {"name": "HCAD_NUM", "type": "esriFieldTypeString"},
+    {"name": "SITE_ADDR", "type": "esriFieldTypeString"},
+]
+PARCEL = {
+    "type": "Feature",
+    "properties": {"HCAD_NUM": "1144400040007", "SITE_ADDR": "123 Demo St", "owner_name": "Demo Owner"},
+    "geometry": {"type": "Point", "coordinates": [-95.36, 29.76]},
+}
+
+
+def _layer_meta(fields=FIELDS, **extra):
+    return {"fields": fields, "maxRecordCount": 2000, "supportedQueryFormats": "JSON, geoJSON",
+            "advancedQueryCapabilities": {"supportsPagination": True}, **extra}
+
+
+class FakeServer:
+    """httpx MockTransport handler: layer metadata at LAYER, queries answered by answer(where)."""
+
+    def __init__(self, meta, answer, delay=None):
+        self.meta, self.answer, self.delay = meta, answer, delay or (lambda where: 0)
+        self.metadata_requests = 0
+        self.wheres, self.finished = [], []
+
+    async def __call__(self, request):
+        if request.url.path.endswith("/query"):
+            where = request.url.params["where"]
+            self.wheres.append(where)
+            await asyncio.sleep(self.delay(where))
+            self.finished.append(where)
+            result = self.answer(where)
+            if isinstance(result, int):
+                return httpx.Response(result)
+            return httpx.Response(200, json={"type": "FeatureCollection", "features": result})
+        self.metadata_requests += 1
+        if isinstance(self.meta, int):
+            return httpx.Response(self.meta)
+        return httpx.Response(200, json=self.meta)
+
+
+@pytest.fixture(autouse=True)
+def fresh_layer_cache(monkeypatch):
+    monkeypatch.setattr(app, "_arcgis_layer_info", {})
+    monkeypatch.setattr(app, "_arcgis_layer_locks", {})
+
+
+def _run(server, coro_fn, monkeypatch):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(server)) as client:
+            monkeypatch.setattr(app, "_http_client", client)
+            return await coro_fn()
+    return asyncio.run(main())
+
+
+# --- schema discovery ---
+
+def test_parse_layer_info_finds_the_apn_field():
+    info = app._parse_arcgis_layer_info(_layer_meta())
+    assert info["apn_field"] == "HCAD_NUM"
+    assert info["apn_field_numeric"] is False
+    assert (info["max_record_count"], info["supports_geojson"], info["supports_pagination"]) == (2000, True, True)
+
+
+def test_parse_layer_info_override_types_and_missing_fields():
+    fields = [{"name": "acct", "type": "esriFieldTypeDouble"}, {"name": "pin", "type": "esriFieldTypeString"}]
+    assert app._parse_arcgis_layer_info({"fields": fields}, apn_field="ACCT")["apn_field"] == "acct"
+    assert app._parse_arcgis_layer_info({"fields": fields}, apn_field="ACCT")["apn_field_numeric"] is True
+    assert app._parse_arcgis_layer_info({"fields": fields})["apn_field"] == "pin"
+    # A geometry-typed field with a candidate name is not queryable as an APN
+    blob = app._parse_arcgis_layer_info({"fields": [{"name": "APN", "type": "esriFieldTypeBlob"}]})
+    assert blob["apn_field"] is None and blob["supports_geojson"] is False
+
+
+def test_layer_info_is_fetched_once(monkeypatch):
+    server = FakeServer(_layer_meta(), lambda where: [])
+
+    async def twice():
+        client = app._get_http_client()
+        return await asyncio.gather(*(app._get_arcgis_layer_info(client, LAYER) for _ in range(5)))
+
+    infos = _run(server, twice, monkeypatch)
+    assert server.metadata_requests == 1
+    assert {i["apn_field"] for i in infos} == {"HCAD_NUM"}
+
+
+def test_failed_layer_info_is_retried_after_the_delay(monkeypatch):
+    server = FakeServer(500, lambda where: [])
+
+    async def fetch():
+        return await app._get_arcgis_layer_info(app._get_http_client(), LAYER)
+
+    assert _run(server, fetch, monkeypatch) is None
+    assert _run(server, fetch, monkeypatch) is None
+    assert server.metadata_requests == 1  # cached failure
+    monkeypatch.setattr(app, "ARCGIS_LAYER_INFO_RETRY_SECONDS", 0)
+    server.meta = _layer_meta()
+    assert _run(server, fetch, monkeypatch)["apn_field"] == "HCAD_NUM"
+
+
+def test_known_field_sends_one_typed_query(monkeypatch):
+    server = FakeServer(_layer_meta(), lambda where: [PARCEL])
+    features = _run(server, lambda: app._query_arcgis_by_apn(LAYER, "11-444-000-40007"), monkeypatch)
+    assert server.wheres == ["HCAD_NUM IN ('11-444-000-40007', '1144400040007')"]
+    assert features[0]["properties"]["apn"] == "1144400040007"  # normalized from HCAD_NUM
+    assert features[0]["properties"]["owner"] == "Demo Owner"
+
+
+def test_numeric_field_skips_apns_that_cannot_match(monkeypatch):
+    server = FakeServer(_layer_meta([{"name": "PIN", "type": "esriFieldTypeDouble"}]), lambda where: [])
+    assert _run(server, lambda: app._query_arcgis_by_apn(LAYER, "ABC"), monkeypatch) == []
+    assert server.wheres == []
+    _run(server, lambda: app._query_arcgis_by_apn(LAYER, "12-34"), monkeypatch)
+    assert server.wheres == ["PIN = 1234"]
+
+
+# --- probing unknown fields: first match wins ---
+
+def test_first_match_wins_and_cancels_the_rest(monkeypatch):
+    monkeypatch.setattr(app, "ARCGIS_PROBE_CONCURRENCY", 100)  # every probe in flight at once
+    server = FakeServer(
+        {"fields": []},  # no metadata fields: probe every candidate
+        lambda where: [PARCEL] if where == "hcad_num = '1144400040007'" else [],
+        delay=lambda where: 0.01 if where == "hcad_num = '1144400040007'" else 5.0,
+    )
+    features = _run(server, lambda: app._query_arcgis_by_apn(LAYER, "1144400040007"), monkeypatch)
+    assert features[0]["properties"]["apn"] == "1144400040007"
+    assert server.finished == ["hcad_num = '1144400040007'"]  # every slower probe was cancelled
+    assert len(server.wheres) == 3 * len(app.ARCGIS_APN_FIELD_CANDIDATES)
+
+
+def test_slow_lookup_hits_the_deadline(monkeypatch):
+    monkeypatch.setattr(app, "ARCGIS_DEADLINE_SECONDS", 0.05)
+    server = FakeServer(_layer_meta(), lambda where: [PARCEL], delay=lambda where: 5.0)
+    assert _run(server, lambda: app._query_arcgis_by_apn(LAYER, "1144400040007"), monkeypatch) is None
+    assert server.finished == []
+
+
+def test_probes_are_bounded(monkeypatch):
+    monkeypatch.setattr(app, "ARCGIS_PROBE_CONCURRENCY", 3)
+    running, peak = [0], [0]
+    server = FakeServer({"fields": []}, lambda where: [], delay=lambda where: 0.005)
+    original = server.__call__
+
+    async def counting(request):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        try:
+            return await original(request)
+        finally:
+            running[0] -= 1
+
+    result = _run(counting, lambda: app._query_arcgis_by_apn(LAYER, "1144400040007"), monkeypatch)
+    assert result == []  # every probe answered without a match
+    assert peak[0] == 3
+
+
+def test_all_probes_failing_is_not_a_miss(monkeypatch):
+    server = FakeServer({"fields": []}, lambda where: 500)
+    assert _run(server, lambda: app._query_arcgis_by_apn(LAYER, "1144400040007"), monkeypatch) is None
+
+
+def test_server_error_payload_counts_as_failure(monkeypatch):
+    async def handler(request):
+        if request.url.path.endswith("/query"):
+            return httpx.Response(200, content=json.dumps({"error": {"code": 400}}).encode())
+        return httpx.Response(200, json=_layer_meta())
+
+    assert _run(handler, lambda: app._query_arcgis_by_apn(LAYER, "1144400040007"), monkeypatch) is None
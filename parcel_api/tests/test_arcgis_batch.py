@@ -0,0 +1,54 @@
+import asyncio
+
+import app
+
+KNOWN_FIELD = {
+    "apn_field": "APN", "apn_field_numeric": True, "max_record_count": 1000,
+    "supports_geojson": True, "supports_pagination": True,
+}
+
+
+class FakeArcGIS:
+    """Stands in for _arcgis_query; records how many requests run at once."""
+
+    def __init__(self, features):
+        self.features = features
+        self.running = self.peak = 0
+
+    async def __call__(self, client, url, where, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return self.features if " IN (" in where else []
+
+
+def _layer_info(info):
+    async def get(client, base, apn_field):
+        return info
+    return get
+
+
+def test_numeric_apn_fields_match_requested_apns(monkeypatch):
+    fake = FakeArcGIS([{"properties": {"APN": 123.0}}, {"properties": {"APN": "45-6"}}])
+    monkeypatch.setattr(app, "_arcgis_query", fake)
+    monkeypatch.setattr(app, "_get_arcgis_layer_info", _layer_info(KNOWN_FIELD))
+    out = asyncio.run(app._query_arcgis_by_apns("https://example.com/arcgis/0", ["123", "456", "789"]))
+    assert out == {"123": [fake.features[0]], "456": [fake.features[1]], "789": []}
+
+
+def test_probes_share_one_concurrency_limit(monkeypatch):
+    fake = FakeArcGIS([])
+    monkeypatch.setattr(app, "ARCGIS_PROBE_CONCURRENCY", 2)
+    monkeypatch.setattr(app, "_arcgis_query", fake)
+    monkeypatch.setattr(app, "_get_arcgis_layer_info", _layer_info({"apn_field": None}))
+    out = asyncio.run(app._query_arcgis_by_apns("https://example.com/arcgis/0", [str(i) for i in range(10)], "APN"))
+    assert out == {str(i): [] for i in range(10)}  # answered without a match
+    assert fake.peak == 2
+
+
+def test_arcgis_apn_value():
+    assert app._arcgis_apn_value(123.0) == "123"
+    assert app._arcgis_apn_value(12.5) == "12.5"
+    assert app._arcgis_apn_value(" 11-444 ") == "11-444"
+    assert app._arcgis_apn_value(None) == ""
@@ -0,0 +1,88 @@
+import asyncio
+
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class Probe:
+    """Async probe that fails with the queued errors, then succeeds."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+async def _wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.001)
+
+
+def test_opens_after_consecutive_failures_only():
+    async def run():
+        breaker = CircuitBreaker(Probe(), failure_threshold=3, backoff=10.0)
+        breaker.record_failure(OSError("refused"))
+        breaker.record_failure(OSError("refused"))
+        breaker.record_success()
+        breaker.record_failure(OSError("refused"))
+        breaker.record_failure(OSError("refused"))
+        assert breaker.state == CLOSED and breaker.allow()
+        breaker.record_failure(OSError("refused"))
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        snapshot = breaker.snapshot()
+        await breaker.close()
+        return snapshot
+
+    snapshot = asyncio.run(run())
+    assert (snapshot["trips"], snapshot["rejected"]) == (1, 1)
+    assert snapshot["last_error"] == "OSError('refused')"
+
+
+def test_probe_closes_the_breaker_after_backoff():
+    async def run():
+        probe = Probe(OSError("refused"), OSError("refused"))
+        breaker = CircuitBreaker(probe, backoff=0.01, backoff_max=0.02, errors=(OSError,))
+        breaker.trip(OSError("down"))
+        await _wait_for(lambda: breaker.state == CLOSED)
+        return probe, breaker.snapshot()
+
+    probe, snapshot = asyncio.run(run())
+    assert probe.calls == 3
+    assert (snapshot["probes"], snapshot["probe_failures"], snapshot["probe_errors"]) == (3, 2, 0)
+    assert snapshot["consecutive_failures"] == 0 and snapshot["opened_at"] is None
+
+
+def test_unexpected_probe_error_does_not_stick_in_half_open():
+    async def run():
+        breaker = CircuitBreaker(Probe(RuntimeError("driver bug")), backoff=0.01, errors=(OSError,))
+        breaker.trip()
+        await _wait_for(lambda: breaker.state == CLOSED)
+        return breaker.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert (snapshot["probe_failures"], snapshot["probe_errors"]) == (1, 1)
+
+
+def test_half_open_while_probing_and_close_cancels():
+    async def run():
+        started = asyncio.Event()
+
+        async def hanging_probe():
+            started.set()
+            await asyncio.sleep(60)
+
+        breaker = CircuitBreaker(hanging_probe, backoff=0.01)
+        breaker.trip()
+        await asyncio.wait_for(started.wait(), 2.0)
+        assert breaker.state == HALF_OPEN and not breaker.allow()
+        await breaker.close()
+        return breaker.state
+
+    assert asyncio.run(run()) == OPEN
+
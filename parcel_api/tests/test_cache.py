@@ -0,0 +1,65 @@
+import asyncio
+from decimal import Decimal
+
+from cache import TTLCache
+
+
+def test_lru_eviction_and_negative_hits():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", [1])
+    cache.set("b", [])
+    assert cache.get("a") == (True, [1])  # a is now most recently used
+    cache.set("c", [3])
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, [3])
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["size"] == 2
+
+
+def test_negative_results_use_their_own_ttl():
+    cache = TTLCache(ttl=60.0, negative_ttl=-1.0)
+    cache.set("missing", [])
+    cache.set("found", [{"apn": "1"}])
+    assert cache.get("missing") == (False, None)
+    assert cache.get("found") == (True, [{"apn": "1"}])
+    assert cache.stats()["expirations"] == 1
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = TTLCache(sqlite_path=path)
+    cache.set("a", [{"acres": Decimal("1.5")}])
+    cache.close()
+    cache = TTLCache(sqlite_path=path)
+    assert cache.get("a") == (True, [{"acres": 1.5}])
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+
+def test_async_batch_reads_memory_and_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+
+    async def run():
+        first = TTLCache(sqlite_path=path)
+        await first.aset_many([("a", [1]), ("b", [])])
+        first.close()
+        cache = TTLCache(sqlite_path=path)
+        await cache.aset("c", [3])
+        results = await cache.aget_many(["a", "b", "c", "d"])
+        single = await cache.aget("a")  # promoted to memory by the batch read
+        cache.close()
+        return results, single, cache.stats()
+
+    results, single, stats = asyncio.run(run())
+    assert results == {"a": (True, [1]), "b": (True, []), "c": (True, [3]), "d": (False, None)}
+    assert single == (True, [1])
+    assert (stats["disk_hits"], stats["misses"]) == (2, 1)
+
+
+def test_apn_cache_key_normalizes_and_carries_the_data_version():
+    import app
+
+    key = app._apn_cache_key("11-444-000-40007", " az ", "Maricopa ", "v1")
+    assert key == app._apn_cache_key("1144400040007", "AZ", "maricopa", "v1")
+    assert key != app._apn_cache_key("1144400040007", "AZ", "maricopa", "v2")
@@ -0,0 +1,48 @@
+import pytest
+from fastapi import HTTPException
+
+import app
+
+BBOX = "min_lon=-95.37&min_lat=29.75&max_lon=-95.35&max_lat=29.77"
+FINGERPRINT = app._query_fingerprint(-95.37, 29.75, -95.35, 29.77)
+
+
+def test_cursor_round_trip():
+    token = app._encode_cursor(41, "db", FINGERPRINT)
+    assert "=" not in token
+    assert app._decode_cursor(token, FINGERPRINT) == (41, "db")
+
+
+@pytest.mark.parametrize("token", ["abc", app._encode_cursor(1, "arcgis", FINGERPRINT), "eyJrIjoieCJ9"])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(HTTPException) as exc:
+        app._decode_cursor(token, FINGERPRINT)
+    assert exc.value.status_code == 400
+
+
+def test_cursor_is_bound_to_its_query():
+    token = app._encode_cursor(1, "demo", app._query_fingerprint(0.0, 0.0, 1.0, 1.0))
+    with pytest.raises(HTTPException) as exc:
+        app._decode_cursor(token, FINGERPRINT)
+    assert exc.value.detail == "Cursor does not match this query"
+
+
+def test_demo_pages_follow_the_cursor(client):
+    first = client.get(f"/parcels?{BBOX}&limit=1").json()
+    assert len(first["features"]) == 1
+    assert app._decode_cursor(first["next"], FINGERPRINT)[1] == "demo"
+    second = client.get(f"/parcels?{BBOX}&limit=1&cursor={first['next']}").json()
+    assert len(second["features"]) == 1
+    assert second["features"][0]["properties"]["apn"] != first["features"][0]["properties"]["apn"]
+    assert not second.get("next")
+
+
+def test_postgis_cursor_is_not_restarted_on_demo_data(client):
+    r = client.get(f"/parcels?{BBOX}&limit=1&cursor={app._encode_cursor(5, 'db', FINGERPRINT)}")
+    assert r.status_code == 409
+
+
+@pytest.mark.parametrize("url", [f"/parcels?{BBOX}", "/parcels/point?lat=29.7575&lon=-95.3575"])
+@pytest.mark.parametrize("limit", [0, -1])
+def test_non_positive_limit_is_rejected(client, url, limit):
+    assert client.get(f"{url}&limit={limit}").status_code == 422
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import db_pool
+
+
+def test_pool_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "postgresql://u:p@db.example:5432/parcels")
+    monkeypatch.setenv("PARCEL_DB_POOL_MIN", "2")
+    monkeypatch.setenv("PARCEL_DB_POOL_MAX", "4")
+    monkeypatch.setenv("PARCEL_DB_POOL_OVERFLOW", "3")
+    monkeypatch.setenv("PARCEL_DB_POOL_TIMEOUT", "2.5")
+    monkeypatch.setenv("PARCEL_DB_POOL_CHECK", "0")
+    settings = db_pool.pool_settings_from_env()
+    assert settings["conninfo"] == "postgresql://u:p@db.example:5432/parcels"
+    assert settings["kwargs"] == {"connect_timeout": 1}
+    assert (settings["min_size"], settings["max_size"], settings["timeout"]) == (2, 7, 2.5)
+    assert settings["check"] is None
+    assert settings["open"] is False
+
+
+def test_pool_settings_bad_values_fall_back(monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setenv("PARCEL_DB_HOST", "pg")
+    monkeypatch.setenv("PARCEL_DB_POOL_MAX", "lots")
+    monkeypatch.setenv("PARCEL_DB_POOL_MIN", "50")
+    settings = db_pool.pool_settings_from_env(asynchronous=False)
+    assert settings["conninfo"] == ""
+    assert settings["kwargs"]["host"] == "pg"
+    assert settings["max_size"] == 20  # default MAX 10 + OVERFLOW 10
+    assert settings["min_size"] == 20  # never above max_size
+    assert settings["check"] is db_pool.ConnectionPool.check_connection
+
+
+def test_checkout_times_out_when_database_is_down(monkeypatch):
+    monkeypatch.setenv("PARCEL_DB_POOL_MIN", "0")
+    monkeypatch.setenv("PARCEL_DB_POOL_TIMEOUT", "0.5")
+
+    async def checkout():
+        pool = db_pool.AsyncConnectionPool(**db_pool.pool_settings_from_env())
+        await pool.open()
+        try:
+            with pytest.raises(db_pool.PoolTimeout):
+                await pool.getconn()
+            return pool.get_stats()
+        finally:
+            await pool.close()
+
+    stats = asyncio.run(checkout())
+    assert stats.get("pool_available", 0) == 0
+    assert stats.get("connections_errors", 0) >= 1  # what app._getconn reports to the breaker
+
+
+def test_circuit_open_is_an_operational_error():
+    assert issubclass(db_pool.CircuitOpen, db_pool.psycopg.OperationalError)
+    assert issubclass(db_pool.PoolTimeout, db_pool.psycopg.OperationalError)
+
+
+def test_pool_timeout_during_an_outage_trips_the_breaker(monkeypatch):
+    import app
+    from breaker import OPEN, CircuitBreaker
+
+    monkeypatch.setenv("PARCEL_DB_POOL_MIN", "1")
+    monkeypatch.setenv("PARCEL_DB_POOL_TIMEOUT", "0.5")
+
+    async def checkout():
+        pool = db_pool.AsyncConnectionPool(**db_pool.pool_settings_from_env())
+        breaker = CircuitBreaker(app._probe_db, failure_threshold=1, backoff=60.0)
+        monkeypatch.setattr(app, "_db_pool", pool)
+        monkeypatch.setattr(app, "_db_breaker", breaker)
+        await pool.open()
+        try:
+            with pytest.raises(db_pool.PoolTimeout):
+                await app._getconn()
+            with pytest.raises(db_pool.CircuitOpen):
+                await app._getconn()
+            return breaker.state
+        finally:
+            await breaker.close()
+            await pool.close()
+
+    assert asyncio.run(checkout()) == OPEN
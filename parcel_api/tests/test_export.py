@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+
+import pytest
+
+from geometry import geojson_to_wkt
+from projection import PARCEL_FIELDS
+
+
+def _export(client, **params):
+    return client.get("/parcels/export", params={"state": "TX", "county": "Harris", **params})
+
+
+def test_csv_export(client):
+    r = _export(client)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "text/csv; charset=utf-8"
+    assert r.headers["content-disposition"] == 'attachment; filename="TX_Harris.csv"'
+    rows = list(csv.reader(io.StringIO(r.text)))
+    assert rows[0] == list(PARCEL_FIELDS) + ["wkt"]
+    assert len(rows) == 3
+    first = dict(zip(rows[0], rows[1]))
+    assert first["apn"] == "1144400040007"
+    assert first["market_value"] == "85000"
+    assert first["wkt"] == geojson_to_wkt({"type": "Polygon", "coordinates": [
+        [[-95.36, 29.76], [-95.355, 29.76], [-95.355, 29.755], [-95.36, 29.755], [-95.36, 29.76]],
+    ]})
+    # Missing properties are empty cells, as COPY writes NULL
+    assert dict(zip(rows[0], rows[2]))["legal_desc"] == ""
+
+
+def test_csv_export_projection_and_case_insensitive_county(client):
+    r = _export(client, state="tx", county="harris", fields="apn,owner", geometry="none")
+    rows = list(csv.reader(io.StringIO(r.text)))
+    assert rows == [["apn", "owner"], ["1144400040007", "Demo Parcel Owner"], ["0280490000034", "Sample Owner"]]
+    assert r.headers["content-disposition"] == 'attachment; filename="tx_harris.csv"'
+
+
+def test_geojsonseq_export(client):
+    r = _export(client, format="geojsonseq", fields="apn", geometry="centroid", county="Harris County")
+    assert r.headers["content-type"] == "application/geo+json-seq"
+    assert r.headers["content-disposition"] == 'attachment; filename="TX_Harris_County.geojsons"'
+    assert r.content == b""  # no such county
+    r = _export(client, format="geojsonseq", fields="apn", geometry="centroid")
+    records = [json.loads(rec) for rec in r.content.split(b"\x1e")[1:]]
+    assert [rec["properties"] for rec in records] == [{"apn": "1144400040007"}, {"apn": "0280490000034"}]
+    assert records[0]["geometry"]["coordinates"] == pytest.approx([-95.3575, 29.7575])
+
+
+def test_flatgeobuf_export(client, tmp_path):
+    r = _export(client, format="flatgeobuf")
+    assert r.headers["content-disposition"] == 'attachment; filename="TX_Harris.fgb"'
+    pyogrio = pytest.importorskip("pyogrio")
+    path = tmp_path / "harris.fgb"
+    path.write_bytes(r.content)
+    meta, _, geometry, fields = pyogrio.raw.read(str(path))
+    assert list(fields[list(meta["fields"]).index("apn")]) == ["1144400040007", "0280490000034"]
+    assert len(geometry) == 2
+
+
+def test_export_rejects_bad_requests(client):
+    assert _export(client, format="xlsx").status_code == 400
+    assert client.get("/parcels/export", params={"state": "TX"}).status_code == 422
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+import formats
+
+SQUARE = [[-95.36, 29.76], [-95.355, 29.76], [-95.355, 29.755], [-95.36, 29.755], [-95.36, 29.76]]
+HOLE = [[-95.358, 29.758], [-95.357, 29.758], [-95.357, 29.757], [-95.358, 29.758]]
+PAIRS = [
+    ({"apn": "001", "owner": "Demo Owner", "acres": 0.25, "market_value": 85000, "distance_m": 12.5},
+     {"type": "Polygon", "coordinates": [SQUARE, HOLE]}),
+    ({"apn": "002", "acres": None},
+     '{"type":"MultiPolygon","coordinates":[[[[0,0],[1,0],[1,1],[0,0]]],[[[2,2],[3,2],[3,3],[2,2]]]]}'),
+    ({"apn": "003"}, None),
+]
+
+
+@pytest.mark.parametrize("accept, fmt", [
+    ("", formats.GEOJSON),
+    ("application/json", formats.GEOJSON),
+    ("application/flatgeobuf", formats.FLATGEOBUF),
+    ("application/geo+json;q=0.5, application/geo+json-seq", formats.GEOJSONSEQ),
+    ("application/x-ndjson;q=0.2, application/json;q=0.9", formats.GEOJSON),
+    ("application/flatgeobuf;q=0, text/html", formats.GEOJSON),
+])
+def test_negotiate(accept, fmt):
+    assert formats.negotiate(accept) == fmt
+
+
+def test_columns_include_computed_properties():
+    columns = formats.columns_for(PAIRS, fields=("apn", "acres"))
+    assert columns == (("apn", str), ("acres", float), ("distance_m", float))
+
+
+def test_geojson_seq_and_ndjson():
+    seq = formats.encode(formats.GEOJSONSEQ, PAIRS)
+    records = seq.split(b"\x1e")[1:]
+    assert len(records) == 3
+    assert json.loads(records[0])["properties"]["apn"] == "001"
+    assert json.loads(records[1])["geometry"]["type"] == "MultiPolygon"
+    lines = formats.encode(formats.NDJSON, PAIRS).splitlines()
+    assert [json.loads(line)["properties"]["apn"] for line in lines] == ["001", "002", "003"]
+
+
+def test_flatgeobuf_reads_back_with_gdal(tmp_path):
+    pyogrio = pytest.importorskip("pyogrio")
+    path = tmp_path / "parcels.fgb"
+    path.write_bytes(formats.encode(formats.FLATGEOBUF, PAIRS))
+    meta, _, geometry, fields = pyogrio.raw.read(str(path))
+    names = list(meta["fields"])
+    assert names[:8] == [name for name, _ in formats.PARCEL_COLUMNS]
+    assert names[8] == "distance_m"
+    assert list(fields[names.index("apn")]) == ["001", "002", "003"]
+    assert fields[names.index("market_value")][0] == 85000.0
+    shapely = pytest.importorskip("shapely")
+    shapes = [shapely.from_wkb(g) if g is not None else None for g in geometry]
+    assert shapes[0].geom_type == "Polygon" and len(shapes[0].interiors) == 1
+    assert shapes[1].geom_type == "MultiPolygon" and len(shapes[1].geoms) == 2
+    assert shapes[2] is None
+
+
+def test_arrow_stream_has_geoarrow_wkb_column():
+    pa = pytest.importorskip("pyarrow")
+    if formats.pa is None:
+        pytest.skip("pyarrow not importable by formats")
+    table = pa.ipc.open_stream(formats.encode(formats.ARROW, PAIRS, fields=("apn", "acres"))).read_all()
+    assert table.column_names == ["apn", "acres", "distance_m", "geometry"]
+    assert table.column("apn").to_pylist() == ["001", "002", "003"]
+    assert table.column("acres").to_pylist() == [0.25, None, None]
+    assert table.schema.field("geometry").metadata[b"ARROW:extension:name"] == b"geoarrow.wkb"
+    assert table.column("geometry").to_pylist()[2] is None
+
+
+def test_empty_responses_are_still_valid():
+    assert formats.encode(formats.GEOJSONSEQ, []) == b""
+    assert formats.encode(formats.FLATGEOBUF, []).startswith(formats.FGB_MAGIC)
+    if formats.pa is not None:
+        table = formats.pa.ipc.open_stream(formats.encode(formats.ARROW, [])).read_all()
+        assert table.num_rows == 0
+
+
+def test_stream_chunks_match_a_single_encode():
+    async def batches():
+        yield PAIRS[:1]
+        yield PAIRS[1:]
+
+    async def collect():
+        done = []
+        chunks = [c async for c in formats.stream(
+            formats.FLATGEOBUF, batches(), chunk_bytes=64, on_complete=lambda *a: done.append(a),
+        )]
+        return chunks, done
+
+    chunks, done = asyncio.run(collect())
+    body = b"".join(chunks)
+    assert len(chunks) > 1
+    assert body == formats.encode(formats.FLATGEOBUF, PAIRS)
+    assert done[0][0] == len(body) and done[0][2] == 3
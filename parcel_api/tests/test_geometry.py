@@ -0,0 +1,72 @@
+import math
+import random
+
+import pytest
+
+from geometry import (
+    _polygon_is_valid, centroid, envelope, geojson_to_wkb, geojson_to_wkt, simplify_geometry,
+)
+
+SQUARE = [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]]
+# A spike on the north edge with a hole inside it: dropping the spike would leave the hole outside
+SPIKED = [[0, 0], [10, 0], [10, 10], [6, 10], [5, 10.5], [4, 10], [0, 10], [0, 0]]
+SPIKE_HOLE = [[4.9, 10.1], [4.9, 10.25], [5.1, 10.25], [5.1, 10.1], [4.9, 10.1]]
+
+
+def test_simplify_drops_small_detail():
+    out = simplify_geometry({"type": "Polygon", "coordinates": [SPIKED]}, 1.0)
+    assert out["coordinates"] == [SQUARE]
+
+
+def test_simplify_keeps_detail_that_holds_a_hole():
+    geom = {"type": "Polygon", "coordinates": [SPIKED, SPIKE_HOLE]}
+    out = simplify_geometry(geom, 1.0)
+    assert [5, 10.5] in out["coordinates"][0]
+    assert _polygon_is_valid(out["coordinates"])
+
+
+def test_simplify_rounds_and_passes_other_types_through():
+    geom = {"type": "Polygon", "coordinates": [[[0.1234567, 0.1234567], [1.1234567, 0.1234567],
+                                                [1.1234567, 1.1234567], [0.1234567, 0.1234567]]]}
+    out = simplify_geometry(geom, None, 3)
+    assert out["coordinates"][0][0] == [0.123, 0.123]
+    point = {"type": "Point", "coordinates": [1.0, 2.0]}
+    assert simplify_geometry(point, 1.0) is point
+
+
+def test_simplify_output_is_valid_for_random_polygons():
+    shapely_geometry = pytest.importorskip("shapely.geometry")
+    rng = random.Random(1)
+    checked = 0
+    for _ in range(200):
+        cx, cy, k = rng.random(), rng.random(), rng.randint(8, 60)
+        shell = [[cx + 0.01 * (1 + 0.5 * rng.random()) * math.cos(2 * math.pi * i / k),
+                  cy + 0.01 * (1 + 0.5 * rng.random()) * math.sin(2 * math.pi * i / k)] for i in range(k)]
+        shell.append(shell[0])
+        hr = 0.004 * rng.random() + 0.001
+        hx, hy = cx + rng.uniform(-0.004, 0.004), cy + rng.uniform(-0.004, 0.004)
+        hole = [[hx + hr * math.cos(2 * math.pi * i / 7), hy + hr * math.sin(2 * math.pi * i / 7)] for i in range(7)]
+        hole = hole[::-1] + [hole[-1]]
+        geom = {"type": "Polygon", "coordinates": [shell, hole]}
+        if not shapely_geometry.shape(geom).is_valid:
+            continue
+        checked += 1
+        for tolerance in (0.0005, 0.002, 0.006, 0.02):
+            assert shapely_geometry.shape(simplify_geometry(geom, tolerance, 6)).is_valid
+    assert checked > 50
+
+
+def test_centroid_and_envelope():
+    geom = {"type": "Polygon", "coordinates": [SQUARE, [[4, 4], [4, 6], [6, 6], [6, 4], [4, 4]]]}
+    assert centroid(geom)["coordinates"] == pytest.approx([5.0, 5.0])
+    assert envelope(geom)["coordinates"] == [SQUARE]
+    assert envelope({"type": "Point", "coordinates": [1, 2]}) == {"type": "Point", "coordinates": [1, 2]}
+
+
+def test_wkt_and_wkb_match_shapely():
+    wkb = pytest.importorskip("shapely.wkb")
+    wkt = pytest.importorskip("shapely.wkt")
+    geom = {"type": "MultiPolygon", "coordinates": [[SQUARE], [[[20, 20], [21.5, 20], [21.5, 21], [20, 20]]]]}
+    assert wkb.loads(geojson_to_wkb(geom)).equals(wkt.loads(geojson_to_wkt(geom)))
+    assert geojson_to_wkt({"type": "Point", "coordinates": [-100.123456789012, 29.5]}) == "POINT(-100.123456789012 29.5)"
+    assert geojson_to_wkt({"type": "Polygon", "coordinates": []}) == "POLYGON EMPTY"
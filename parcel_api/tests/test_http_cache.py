@@ -0,0 +1,29 @@
+import app
+
+URL = "/parcels?min_lon=-95.37&min_lat=29.75&max_lon=-95.35&max_lat=29.77"
+
+
+def test_etag_match_keeps_the_clients_tag():
+    etag = '"abc"'
+    assert app._etag_match('"abc"', etag) == '"abc"'
+    assert app._etag_match('W/"abc-gzip"', etag) == '"abc-gzip"'
+    assert app._etag_match('"zzz", "abc-br"', etag) == '"abc-br"'
+    assert app._etag_match("*", etag) == etag
+    assert app._etag_match('"abc-deflate", "abd"', etag) is None
+
+
+def test_304_repeats_the_suffixed_etag(client):
+    r = client.get(URL, headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert client.get(URL, headers={"If-None-Match": etag}).headers["etag"] == etag
+    suffixed = etag[:-1] + '-gzip"'
+    r = client.get(URL, headers={"Accept-Encoding": "gzip", "If-None-Match": suffixed})
+    assert r.status_code == 304
+    assert r.headers["etag"] == suffixed
+
+
+def test_other_query_gets_another_etag(client):
+    a = client.get(URL).headers["etag"]
+    b = client.get(URL + "&limit=1").headers["etag"]
+    assert a != b
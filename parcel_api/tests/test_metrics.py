@@ -0,0 +1,44 @@
+import re
+
+
+def _scrape(client):
+    """{(metric name, labels): value} from /metrics."""
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    samples = {}
+    for line in r.text.splitlines():
+        if line and not line.startswith("#"):
+            m = re.fullmatch(r"(\w+)(\{.*\})? (\S+)", line)
+            assert m, line
+            samples[(m.group(1), m.group(2) or "")] = float(m.group(3))
+    return samples
+
+
+def _delta(before, after, name, labels):
+    return after.get((name, labels), 0) - before.get((name, labels), 0)
+
+
+def test_one_request_is_counted_by_route(client):
+    before = _scrape(client)
+    r = client.get("/parcels/point", params={"lon": -95.357, "lat": 29.757})
+    assert r.status_code == 200
+    assert "total;dur=" in r.headers["Server-Timing"]
+    after = _scrape(client)
+
+    route = 'method="GET",route="/parcels/point",status="200"'
+    latency = "parcel_api_request_duration_seconds"
+    assert _delta(before, after, latency + "_count", "{" + route + "}") == 1
+    assert _delta(before, after, latency + "_bucket", "{" + route + ',le="+Inf"}') == 1
+    assert _delta(before, after, latency + "_sum", "{" + route + "}") > 0
+    buckets = [v for (name, labels), v in after.items() if name == latency + "_bucket" and route in labels]
+    assert buckets == sorted(buckets)  # cumulative
+    assert _delta(before, after, "parcel_api_source_total", '{route="/parcels/point",source="demo"}') == 1
+    assert _delta(before, after, "parcel_api_response_bytes_count", '{route="/parcels/point"}') == 1
+
+
+def test_scrapes_are_not_counted(client):
+    before = _scrape(client)
+    after = _scrape(client)
+    assert not [k for k in after if 'route="/metrics"' in k[1]]
+    assert all(_delta(before, after, *k) == 0 for k in after if k[0].startswith("parcel_api_request"))
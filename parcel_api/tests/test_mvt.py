@@ -0,0 +1,57 @@
+import pytest
+
+import mvt
+
+
+def _square(min_lon, min_lat, max_lon, max_lat, **properties):
+    ring = [[min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat], [min_lon, max_lat], [min_lon, min_lat]]
+    return {"type": "Feature", "properties": properties, "geometry": {"type": "Polygon", "coordinates": [ring]}}
+
+
+def _inset(bounds, frac):
+    min_lon, min_lat, max_lon, max_lat = bounds
+    dx, dy = (max_lon - min_lon) * frac, (max_lat - min_lat) * frac
+    return min_lon + dx, min_lat + dy, max_lon - dx, max_lat - dy
+
+
+TILE = (14, 3370, 6944)
+
+
+def test_tile_bounds_cover_the_world_at_zoom_0():
+    min_lon, min_lat, max_lon, max_lat = mvt.tile_bounds(0, 0, 0)
+    assert (min_lon, max_lon) == (-180.0, 180.0)
+    assert min_lat == pytest.approx(-85.0511287798)
+    assert max_lat == pytest.approx(85.0511287798)
+
+
+def test_varint_and_zigzag():
+    assert mvt._varint(1) == b"\x01"
+    assert mvt._varint(300) == b"\xac\x02"
+    assert [mvt._zigzag(n) for n in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+
+
+def test_empty_tile_is_empty_bytes():
+    assert mvt.encode_tile([], *TILE) == b""
+    far_away = _square(10.0, 10.0, 10.001, 10.001, apn="1")
+    assert mvt.encode_tile([far_away], *TILE) == b""
+
+
+def test_tile_decodes_with_reference_decoder():
+    decoder = pytest.importorskip("mapbox_vector_tile")
+    bounds = mvt.tile_bounds(*TILE)
+    features = [
+        _square(*_inset(bounds, 0.25), apn="001", acres=2.5, owner=None),
+        # Crosses the east edge: clipped to the buffer, not dropped
+        _square(bounds[2] - 0.001, bounds[1] + 0.001, bounds[2] + 0.01, bounds[3] - 0.001, apn="002"),
+    ]
+    tile = decoder.decode(mvt.encode_tile(features, *TILE, attributes={"apn", "acres"}))
+    layer = tile["parcels"]
+    assert layer["extent"] == mvt.EXTENT
+    assert [f["properties"] for f in layer["features"]] == [{"apn": "001", "acres": 2.5}, {"apn": "002"}]
+    inner = layer["features"][0]["geometry"]
+    assert inner["type"] == "Polygon"
+    xs = [x for x, _ in inner["coordinates"][0]]
+    assert min(xs) == pytest.approx(mvt.EXTENT * 0.25, abs=2)
+    assert max(xs) == pytest.approx(mvt.EXTENT * 0.75, abs=2)
+    clipped = [x for x, _ in layer["features"][1]["geometry"]["coordinates"][0]]
+    assert max(clipped) <= mvt.EXTENT + mvt.BUFFER
@@ -0,0 +1,72 @@
+import math
+import random
+
+import pytest
+
+import app
+from geometry import PackedPolygons
+from spatial_index import STRTree
+
+INSIDE_001 = {"lat": 29.7575, "lon": -95.3575}
+
+
+def _expected_distance(lon, lat, corner_lon, corner_lat):
+    x = (corner_lon - lon) * math.cos(math.radians(lat))
+    return math.hypot(x, corner_lat - lat) * app._METERS_PER_DEGREE
+
+
+def test_nearest_orders_by_distance(client):
+    body = client.get("/parcels/nearest", params={**INSIDE_001, "k": 5}).json()
+    assert [f["properties"]["apn"] for f in body["features"]] == ["1144400040007", "0280490000034"]
+    first, second = (f["properties"]["distance_m"] for f in body["features"])
+    assert first == 0.0  # the parcel containing the point
+    # 002's nearest point is its corner at (-95.36, 29.76)
+    assert second == pytest.approx(_expected_distance(-95.3575, 29.7575, -95.36, 29.76), abs=0.5)
+
+
+def test_nearest_from_outside_and_k(client):
+    body = client.get("/parcels/nearest", params={"lat": 29.7625, "lon": -95.3700, "k": 1}).json()
+    [feature] = body["features"]
+    assert feature["properties"]["apn"] == "0280490000034"
+    assert feature["properties"]["distance_m"] == pytest.approx(
+        _expected_distance(-95.37, 29.7625, -95.365, 29.7625), abs=0.5,
+    )
+
+
+def test_max_distance_cuts_off(client):
+    body = client.get("/parcels/nearest", params={**INSIDE_001, "max_distance": 100}).json()
+    assert [f["properties"]["apn"] for f in body["features"]] == ["1144400040007"]
+    body = client.get("/parcels/nearest", params={"lat": 29.0, "lon": -95.0, "max_distance": 1000}).json()
+    assert body["features"] == []
+
+
+def test_projection_keeps_distance(client):
+    body = client.get("/parcels/nearest", params={**INSIDE_001, "fields": "apn", "geometry": "none"}).json()
+    assert body["features"][1]["properties"].keys() == {"apn", "distance_m"}
+    assert body["features"][1]["geometry"] is None
+
+
+@pytest.mark.parametrize("params", [{"k": 0}, {"k": 51}, {"max_distance": 0}, {"lat": 91}])
+def test_bad_parameters(client, params):
+    assert client.get("/parcels/nearest", params={**INSIDE_001, **params}).status_code == 422
+
+
+def test_rtree_knn_matches_brute_force():
+    rng = random.Random(7)
+    squares = []
+    for _ in range(500):
+        x, y, size = rng.uniform(0, 10), rng.uniform(0, 10), rng.uniform(0.01, 0.2)
+        squares.append({"type": "Polygon", "coordinates": [
+            [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]],
+        ]})
+    polygons = PackedPolygons(squares)
+    tree = STRTree([(s["coordinates"][0][0][0], s["coordinates"][0][0][1],
+                     s["coordinates"][0][2][0], s["coordinates"][0][2][1]) for s in squares])
+    for _ in range(20):
+        x, y, scale = rng.uniform(-1, 11), rng.uniform(-1, 11), rng.uniform(0.5, 1.0)
+        exact = sorted(zip(polygons.distances(x, y, range(500), scale), range(500)))
+        hits = tree.nearest(x, y, 10, lambda pos: polygons.distances(x, y, pos, scale), x_scale=scale)
+        assert [d for d, _ in hits] == pytest.approx([d for d, _ in exact[:10]])
+        radius = exact[3][0]
+        within = tree.nearest(x, y, 10, lambda pos: polygons.distances(x, y, pos, scale), radius, scale)
+        assert [d for d, _ in within] == pytest.approx([d for d, _ in exact if d <= radius])
@@ -0,0 +1,25 @@
+import pytest
+
+from owners import owner_key
+
+
+@pytest.mark.parametrize("name, key", [
+    ("Smith, John A. Trust", "A JOHN SMITH"),
+    ("JOHN A SMITH", "A JOHN SMITH"),
+    ("Acme Holdings, L.L.C.", "ACME HOLDINGS"),
+    ("ACME HOLDINGS L L C", "ACME HOLDINGS"),
+    ("The Jones Family Trust Et Al", "FAMILY JONES"),
+    ("JONES FAMILY ETAL", "FAMILY JONES"),
+    ("Garcia Maria & Luis Etux", "GARCIA LUIS MARIA"),
+])
+def test_owner_key_normalizes_names(name, key):
+    assert owner_key(name) == key
+
+
+@pytest.mark.parametrize("name", [None, "", "   ", "LLC", "The Trust, Inc."])
+def test_owner_key_is_empty_when_nothing_identifies_the_owner(name):
+    assert owner_key(name) == ""
+
+
+def test_owner_key_keeps_numbers_and_dedupes_words():
+    assert owner_key("2020 Main St Partners 2020") == "2020 MAIN PARTNERS ST"
@@ -0,0 +1,84 @@
+import pytest
+
+import geometry
+from geometry import PackedPolygons
+
+
+def _square(x, y, size=1.0):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+DONUT = {"type": "Polygon", "coordinates": [_square(0, 0, 4), _square(1, 1, 2)[::-1]]}
+TWO_PARTS = {"type": "MultiPolygon", "coordinates": [[_square(10, 0)], [_square(12, 0)]]}
+# Concave U: its bbox covers the notch between the arms
+U_SHAPE = {"type": "Polygon", "coordinates": [[[20, 0], [23, 0], [23, 3], [22, 3], [22, 1], [21, 1], [21, 3],
+                                                [20, 3], [20, 0]]]}
+SHAPES = [DONUT, TWO_PARTS, U_SHAPE, {"type": "Polygon", "coordinates": []}]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def packed(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(geometry, "np", None)
+    elif geometry.np is None:
+        pytest.skip("numpy not installed")
+    return lambda geometries: PackedPolygons(geometries)
+
+
+@pytest.mark.parametrize("x, y, expected", [
+    (0.5, 0.5, [0]),    # in the donut's ring
+    (2.0, 2.0, []),     # in its hole
+    (10.5, 0.5, [1]),   # first MultiPolygon part
+    (12.5, 0.5, [1]),   # second part
+    (11.5, 0.5, []),    # between the parts, inside their bbox
+    (21.5, 2.0, []),    # in the U's notch, inside its bbox
+    (20.5, 2.0, [2]),   # in the U's arm
+    (-1.0, 0.5, []),    # outside everything
+])
+def test_contains(packed, x, y, expected):
+    assert packed(SHAPES).contains(x, y, range(len(SHAPES))) == expected
+
+
+def test_contains_only_checks_candidates(packed):
+    polygons = packed(SHAPES)
+    assert polygons.contains(0.5, 0.5, [1, 2, 3]) == []
+    assert polygons.contains(0.5, 0.5, []) == []
+
+
+# A 2x2 grid of unit parcels, indexed row by row from (0, 0)
+GRID = [{"type": "Polygon", "coordinates": [_square(x, y)]} for y in range(2) for x in range(2)]
+
+
+@pytest.mark.parametrize("x, y", [
+    (1.0, 0.5), (0.5, 1.0),   # on a shared edge
+    (1.0, 1.0),               # on the vertex all four share
+    (1.0, 0.25), (1.0, 1.75),
+])
+def test_shared_boundary_points_belong_to_exactly_one_parcel(packed, x, y):
+    assert len(packed(GRID).contains(x, y, range(4))) == 1
+
+
+def test_hole_boundary_and_vertices(packed):
+    polygons = packed([DONUT])
+    # Points on the hole's edge or at a vertex are never claimed twice, and points a hair
+    # inside the ring or the hole land on the expected side
+    assert len(polygons.contains(1.0, 1.0, [0])) <= 1
+    assert polygons.contains(0.999999, 2.0, [0]) == [0]
+    assert polygons.contains(1.000001, 2.0, [0]) == []
+
+
+def test_distances(packed):
+    polygons = packed(SHAPES)
+    d = polygons.distances(2.0, 2.0, range(len(SHAPES)))
+    assert d[0] == pytest.approx(1.0)   # from the middle of the hole to its edge
+    assert d[1] == pytest.approx(65 ** 0.5)  # to the corner (10, 1)
+    assert d[3] == float("inf")          # no rings
+    assert polygons.distances(0.5, 0.5, [0]) == [0.0]
+
+
+def test_point_endpoint(client):
+    r = client.get("/parcels/point", params={"lat": 29.7575, "lon": -95.3575})
+    assert [f["properties"]["apn"] for f in r.json()["features"]] == ["1144400040007"]
+    # Inside the two parcels' combined bbox but in neither
+    r = client.get("/parcels/point", params={"lat": 29.7625, "lon": -95.3575})
+    assert r.json()["features"] == []
@@ -0,0 +1,67 @@
+import pytest
+
+from projection import PARCEL_FIELDS, Projection
+
+FEATURE = {
+    "type": "Feature",
+    "properties": {"apn": "001", "owner": "Demo Owner", "acres": 0.25, "distance_m": 12.5, "OBJECTID": 7},
+    "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [2, 0], [2, 2], [0, 2], [0, 0]]]},
+}
+
+
+def test_parse_rejects_unknown_fields_and_modes():
+    with pytest.raises(ValueError, match="Unknown fields: bogus"):
+        Projection.parse("apn,bogus")
+    with pytest.raises(ValueError, match="geometry must be one of"):
+        Projection.parse(None, "hull")
+
+
+def test_default_projection_passes_features_through():
+    proj = Projection.parse(" ", "full")
+    assert proj.is_default
+    assert proj.fields == PARCEL_FIELDS
+    assert proj.feature(FEATURE) is FEATURE
+
+
+def test_fields_whitelist_keeps_computed_properties_only():
+    proj = Projection.parse("owner, apn,owner")
+    assert proj.fields == ("owner", "apn")
+    assert proj.feature(FEATURE)["properties"] == {"apn": "001", "owner": "Demo Owner", "distance_m": 12.5}
+    # Without fields= every property is kept, whatever the geometry mode
+    assert Projection.parse(None, "centroid").properties(FEATURE["properties"]) == FEATURE["properties"]
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("centroid", {"type": "Point", "coordinates": [1.0, 1.0]}),
+    ("bbox", {"type": "Polygon", "coordinates": [[[0, 0], [2, 0], [2, 2], [0, 2], [0, 0]]]}),
+    ("none", None),
+])
+def test_geometry_modes(mode, expected):
+    geometry = Projection.parse("apn", mode).feature(FEATURE)["geometry"]
+    if expected and expected["type"] == "Point":
+        assert geometry["coordinates"] == pytest.approx(expected["coordinates"])
+    else:
+        assert geometry == expected
+
+
+def test_geometry_from_raw_geojson_text():
+    assert Projection.parse(None, "none").geometry_of('{"type":"Point","coordinates":[1,2]}') is None
+    point = Projection.parse(None, "centroid").geometry_of('{"type":"Point","coordinates":[1,2]}')
+    assert point == {"type": "Point", "coordinates": [1, 2]}
+
+
+def test_simplified_keeps_the_field_selection():
+    proj = Projection.parse("apn").simplified(0.5, 3)
+    assert (proj.geometry, proj.tolerance, proj.digits, proj.selected) == ("simplified", 0.5, 3, True)
+    assert Projection.parse().simplified(0.5, 3).selected is False
+    assert Projection.parse(None, "centroid").simplified(0.5, 3).geometry == "centroid"
+
+
+def test_sql():
+    proj = Projection.parse("apn,acres", "simplified")
+    assert proj.select_sql("p") == "p.apn, p.acres, ST_AsGeoJSON(ST_SimplifyPreserveTopology(p.geom, 1e-05), 6) AS geometry"
+    assert proj.csv_columns() == ["apn", "acres", "wkt"]
+    assert proj.csv_select_sql() == "apn, acres, ST_AsText(ST_SimplifyPreserveTopology(geom, 1e-05), 6) AS wkt"
+    none = Projection.parse("apn", "none")
+    assert none.select_sql() == "apn, NULL::text AS geometry"
+    assert none.csv_select_sql() == "apn"
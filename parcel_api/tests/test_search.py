@@ -0,0 +1,91 @@
+import pytest
+
+import app
+from text_index import AddressIndex, normalize_address, trigrams
+
+ADDRESSES = [
+    "123 Main St, Houston, TX",
+    "123 Main Street, Austin, TX",
+    "1234 Mainland Ave",
+    "500 Elm St. #4",
+    "12 Oak Rd",
+    None,
+    "9 Maine Ct",
+]
+
+
+@pytest.mark.parametrize("raw, norm", [
+    ("123 Main St., #4", "123 main st 4"),
+    ("  PO   Box-12 ", "po box 12"),
+    (None, ""),
+    ("#-.", ""),
+])
+def test_normalize_address(raw, norm):
+    assert normalize_address(raw) == norm
+
+
+def test_trigrams_match_pg_trgm():
+    assert trigrams("st") == {"  s", " st", "st "}
+    assert trigrams("a b") == {"  a", " a ", "  b", " b "}
+
+
+def test_prefix_matches_rank_first_shortest_then_alphabetical():
+    index = AddressIndex(ADDRESSES)
+    results = index.search("123 main", limit=5)
+    assert [i for _, i in results[:3]] == [0, 1, 2]
+    assert [s for s, _ in results[:2]] == [1.0, 1.0]
+
+
+def test_abbreviation_matches_fuzzily_below_exact_prefix():
+    # "Street" and "St" are not expanded: "123 main street" is a prefix of address 1 only,
+    # and reaches address 0 through shared trigrams
+    index = AddressIndex(ADDRESSES)
+    results = index.search("123 Main Street", limit=5)
+    assert [i for _, i in results[:2]] == [1, 0]
+    assert results[0][0] == 1.0
+    assert 0.5 <= results[1][0] < 1.0
+
+
+def test_word_prefixes_and_typos():
+    index = AddressIndex(ADDRESSES)
+    assert 3 in [i for _, i in index.search("elm st 4")]
+    assert 3 in [i for _, i in index.search("500 elm")]
+    assert [i for _, i in index.search("oak")] == [4]  # a word prefix, not the address start
+    assert 0 in [i for _, i in index.search("123 mian st")]  # transposed letters
+    assert index.search("zzzz") == []
+    assert index.search("   ") == []
+
+
+def test_threshold_and_limit():
+    index = AddressIndex(ADDRESSES)
+    loose = index.search("main", limit=10, threshold=0.3)
+    assert len(index.search("main", limit=2)) == 2
+    assert all(s >= 0.3 for s, _ in loose)
+    assert 6 in [i for _, i in loose]  # "maine"
+
+
+def test_search_endpoint_filters_by_state_and_county(client):
+    params = {"q": "123 demo"}
+    body = client.get("/parcels/search", params=params).json()
+    assert [f["properties"]["apn"] for f in body["features"]] == ["1144400040007"]
+    assert body["features"][0]["properties"]["score"] == 1.0
+    assert client.get("/parcels/search", params={**params, "state": "tx", "county": "HARRIS"}).json()["features"]
+    assert client.get("/parcels/search", params={**params, "state": "CA"}).json()["features"] == []
+    assert client.get("/parcels/search", params={**params, "county": "Travis"}).json()["features"] == []
+
+
+def test_demo_search_fills_the_page_after_filtering(monkeypatch):
+    features = [
+        {"type": "Feature", "properties": {"address": f"{n} Main St", "state": "TX" if n % 5 else "OK",
+                                           "county": "Harris"}, "geometry": None}
+        for n in range(100, 200)
+    ]
+    monkeypatch.setattr(app, "_demo_features", features)
+    monkeypatch.setattr(app, "_demo_address_index", AddressIndex([f["properties"]["address"] for f in features]))
+    hits = app._demo_search("1", 5, state="ok")
+    assert [f["properties"]["address"] for f, _ in hits] == ["100 Main St", "105 Main St", "110 Main St",
+                                                              "115 Main St", "120 Main St"]
+
+
+def test_search_endpoint_ignores_punctuation_only_queries(client):
+    assert client.get("/parcels/search", params={"q": "#--"}).json()["features"] == []
@@ -0,0 +1,103 @@
+import pytest
+from fastapi import HTTPException
+
+import app
+from geometry import PackedPolygons
+
+# The two demo parcels: 001 at [-95.36, -95.355] x [29.755, 29.76], 002 at [-95.365, -95.36] x [29.76, 29.765]
+AROUND_BOTH = [[-95.37, 29.75], [-95.35, 29.75], [-95.35, 29.77], [-95.37, 29.77], [-95.37, 29.75]]
+EXACTLY_001 = [[-95.36, 29.755], [-95.355, 29.755], [-95.355, 29.76], [-95.36, 29.76], [-95.36, 29.755]]
+
+
+def _polygon(*rings):
+    return {"type": "Polygon", "coordinates": list(rings)}
+
+
+def _square(x, y, size=1.0):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+@pytest.mark.parametrize("geometry, detail", [
+    ({"type": "Point", "coordinates": [0, 0]}, "geometry must be a GeoJSON Polygon or MultiPolygon"),
+    ({"type": "Polygon", "coordinates": []}, "geometry has no coordinates"),
+    ({"type": "MultiPolygon", "coordinates": [[]]}, "Invalid polygon: a polygon needs at least one ring"),
+    ({"type": "Polygon", "coordinates": [[]]}, "Invalid polygon: a ring needs at least 3 distinct positions"),
+    (_polygon([[0, 0], [1, 0], [0, 0]]), "Invalid polygon: a ring needs at least 3 distinct positions"),
+    (_polygon([[0, 0], [1, 0]]), "Invalid polygon: a ring needs at least 3 distinct positions"),
+    (_polygon([[0, 0], [200, 0], [0, 1]]), "Invalid polygon: coordinates must be lon/lat"),
+    (_polygon([[0, 0], ["x", 0], [0, 1]]), "Invalid polygon: could not convert string to float: 'x'"),
+    (_polygon([[0], [1, 0], [0, 1]]), "Invalid polygon: list index out of range"),
+])
+def test_selection_region_rejects_bad_geometry(geometry, detail):
+    with pytest.raises(HTTPException) as exc:
+        app._selection_region(geometry)
+    assert exc.value.status_code == 400
+    assert exc.value.detail == detail
+
+
+def test_selection_region_closes_rings_and_unwraps_features():
+    feature = {"type": "Feature", "geometry": _polygon([[0, 0], [1, 0], [1, 1]])}
+    assert app._selection_region(feature) == _polygon([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 0.0]])
+
+
+def test_selection_region_vertex_cap(monkeypatch):
+    monkeypatch.setattr(app, "WITHIN_MAX_VERTICES", 4)
+    with pytest.raises(HTTPException) as exc:
+        app._selection_region(_polygon(_square(0, 0), _square(0.2, 0.2, 0.5)))
+    assert exc.value.status_code == 413
+
+
+# A 3x3 grid of unit parcels, indexed row by row from (0, 0)
+GRID = PackedPolygons([_polygon(_square(x, y)) for y in range(3) for x in range(3)])
+
+
+@pytest.mark.parametrize("region, mode, expected", [
+    # Region edges lie on parcel edges: ST_Within counts the covered parcels as inside
+    (_polygon(_square(0, 0, 2)), "within", [0, 1, 3, 4]),
+    (_polygon(_square(0, 0, 2)), "intersects", [0, 1, 2, 3, 4, 5, 6, 7, 8]),
+    (_polygon(_square(0.5, 0.5, 1)), "within", []),
+    (_polygon(_square(0.5, 0.5, 1)), "intersects", [0, 1, 3, 4]),
+    # Concave L: parcel 4 spans the notch, so it is not within
+    (_polygon([[0, 0], [2, 0], [2, 1], [1, 1], [1, 2], [0, 2], [0, 0]]), "within", [0, 1, 3]),
+    # A hole around parcel 4, on its edges: 4 is not within (it only touches) and its neighbours are
+    (_polygon(_square(0, 0, 3), _square(1, 1)[::-1]), "within", [0, 1, 2, 3, 5, 6, 7, 8]),
+    (_polygon(_square(0, 0, 3), _square(1.25, 1.25, 0.5)[::-1]), "within", [0, 1, 2, 3, 5, 6, 7, 8]),
+    (_polygon(_square(0, 0, 3), _square(1.25, 1.25, 0.5)[::-1]), "intersects", [0, 1, 2, 3, 4, 5, 6, 7, 8]),
+    # A region inside one parcel intersects it only
+    (_polygon(_square(2.25, 2.25, 0.5)), "intersects", [8]),
+    ({"type": "MultiPolygon", "coordinates": [[_square(0, 0)], [_square(2, 2)]]}, "within", [0, 8]),
+])
+def test_select_matches_postgis_predicates(region, mode, expected):
+    assert GRID.select(PackedPolygons([region]), range(9), mode) == expected
+
+
+def test_select_python_fallback_agrees(monkeypatch):
+    import geometry
+
+    monkeypatch.setattr(geometry, "np", None)
+    grid = PackedPolygons([_polygon(_square(x, y)) for y in range(3) for x in range(3)])
+    region = PackedPolygons([_polygon([[0, 0], [2, 0], [2, 1], [1, 1], [1, 2], [0, 2], [0, 0]])])
+    assert grid.select(region, range(9), "within") == [0, 1, 3]
+    assert grid.select(region, range(9), "intersects") == [0, 1, 2, 3, 4, 5, 6, 7]
+
+
+@pytest.mark.parametrize("ring, mode, apns", [
+    (AROUND_BOTH, "within", ["1144400040007", "0280490000034"]),
+    (EXACTLY_001, "within", ["1144400040007"]),
+    (EXACTLY_001, "intersects", ["1144400040007", "0280490000034"]),  # 002 touches 001 at a corner
+])
+def test_within_endpoint(client, ring, mode, apns):
+    r = client.post("/parcels/within", json={"geometry": _polygon(ring), "mode": mode})
+    assert r.status_code == 200
+    body = r.json()
+    assert [f["properties"]["apn"] for f in body["features"]] == apns
+    assert body["summary"]["parcels"] == len(apns)
+    assert body["summary"]["truncated"] is False
+
+
+def test_within_endpoint_limit_and_bad_polygon(client):
+    body = client.post("/parcels/within", json={"geometry": _polygon(AROUND_BOTH), "limit": 1}).json()
+    assert len(body["features"]) == 1
+    assert body["summary"]["parcels"] == 2 and body["summary"]["truncated"] is True
+    r = client.post("/parcels/within", json={"geometry": {"type": "MultiPolygon", "coordinates": [[]]}})
+    assert r.status_code == 400
@@ -0,0 +1,135 @@
+"""
+In-memory address search for the Parcel API's demo mode.
+
+Mirrors the PostGIS side (a generated address_norm column with a pg_trgm GIN
+index): addresses are normalized to lowercase alphanumeric words, then matched
+by prefix (sorted list + bisect), by completed words plus a prefix of the last
+word (token postings), and fuzzily by trigram overlap as in pg_trgm's
+word_similarity. Postings are compact arrays, so a state-sized file fits in memory.
+"""
+import bisect
+import heapq
+import re
+from array import array
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_address(s) -> str:
+    """Lowercase words of letters and digits, single-spaced: '123 Main St., #4' -> '123 main st 4'."""
+    return " ".join(_NON_ALNUM.sub(" ", str(s or "").lower()).split())
+
+
+def trigrams(s: str) -> set:
+    """pg_trgm-style trigrams of a normalized string (each word padded with two leading spaces, one trailing)."""
+    out = set()
+    for word in s.split():
+        w = "  " + word + " "
+        for i in range(len(w) - 2):
+            out.add(w[i:i + 3])
+    return out
+
+
+class AddressIndex:
+    """Ranked prefix + fuzzy search over a list of addresses; search() returns (score, position) pairs.
+
+    Score is 1.0 for addresses that start with the query, otherwise the share of the
+    query's trigrams found in the address. Positions refer to the input list.
+    """
+
+    # Single-word prefixes that match more postings than this stop collecting early
+    MAX_PREFIX_CANDIDATES = 2000
+    # Fuzzy matches kept for ranking (those sharing the most trigrams)
+    MAX_FUZZY_CANDIDATES = 2000
+
+    def __init__(self, addresses):
+        self.norm = [normalize_address(a) for a in addresses]
+        self._sorted = sorted((n, i) for i, n in enumerate(self.norm) if n)
+        self._sorted_keys = [n for n, _ in self._sorted]
+        self._postings = {}
+        grams = {}
+        for i, n in enumerate(self.norm):
+            for t in set(n.split()):
+                self._postings.setdefault(t, array("I")).append(i)
+            for gram in trigrams(n):
+                grams.setdefault(gram, array("I")).append(i)
+        self._tokens = sorted(self._postings)
+        self._grams = grams
+
+    def __len__(self):
+        return len(self.norm)
+
+    def _prefix(self, q, limit):
+        lo = bisect.bisect_left(self._sorted_keys, q)
+        out = []
+        for n, i in self._sorted[lo:lo + limit]:
+            if not n.startswith(q):
+                break
+            out.append(i)
+        return out
+
+    def _token_matches(self, words):
+        """Positions containing every word but the last, and a word starting with the last."""
+        *complete, last = words
+        candidates = None
+        for w in sorted(complete, key=lambda t: len(self._postings.get(t, ()))):
+            posting = self._postings.get(w)
+            if posting is None:
+                return []
+            candidates = set(posting) if candidates is None else candidates.intersection(posting)
+            if not candidates:
+                return []
+        if candidates is not None:
+            return [i for i in candidates if any(t.startswith(last) for t in self.norm[i].split())]
+        out = set()
+        k = bisect.bisect_left(self._tokens, last)
+        while k < len(self._tokens) and self._tokens[k].startswith(last):
+            out.update(self._postings[self._tokens[k]])
+            if len(out) >= self.MAX_PREFIX_CANDIDATES:
+                break
+            k += 1
+        return list(out)
+
+    def _fuzzy(self, q, threshold):
+        """{position: score} for addresses sharing at least threshold of the query's trigrams."""
+        q_grams = [g for g in trigrams(q) if g in self._grams]
+        total = len(trigrams(q))
+        if not total or not q_grams:
+            return {}
+        need = max(1, int(threshold * total + 0.999999))
+        if np is not None:
+            postings = np.concatenate([np.frombuffer(self._grams[g], dtype=np.uint32) for g in q_grams])
+            counts = np.bincount(postings, minlength=len(self.norm))
+            positions = np.nonzero(counts >= need)[0]
+            if len(positions) > self.MAX_FUZZY_CANDIDATES:
+                top = np.argpartition(-counts[positions], self.MAX_FUZZY_CANDIDATES)[:self.MAX_FUZZY_CANDIDATES]
+                positions = positions[top]
+            return dict(zip(positions.tolist(), (counts[positions] / total).tolist()))
+        counts = Counter()
+        for g in q_grams:
+            counts.update(self._grams[g])
+        return {i: c / total for i, c in counts.most_common(self.MAX_FUZZY_CANDIDATES) if c >= need}
+
+    def search(self, query, limit=10, threshold=0.5):
+        """Best matches for query, highest score first (ties: shorter address, then alphabetical)."""
+        q = normalize_address(query)
+        if not q or limit <= 0:
+            return []
+        scores = {i: 1.0 for i in self._prefix(q, limit)}
+        if len(scores) < limit:
+            fuzzy = self._fuzzy(q, threshold)
+            # Word-prefix matches always qualify, even when the typed prefix shares few trigrams
+            for i in self._token_matches(q.split()):
+                fuzzy.setdefault(i, threshold)
+            for i, s in fuzzy.items():
+                scores.setdefault(i, s)
+        ranked = heapq.nsmallest(
+            limit, scores.items(), key=lambda kv: (-kv[1], len(self.norm[kv[0]]), self.norm[kv[0]]),
+        )
+        return [(s, i) for i, s in ranked]
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Parcel API's async query path against the blocking (threadpool) path.
+
+Modes:
+  db    Run the /parcels bbox query directly against PostGIS, once the way a sync FastAPI
+        endpoint does (blocking psycopg on a fixed threadpool, 40 threads by default, same as
+        FastAPI/anyio) and once the way the async endpoints do (AsyncConnectionPool on the
+        event loop). Both use the same pool size, so the difference is the threadpool ceiling.
+  http  Fire viewport requests at a running Parcel API and report latency / throughput.
+        Run it against a server from an older (sync) checkout and this one to compare.
+
+Requires: psycopg[binary] (db mode), httpx (http mode). Uses parcel_api/.env like the API.
+
+Usage:
+  python scripts/bench_parcel_api_async.py db --requests 5000 --concurrency 1000 --sleep-ms 20
+  python scripts/bench_parcel_api_async.py http --url http://localhost:8001 --requests 5000 --concurrency 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parcel_api"))
+
+try:
+    import dotenv
+    dotenv.load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parcel_api", ".env"))
+except ImportError:
+    pass
+
+BBOX_SQL = """
+SELECT apn, address, owner, acres, legal_desc, market_value, state, county,
+       ST_AsGeoJSON(geom)::json AS geometry
+FROM parcels
+WHERE geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+LIMIT %s
+"""
+
+
+def random_viewports(n, center, span, seed=0):
+    """n random map viewports (min_lon, min_lat, max_lon, max_lat) around center."""
+    rng = random.Random(seed)
+    lon, lat = center
+    out = []
+    for _ in range(n):
+        w = span * rng.uniform(0.1, 1.0)
+        cx = lon + rng.uniform(-span, span)
+        cy = lat + rng.uniform(-span, span)
+        out.append((cx - w / 2, cy - w / 2, cx + w / 2, cy + w / 2))
+    return out
+
+
+def summarize(label, latencies, wall, errors):
+    lat = sorted(latencies)
+
+    def pct(p):
+        if not lat:
+            return None
+        return round(lat[min(len(lat) - 1, int(p / 100.0 * len(lat)))] * 1000, 2)
+
+    return {
+        "label": label,
+        "requests": len(lat) + errors,
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "rps": round(len(lat) / wall, 1) if wall else None,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+        "mean_ms": round(statistics.mean(lat) * 1000, 2) if lat else None,
+    }
+
+
+async def run_clients(viewports, concurrency, one_request):
+    """Issue one_request(viewport) with at most `concurrency` in flight; return latencies, errors, wall."""
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def client(vp):
+        nonlocal errors
+        async with gate:
+            t0 = time.perf_counter()
+            try:
+                await one_request(vp)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(vp) for vp in viewports))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def bench_db(args, viewports):
+    from db_pool import AsyncConnectionPool, ConnectionPool, pool_settings_from_env
+
+    sizing = {"min_size": args.pool_max, "max_size": args.pool_max, "timeout": 60.0}
+    sleep_sql = "SELECT pg_sleep(%s)"
+    sleep_s = args.sleep_ms / 1000.0
+    results = []
+
+    # Sync path: blocking psycopg on a fixed threadpool, as FastAPI runs `def` endpoints
+    sync_pool = ConnectionPool(**{**pool_settings_from_env(asynchronous=False), **sizing})
+    sync_pool.open(wait=True)
+    executor = ThreadPoolExecutor(max_workers=args.threads)
+    loop = asyncio.get_running_loop()
+
+    def sync_query(vp):
+        conn = sync_pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                if sleep_s:
+                    cur.execute(sleep_sql, (sleep_s,))
+                cur.execute(BBOX_SQL, (*vp, args.limit))
+                cur.fetchall()
+            conn.commit()
+        finally:
+            sync_pool.putconn(conn)
+
+    async def sync_request(vp):
+        await loop.run_in_executor(executor, sync_query, vp)
+
+    lat, err, wall = await run_clients(viewports, args.concurrency, sync_request)
+    results.append(summarize(f"sync threadpool ({args.threads} threads)", lat, wall, err))
+    executor.shutdown()
+    sync_pool.close()
+
+    # Async path: AsyncConnectionPool on the event loop, as the async endpoints do
+    async_pool = AsyncConnectionPool(**{**pool_settings_from_env(), **sizing})
+    await async_pool.open(wait=True)
+
+    async def async_request(vp):
+        conn = await async_pool.getconn()
+        try:
+            async with conn.cursor() as cur:
+                if sleep_s:
+                    await cur.execute(sleep_sql, (sleep_s,))
+                await cur.execute(BBOX_SQL, (*vp, args.limit))
+                await cur.fetchall()
+            await conn.commit()
+        finally:
+            await async_pool.putconn(conn)
+
+    lat, err, wall = await run_clients(viewports, args.concurrency, async_request)
+    results.append(summarize("async pool", lat, wall, err))
+    await async_pool.close()
+    return results
+
+
+async def bench_http(args, viewports):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url.rstrip("/"), limits=limits, timeout=120) as client:
+        async def request(vp):
+            r = await client.get("/parcels", params={
+                "min_lon": vp[0], "min_lat": vp[1], "max_lon": vp[2], "max_lat": vp[3], "limit": args.limit,
+            })
+            r.raise_for_status()
+
+        lat, err, wall = await run_clients(viewports, args.concurrency, request)
+    return [summarize(f"http {args.url}", lat, wall, err)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark Parcel API async vs sync query paths")
+    ap.add_argument("mode", choices=["db", "http"], help="db: direct PostGIS comparison; http: hit a running API")
+    ap.add_argument("--url", default="http://localhost:8001", help="API base URL (http mode)")
+    ap.add_argument("--requests", type=int, default=2000, help="Total viewport requests (default 2000)")
+    ap.add_argument("--concurrency", type=int, default=500, help="Requests in flight at once (default 500)")
+    ap.add_argument("--threads", type=int, default=40, help="Sync threadpool size (default 40, FastAPI's default)")
+    ap.add_argument("--pool-max", type=int, default=100, help="DB connections for both paths (default 100)")
+    ap.add_argument("--sleep-ms", type=float, default=0, help="Extra server-side latency per query via pg_sleep (db mode)")
+    ap.add_argument("--limit", type=int, default=500, help="Features per viewport (default 500)")
+    ap.add_argument("--center", type=float, nargs=2, default=(-95.36, 29.76), metavar=("LON", "LAT"))
+    ap.add_argument("--span", type=float, default=0.05, help="Viewport spread in degrees (default 0.05)")
+    ap.add_argument("--out", default=None, help="Write results JSON to this file")
+    args = ap.parse_args()
+
+    viewports = random_viewports(args.requests, args.center, args.span)
+    runner = bench_db if args.mode == "db" else bench_http
+    results = asyncio.run(runner(args, viewports))
+    for r in results:
+        print(json.dumps(r))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"mode": args.mode, "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Load-test harness for the Parcel API: synthetic datasets, realistic traces, comparable JSON results.
+
+Commands:
+  generate  Write a synthetic parcel GeoJSON (plus a .meta.json sidecar describing its layout):
+            N jittered polygons laid out on a grid in each of C fake counties, with APNs,
+            addresses, owners and values. Load it into PostGIS with load_parcels_to_postgis.py,
+            or serve it in demo mode.
+  run       Replay a seeded trace against the API and report p50/p95/p99 latency, RPS, bytes and
+            server memory per endpoint. The trace mixes map sessions that pan and zoom
+            (GET /parcels), clicks inside the viewport (GET /parcels/point) and APN lookups
+            (GET /parcels/by-apn, skewed toward popular parcels, some dashed, some missing).
+            --serve demo|postgis starts uvicorn from parcel_api/ for the run (demo: the dataset
+            file with PostGIS disabled; postgis: the database in parcel_api/.env, e.g. the
+            docker-compose container), otherwise --url targets a running server.
+  compare   Print the change in latency/RPS/memory between two result files (e.g. two commits).
+
+Requires: httpx. Memory is read from /proc, so it is reported on Linux only.
+
+Usage:
+  python scripts/bench_parcel_api_load.py generate --parcels 100000 --counties 4 --out /tmp/synthetic.geojson
+  python scripts/bench_parcel_api_load.py run --dataset /tmp/synthetic.geojson --serve demo --out demo.json
+  python scripts/load_parcels_to_postgis.py /tmp/synthetic.geojson
+  python scripts/bench_parcel_api_load.py run --dataset /tmp/synthetic.geojson --serve postgis --out pg.json
+  python scripts/bench_parcel_api_load.py compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from bench_parcel_api_async import summarize
+
+PARCEL_API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parcel_api")
+
+STREETS = ["Main", "Oak", "Pine", "Cedar", "Elm", "Maple", "Lake", "Hill", "Park", "Washington",
+           "Ranch", "Mill", "River", "Sunset", "Church", "Spring", "Meadow", "Forest", "Ridge", "Bayou"]
+SUFFIXES = ["St", "Ave", "Rd", "Dr", "Ln", "Blvd", "Ct", "Way"]
+FIRST = ["John", "Mary", "James", "Linda", "Robert", "Maria", "David", "Susan", "Jose", "Karen"]
+LAST = ["Smith", "Garcia", "Johnson", "Nguyen", "Brown", "Davis", "Lopez", "Miller", "Wilson", "Patel"]
+ENTITIES = ["LLC", "Trust", "Holdings LP", "Properties Inc"]
+
+# Web map viewport used by the pan/zoom trace
+VIEWPORT_PX = (1280, 800)
+TILE_PX = 256
+
+
+# --- synthetic datasets ---
+
+def dataset_layout(parcels, counties):
+    """Grid layout shared by generate and the traces: per-county origin, rows, cols and cell size."""
+    per_county = math.ceil(parcels / counties)
+    cols = math.ceil(math.sqrt(per_county))
+    rows = math.ceil(per_county / cols)
+    cell = min(0.0005, 0.45 / cols)  # ~50 m lots; large counties shrink to fit a 0.5-degree square
+    out = []
+    for c in range(counties):
+        lon0 = -100.0 + (c % 8) * 0.5
+        lat0 = 29.0 + (c // 8) * 0.5
+        n = min(per_county, parcels - c * per_county)
+        if n <= 0:
+            break
+        out.append({
+            "county": f"Synthetic{c + 1}", "state": "TX", "index": c, "parcels": n,
+            "origin": [lon0, lat0], "cols": cols, "rows": math.ceil(n / cols), "cell": cell,
+            "bbox": [lon0, lat0, lon0 + cols * cell, lat0 + math.ceil(n / cols) * cell],
+        })
+    return out
+
+
+def synthetic_apn(county_index, k):
+    return f"{county_index + 1:03d}{k:010d}"
+
+
+def synthetic_feature(rng, county, k):
+    """Parcel k of a county: a jittered quad or pentagon inside its grid cell."""
+    cell = county["cell"]
+    row, col = divmod(k, county["cols"])
+    x0 = county["origin"][0] + col * cell
+    y0 = county["origin"][1] + row * cell
+    inset = cell * 0.05
+
+    def j():
+        return rng.uniform(0, cell * 0.08)
+
+    ring = [
+        [x0 + inset + j(), y0 + inset + j()],
+        [x0 + cell - inset - j(), y0 + inset + j()],
+        [x0 + cell - inset - j(), y0 + cell - inset - j()],
+        [x0 + inset + j(), y0 + cell - inset - j()],
+    ]
+    if rng.random() < 0.3:
+        ring.insert(2, [x0 + cell - inset, y0 + cell / 2 + rng.uniform(-inset, inset)])
+    ring.append(ring[0])
+    ring = [[round(x, 7), round(y, 7)] for x, y in ring]
+    acres = (cell * 111320 * math.cos(math.radians(y0))) * (cell * 110540) * 0.9 / 4046.86
+    if rng.random() < 0.2:
+        owner = f"{rng.choice(LAST)} {rng.choice(ENTITIES)}"
+    else:
+        owner = f"{rng.choice(LAST)}, {rng.choice(FIRST)}"
+    return {
+        "type": "Feature",
+        "properties": {
+            "apn": synthetic_apn(county["index"], k),
+            "address": f"{100 + (k % 9900)} {STREETS[row % len(STREETS)]} {SUFFIXES[col % len(SUFFIXES)]}",
+            "owner": owner,
+            "acres": round(acres * rng.uniform(0.8, 1.2), 4),
+            "legal_desc": f"LT {k % 40 + 1} BLK {row + 1} {county['county'].upper()} SUBDIVISION",
+            "market_value": round(rng.lognormvariate(12.3, 0.6), 2),
+            "state": county["state"],
+            "county": county["county"],
+        },
+        "geometry": {"type": "Polygon", "coordinates": [ring]},
+    }
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    layout = dataset_layout(args.parcels, args.counties)
+    t0 = time.perf_counter()
+    with open(args.out, "w") as f:
+        f.write('{"type":"FeatureCollection","features":[\n')
+        first = True
+        for county in layout:
+            for k in range(county["parcels"]):
+                if not first:
+                    f.write(",\n")
+                f.write(json.dumps(synthetic_feature(rng, county, k), separators=(",", ":")))
+                first = False
+        f.write("\n]}\n")
+    meta = {"parcels": args.parcels, "counties": layout, "seed": args.seed}
+    with open(meta_path(args.out), "w") as f:
+        json.dump(meta, f, indent=2)
+    print(json.dumps({
+        "dataset": args.out, "parcels": args.parcels, "counties": len(layout),
+        "bytes": os.path.getsize(args.out), "seconds": round(time.perf_counter() - t0, 2),
+    }))
+
+
+def meta_path(dataset):
+    return os.path.splitext(dataset)[0] + ".meta.json"
+
+
+# --- traces ---
+
+def viewport_bbox(lon, lat, zoom):
+    """Bounding box of a VIEWPORT_PX web map centered on lon/lat at zoom."""
+    deg_per_px = 360.0 / (TILE_PX * 2 ** zoom)
+    half_w = VIEWPORT_PX[0] / 2 * deg_per_px
+    half_h = VIEWPORT_PX[1] / 2 * deg_per_px * math.cos(math.radians(lat))
+    return (lon - half_w, lat - half_h, lon + half_w, lat + half_h)
+
+
+def build_trace(meta, requests, mix, seed):
+    """Seeded list of (endpoint, params): map sessions (pan/zoom + clicks) interleaved with APN lookups."""
+    rng = random.Random(seed)
+    counties = meta["counties"]
+    weights = [c["parcels"] for c in counties]
+    total_mix = sum(mix.values())
+    trace = []
+    session = None
+    while len(trace) < requests:
+        r = rng.random() * total_mix
+        if r < mix["by_apn"]:
+            county = rng.choices(counties, weights)[0]
+            # Skewed popularity: a few parcels get most lookups, like a CRM's active deals
+            k = min(county["parcels"] - 1, int(rng.paretovariate(1.2)) - 1 + rng.randrange(50))
+            apn = synthetic_apn(county["index"], k)
+            if rng.random() < 0.05:
+                apn = "999" + apn[3:]  # not in the dataset
+            elif rng.random() < 0.3:
+                apn = f"{apn[:3]}-{apn[3:8]}-{apn[8:]}"
+            trace.append(("by_apn", {"apn": apn}))
+            continue
+        if session is None or session["left"] <= 0:
+            county = rng.choices(counties, weights)[0]
+            x0, y0, x1, y1 = county["bbox"]
+            session = {
+                "lon": rng.uniform(x0, x1), "lat": rng.uniform(y0, y1),
+                "zoom": rng.choice([15, 16, 16, 17, 17, 18]), "left": rng.randint(5, 30),
+            }
+        session["left"] -= 1
+        bbox = viewport_bbox(session["lon"], session["lat"], session["zoom"])
+        if r < mix["by_apn"] + mix["point"]:
+            trace.append(("point", {"lon": rng.uniform(bbox[0], bbox[2]), "lat": rng.uniform(bbox[1], bbox[3])}))
+            continue
+        trace.append(("bbox", {
+            "min_lon": bbox[0], "min_lat": bbox[1], "max_lon": bbox[2], "max_lat": bbox[3],
+            "zoom": session["zoom"], "limit": 2000,
+        }))
+        # Next view: mostly pans of up to half a screen, sometimes a zoom step
+        step = rng.random()
+        if step < 0.15:
+            session["zoom"] = min(19, session["zoom"] + 1)
+        elif step < 0.3:
+            session["zoom"] = max(14, session["zoom"] - 1)
+        else:
+            session["lon"] += (bbox[2] - bbox[0]) * rng.uniform(-0.5, 0.5)
+            session["lat"] += (bbox[3] - bbox[1]) * rng.uniform(-0.5, 0.5)
+    return trace
+
+
+ENDPOINTS = {"bbox": "/parcels", "point": "/parcels/point", "by_apn": "/parcels/by-apn"}
+
+
+# --- server under test ---
+
+def read_memory(pid):
+    """{"rss_mb", "peak_rss_mb"} of a process from /proc (Linux), or None."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            fields = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+
+    def mb(key):
+        v = fields.get(key)
+        return round(int(v.split()[0]) / 1024, 1) if v else None
+
+    return {"rss_mb": mb("VmRSS"), "peak_rss_mb": mb("VmHWM")}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args):
+    """Start uvicorn from parcel_api/; returns (process, base url, seconds until /health answered)."""
+    env = dict(os.environ)
+    if args.serve == "demo":
+        env["PARCEL_DEMO_GEJSON"] = os.path.abspath(args.dataset)
+        env["PARCEL_DEMO_MAX_FEATURES"] = "0"
+        # Unreachable database, refused at once: the breaker opens at startup and demo data answers
+        env["DATABASE_URL"] = "postgresql://postgres@127.0.0.1:1/parcel_db"
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--workers", "1"],
+        cwd=PARCEL_API_DIR, env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    import httpx
+
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < args.startup_timeout:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with code {proc.returncode}")
+        try:
+            if httpx.get(url + "/health", timeout=1).status_code == 200:
+                return proc, url, time.perf_counter() - t0
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit(f"server did not answer /health within {args.startup_timeout}s")
+
+
+async def replay(url, trace, concurrency, memory_pid=None):
+    """Replay the trace with `concurrency` clients in order; per-endpoint latencies, bytes and errors."""
+    import httpx
+
+    per = {name: {"latencies": [], "errors": 0, "bytes": 0} for name in ENDPOINTS}
+    queue = iter(trace)
+    peak = {"rss_mb": None}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        async def worker():
+            for name, params in queue:
+                st = per[name]
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(ENDPOINTS[name], params=params)
+                    body = r.content
+                    if r.status_code >= 500 or (r.status_code >= 400 and r.status_code != 404):
+                        st["errors"] += 1
+                        continue
+                except httpx.HTTPError:
+                    st["errors"] += 1
+                    continue
+                st["latencies"].append(time.perf_counter() - t0)
+                st["bytes"] += len(body)
+
+        async def sample_memory():
+            while True:
+                mem = read_memory(memory_pid) if memory_pid else None
+                if mem and (peak["rss_mb"] is None or mem["rss_mb"] > peak["rss_mb"]):
+                    peak["rss_mb"] = mem["rss_mb"]
+                await asyncio.sleep(0.25)
+
+        sampler = asyncio.create_task(sample_memory())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+        sampler.cancel()
+    results = []
+    for name, st in per.items():
+        if not st["latencies"] and not st["errors"]:
+            continue
+        out = summarize(name, st["latencies"], wall, st["errors"])
+        out["endpoint"] = ENDPOINTS[name]
+        out["bytes_avg"] = round(st["bytes"] / len(st["latencies"])) if st["latencies"] else None
+        results.append(out)
+    all_latencies = [x for st in per.values() for x in st["latencies"]]
+    overall = summarize("all", all_latencies, wall, sum(st["errors"] for st in per.values()))
+    return overall, results, peak["rss_mb"]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PARCEL_API_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    with open(meta_path(args.dataset)) as f:
+        meta = json.load(f)
+    mix = {"bbox": args.mix[0], "point": args.mix[1], "by_apn": args.mix[2]}
+    trace = build_trace(meta, args.requests, mix, args.seed)
+    proc = None
+    server = {"mode": args.serve or "external", "url": args.url}
+    if args.serve:
+        proc, url, startup = start_server(args)
+        server.update(url=url, pid=proc.pid, startup_seconds=round(startup, 2), memory_after_startup=read_memory(proc.pid))
+    else:
+        url = args.url.rstrip("/")
+    try:
+        if args.warmup:
+            asyncio.run(replay(url, build_trace(meta, args.warmup, mix, args.seed + 1), args.concurrency))
+        overall, results, peak_rss = asyncio.run(replay(url, trace, args.concurrency, proc.pid if proc else args.pid))
+        if proc or args.pid:
+            server["memory_after_run"] = read_memory(proc.pid if proc else args.pid)
+            server["rss_mb_max_sampled"] = peak_rss
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "dataset": {"path": args.dataset, "parcels": meta["parcels"], "counties": len(meta["counties"])},
+        "trace": {"requests": args.requests, "mix": mix, "seed": args.seed, "concurrency": args.concurrency},
+        "server": server,
+        "overall": overall,
+        "results": results,
+    }
+    for r in [overall] + results:
+        print(json.dumps(r))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    def change(a, b):
+        if a in (None, 0) or b is None:
+            return None
+        return f"{(b - a) / a * 100:+.1f}%"
+
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    rows = {r["label"]: r for r in before["results"] + [before["overall"]]}
+    for r in after["results"] + [after["overall"]]:
+        old = rows.get(r["label"])
+        if old is None:
+            continue
+        parts = [f"{k} {old[k]} -> {r[k]} ({change(old[k], r[k])})" for k in ("p50_ms", "p95_ms", "p99_ms", "rps")]
+        print(f"{r['label']:>7}: " + ", ".join(parts))
+    old_mem = (before.get("server") or {}).get("memory_after_run") or {}
+    new_mem = (after.get("server") or {}).get("memory_after_run") or {}
+    if old_mem.get("peak_rss_mb") and new_mem.get("peak_rss_mb"):
+        print(f" memory: peak_rss_mb {old_mem['peak_rss_mb']} -> {new_mem['peak_rss_mb']} "
+              f"({change(old_mem['peak_rss_mb'], new_mem['peak_rss_mb'])})")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parcel API load tests on synthetic parcel datasets")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    g = sub.add_parser("generate", help="Write a synthetic parcel GeoJSON and its .meta.json")
+    g.add_argument("--parcels", type=int, default=100000, help="Total parcels (default 100000)")
+    g.add_argument("--counties", type=int, default=4, help="Fake counties to spread them over (default 4)")
+    g.add_argument("--seed", type=int, default=0)
+    g.add_argument("--out", default="synthetic_parcels.geojson")
+
+    r = sub.add_parser("run", help="Replay a trace against the API and record latency, RPS and memory")
+    r.add_argument("--dataset", required=True, help="GeoJSON written by generate (its .meta.json drives the trace)")
+    r.add_argument("--serve", choices=["demo", "postgis"], default=None,
+                   help="Start uvicorn for the run: demo = serve the dataset file; postgis = use parcel_api/.env")
+    r.add_argument("--url", default="http://localhost:8001", help="Running API to test when --serve is not given")
+    r.add_argument("--pid", type=int, default=None, help="PID of the running API, for memory (with --url)")
+    r.add_argument("--requests", type=int, default=5000, help="Requests in the trace (default 5000)")
+    r.add_argument("--warmup", type=int, default=200, help="Requests before measuring, different seed (default 200)")
+    r.add_argument("--concurrency", type=int, default=32, help="Concurrent clients (default 32)")
+    r.add_argument("--mix", type=float, nargs=3, default=(0.6, 0.25, 0.15), metavar=("BBOX", "POINT", "APN"),
+                   help="Share of bbox, point and by-apn requests (default 0.6 0.25 0.15)")
+    r.add_argument("--seed", type=int, default=0)
+    r.add_argument("--startup-timeout", type=float, default=600, help="Seconds to wait for --serve (default 600)")
+    r.add_argument("--out", default=None, help="Write the report JSON to this file")
+
+    c = sub.add_parser("compare", help="Compare two run reports")
+    c.add_argument("before")
+    c.add_argument("after")
+
+    args = ap.parse_args()
+    {"generate": generate, "run": run, "compare": compare}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
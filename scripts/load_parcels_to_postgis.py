@@ -12,6 +12,7 @@ Environment:
 Usage:
   python scripts/load_parcels_to_postgis.py data/parcels/TX_Harris.geojson
   python scripts/load_parcels_to_postgis.py data/parcels/*.geojson --table parcels
+  python scripts/load_parcels_to_postgis.py --migrate   # upgrade an existing table, load nothing
 """
 
 import json
@@ -21,6 +22,7 @@ import sys
 try:
     import psycopg2
     from psycopg2 import sql
+    from psycopg2.extras import execute_values
 except ImportError:
     print("Install: pip install psycopg2-binary", file=sys.stderr)
     sys.exit(1)
@@ -31,6 +33,10 @@ try:
 except ImportError:
     pass
 
+# Owner keys are computed with the API's own normalizer so lookups and stored keys agree
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parcel_api"))
+from owners import owner_key  # noqa: E402
+
 TABLE_NAME = "parcels"
 CREATE_SQL = """
 CREATE TABLE IF NOT EXISTS parcels (
@@ -50,6 +56,38 @@ CREATE INDEX IF NOT EXISTS idx_parcels_apn ON parcels(apn);
 CREATE INDEX IF NOT EXISTS idx_parcels_state_county ON parcels(state, county);
 """
 
+# Idempotent upgrades for tables created by older versions of this script.
+# apn_norm: digits-only APN (11-444-000-40007 -> 1144400040007) kept in sync by Postgres,
+# so the API's normalized APN lookup is an index scan instead of a REGEXP_REPLACE full scan.
+# address_norm: lowercase alphanumeric words ('123 Main St., #4' -> '123 main st 4'), trigram
+# indexed for GET /parcels/search (prefix LIKE and pg_trgm word similarity).
+# owner_key: owner name without punctuation or LLC/INC/TRUST-style words, words sorted
+# (parcel_api/owners.py). Computed here on insert; existing rows are backfilled by --migrate.
+MIGRATE_SQL = """
+ALTER TABLE parcels ADD COLUMN IF NOT EXISTS apn_norm TEXT
+  GENERATED ALWAYS AS (REGEXP_REPLACE(apn, '[^0-9]', '', 'g')) STORED;
+CREATE INDEX IF NOT EXISTS idx_parcels_apn_norm ON parcels(apn_norm, state, county);
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE parcels ADD COLUMN IF NOT EXISTS address_norm TEXT
+  GENERATED ALWAYS AS (BTRIM(REGEXP_REPLACE(LOWER(address), '[^0-9a-z]+', ' ', 'g'))) STORED;
+CREATE INDEX IF NOT EXISTS idx_parcels_address_trgm ON parcels USING GIN (address_norm gin_trgm_ops);
+ALTER TABLE parcels ADD COLUMN IF NOT EXISTS owner_key TEXT;
+CREATE INDEX IF NOT EXISTS idx_parcels_owner_key ON parcels(owner_key, state, county);
+"""
+
+# parcels_version: one row whose version is bumped after every load; the API derives its ETags
+# from it, so clients revalidate instead of refetching unchanged data. The API always reads this
+# table, so its name is fixed and not renamed with --table.
+VERSION_TABLE = "parcels_version"
+VERSION_SQL = f"""
+CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+  id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+INSERT INTO {VERSION_TABLE} (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+"""
+
 
 def get_conn():
     url = os.environ.get("DATABASE_URL")
@@ -65,12 +103,57 @@ def get_conn():
 
 
 def ensure_table(conn, table_name):
+    """Create/upgrade the table. Returns True if the owner_key column had to be added."""
     with conn.cursor() as cur:
-        for stmt in CREATE_SQL.replace("parcels", table_name).split(";"):
+        cur.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = 'owner_key'",
+            (table_name,),
+        )
+        added_owner_key = cur.fetchone() is None
+        for stmt in ((CREATE_SQL + MIGRATE_SQL).replace("parcels", table_name) + VERSION_SQL).split(";"):
             stmt = stmt.strip()
             if stmt:
                 cur.execute(stmt)
     conn.commit()
+    return added_owner_key
+
+
+def bump_version(conn):
+    """Mark the data as changed (invalidates API ETags). Returns the new version."""
+    with conn.cursor() as cur:
+        cur.execute(
+            sql.SQL("UPDATE {} SET version = version + 1, updated_at = now() WHERE id = 1 RETURNING version").format(
+                sql.Identifier(VERSION_TABLE)
+            )
+        )
+        version = cur.fetchone()[0]
+    conn.commit()
+    return version
+
+
+def backfill_owner_keys(conn, table_name, batch_size=5000):
+    """Fill owner_key for rows loaded before the column existed. Returns the number of rows updated."""
+    updated = 0
+    with conn.cursor(name="owner_key_backfill") as read, conn.cursor() as write:
+        read.execute(
+            sql.SQL("SELECT id, owner FROM {} WHERE owner_key IS NULL AND owner IS NOT NULL").format(
+                sql.Identifier(table_name)
+            )
+        )
+        while True:
+            rows = read.fetchmany(batch_size)
+            if not rows:
+                break
+            execute_values(
+                write,
+                sql.SQL("UPDATE {} AS t SET owner_key = v.k FROM (VALUES %s) AS v(id, k) WHERE t.id = v.id").format(
+                    sql.Identifier(table_name)
+                ),
+                [(row_id, owner_key(owner)) for row_id, owner in rows],
+            )
+            updated += len(rows)
+    conn.commit()
+    return updated
 
 
 def load_geojson(conn, path, table_name, state=None, county=None):
@@ -90,13 +173,14 @@ def load_geojson(conn, path, table_name, state=None, county=None):
             c = props.get("county") or props.get("site_county") or county
             cur.execute(
                 """
-                INSERT INTO {} (apn, address, owner, acres, legal_desc, market_value, state, county, geom)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, ST_GeomFromGeoJSON(%s))
+                INSERT INTO {} (apn, address, owner, owner_key, acres, legal_desc, market_value, state, county, geom)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, ST_GeomFromGeoJSON(%s))
                 """.format(table_name),
                 (
                     props.get("apn"),
                     props.get("address"),
                     props.get("owner"),
+                    owner_key(props.get("owner")) if props.get("owner") else None,
                     props.get("acres"),
                     props.get("legal_desc"),
                     props.get("market_value"),
@@ -113,14 +197,26 @@ def load_geojson(conn, path, table_name, state=None, county=None):
 def main():
     import argparse
     ap = argparse.ArgumentParser(description="Load parcel GeoJSON into PostGIS")
-    ap.add_argument("geojson_files", nargs="+", help="Paths to .geojson files")
+    ap.add_argument("geojson_files", nargs="*", help="Paths to .geojson files")
     ap.add_argument("--table", default=TABLE_NAME, help="PostGIS table name (default: parcels)")
     ap.add_argument("--state", default=None, help="Default state for features without state")
     ap.add_argument("--county", default=None, help="Default county for features without county")
+    ap.add_argument("--migrate", action="store_true", help="Only create/upgrade the table and indexes")
     args = ap.parse_args()
+    if not args.geojson_files and not args.migrate:
+        ap.error("give at least one GeoJSON file, or --migrate")
 
     conn = get_conn()
-    ensure_table(conn, args.table)
+    added_owner_key = ensure_table(conn, args.table)
+    if args.migrate or added_owner_key:
+        n = backfill_owner_keys(conn, args.table)
+        if n:
+            print(f"Computed owner_key for {n} existing parcels")
+            bump_version(conn)
+    if args.migrate:
+        conn.close()
+        print(f"Table {args.table} is up to date")
+        return
     total = 0
     for path in args.geojson_files:
         if not path.endswith(".geojson") and not path.endswith(".json"):
@@ -131,6 +227,8 @@ def main():
         n = load_geojson(conn, path, args.table, state=args.state, county=args.county)
         total += n
         print(f"Loaded {n} features from {path}")
+    if total:
+        print(f"Data version is now {bump_version(conn)}")
     conn.close()
     print(f"Total: {total} parcels in table {args.table}")
 